@@ -0,0 +1,113 @@
+"""
+Seeded synthetic product catalogs for the benchmarks.
+
+`make_catalog` draws products of all three categories. Half of the nutrient
+values sit on or right next to a bin edge of the category's scoring table,
+so both sides of every ``low < value <= high`` comparison are exercised;
+the rest are spread over the table's range. Drinks carry the sweetener and
+water flags, general foods the red-meat flag, and a share of the rows are
+clones of earlier rows, like pack-size variants in a real catalog.
+
+Usage: python benchmarks/catalog.py catalog.csv [--rows 100000] [--seed 0]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutriscore.columns import NUTRIENT_COLUMNS, NUTRIENT_RANGES  # noqa: E402
+from nutriscore.tables import (  # noqa: E402
+    ENERGY_SCORING,
+    FIBRE_SCORING,
+    FRUIT_SCORING,
+    PROTEIN_SCORING,
+    SALT_SCORING,
+    SAT_FAT_SCORING,
+    SUGAR_SCORING,
+)
+
+# Scoring table behind each nutrient column
+NUTRIENT_TABLES = dict(zip(NUTRIENT_COLUMNS, [
+    ENERGY_SCORING, SUGAR_SCORING, SAT_FAT_SCORING, SALT_SCORING,
+    FRUIT_SCORING, FIBRE_SCORING, PROTEIN_SCORING,
+]))
+
+CATEGORY_SHARES = {"general": 0.7, "drink": 0.2, "fat": 0.1}
+EDGE_SHARE = 0.5      # values on or next to a bin edge
+CLONE_SHARE = 0.15    # rows copying the nutrients of an earlier row
+SWEETENER_SHARE = 0.15  # of drinks
+WATER_SHARE = 0.05      # of drinks
+RED_MEAT_SHARE = 0.05   # of general foods
+
+
+def _bin_edges(bins):
+    return np.array(sorted({edge for low, high, _ in bins for edge in (low, high) if np.isfinite(edge)}))
+
+
+def _nutrient_values(rng, bins, n):
+    edges = _bin_edges(bins)
+    top = edges.max() * 1.3
+    values = rng.uniform(0, top, n)
+    on_edge = rng.random(n) < EDGE_SHARE
+    offsets = rng.choice([-0.01, 0.0, 0.01], on_edge.sum())
+    values[on_edge] = rng.choice(edges, on_edge.sum()) + offsets
+    return np.clip(values, 0, None).round(2)
+
+
+def make_catalog(rows, seed=0):
+    """Return a synthetic catalog of `rows` products as a DataFrame (same seed, same catalog)."""
+    rng = np.random.default_rng(seed)
+    categories = rng.choice(list(CATEGORY_SHARES), rows, p=list(CATEGORY_SHARES.values()))
+
+    data = {name: np.empty(rows) for name in NUTRIENT_COLUMNS}
+    for category in CATEGORY_SHARES:
+        mask = categories == category
+        for name, tables in NUTRIENT_TABLES.items():
+            data[name][mask] = _nutrient_values(rng, tables[category], mask.sum())
+    for name, (low, high) in NUTRIENT_RANGES.items():
+        data[name] = np.clip(data[name], low, high)  # e.g. no more than 100 % fruit
+
+    drink = categories == "drink"
+    data["Contains sweeteners"] = drink & (rng.random(rows) < SWEETENER_SHARE)
+    data["Is red meat"] = (categories == "general") & (rng.random(rows) < RED_MEAT_SHARE)
+    data["is_water"] = drink & (rng.random(rows) < WATER_SHARE)
+    for name in NUTRIENT_COLUMNS:
+        data[name][data["is_water"]] = 0.0
+    data["Category"] = categories
+
+    # Pack-size variants and relabelled clones share an earlier row's nutrition
+    clones = np.flatnonzero(rng.random(rows) < CLONE_SHARE)
+    clones = clones[clones > 0]
+    sources = (rng.random(len(clones)) * clones).astype(np.intp)
+    for name, values in data.items():
+        values[clones] = values[sources]
+
+    data["Product Name"] = np.char.add("Product ", np.arange(rows).astype(str))
+    return pd.DataFrame(data)
+
+
+def write_catalog(path, rows, seed=0, block=1_000_000):
+    """Write a synthetic catalog CSV block by block (each block drawn with its own seed)."""
+    for number, start in enumerate(range(0, rows, block)):
+        catalog = make_catalog(min(block, rows - start), seed=(seed, number))
+        catalog["Product Name"] = "Product " + (catalog.index + start).astype(str)
+        catalog.to_csv(path, mode="a" if start else "w", header=start == 0, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_catalog(args.path, args.rows, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
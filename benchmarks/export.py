@@ -0,0 +1,93 @@
+"""
+Throughput and memory of the streaming result writers.
+
+Scores a synthetic catalog (see `catalog.py`) block by block and writes it
+with every writer in `RESULT_WRITERS`: plain, gzip and zstd CSV, Parquet and
+XLSX (one sheet per category). Reports write rows/s (blocks scored
+beforehand) and bytes per row, then checks
+that peak memory (traced Python allocations) does not grow with the row
+count: writing `--rows` rows must peak within `MAX_PEAK_GROWTH` of writing a
+quarter of them. Exits with status 1 if a writer's memory grows.
+
+Writers whose optional package is missing (pyarrow, zstandard) are skipped.
+openpyxl writes XLSX far faster with lxml installed.
+
+Usage: python benchmarks/export.py [--rows 100000] [--block 10000] [--formats .csv .xlsx]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import make_catalog  # noqa: E402
+
+from nutriscore.engine import score_table  # noqa: E402
+from nutriscore.export import RESULT_WRITERS  # noqa: E402
+
+MAX_PEAK_GROWTH = 1.25  # peak for all rows / peak for a quarter of them
+PEAK_SLACK = 1024 ** 2  # bytes of allocator noise tolerated on top
+
+
+def scored_blocks(rows, block, seed=0):
+    """Yield the scored blocks of a `rows`-row catalog, `block` rows at a time."""
+    for number, start in enumerate(range(0, rows, block)):
+        yield score_table(make_catalog(min(block, rows - start), seed=(seed, number)), "general")
+
+
+def write_blocks(path, writer_class, blocks):
+    writer = writer_class(path)
+    try:
+        for result in blocks:
+            writer.write(result, len(result["Nutri-Score Grade"]))
+    finally:
+        writer.close()
+
+
+def peak_memory(path, writer_class, rows, block):
+    tracemalloc.start()
+    try:
+        write_blocks(path, writer_class, scored_blocks(rows, block))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--block", type=int, default=10_000)
+    parser.add_argument("--formats", nargs="+", default=list(RESULT_WRITERS))
+    args = parser.parse_args()
+
+    blocks = list(scored_blocks(args.rows, args.block))
+    grew = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for suffix in args.formats:
+            path = os.path.join(tmp, f"results{suffix}")
+            writer_class = RESULT_WRITERS[suffix]
+            try:
+                start = time.perf_counter()
+                write_blocks(path, writer_class, blocks)
+            except RuntimeError as e:
+                print(f"{suffix:<10} skipped: {e}")
+                continue
+            seconds = time.perf_counter() - start
+            size = os.path.getsize(path)
+
+            small = peak_memory(path, writer_class, args.rows // 4, args.block)
+            full = peak_memory(path, writer_class, args.rows, args.block)
+            ok = full <= small * MAX_PEAK_GROWTH + PEAK_SLACK
+            grew |= not ok
+            print(f"{suffix:<10} {args.rows / seconds:>10,.0f} rows/s  {size / args.rows:6.1f} B/row  "
+                  f"peak {small / 1024 ** 2:6.1f} MB at {args.rows // 4:,} rows, "
+                  f"{full / 1024 ** 2:6.1f} MB at {args.rows:,}  {'ok' if ok else 'GROWS'}", flush=True)
+    return 1 if grew else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
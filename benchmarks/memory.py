@@ -0,0 +1,79 @@
+"""
+Memory footprint of a scored catalog.
+
+Scores a synthetic catalog (see `catalog.py`) with `process_dataframe` and
+reports the bytes per row of the result, leaving out the product names
+(their size depends only on the input). Checks the compact layout against
+`TARGET_BYTES_PER_ROW`, with float64 nutrients and with
+``float32_nutrients`` (4 bytes less for every column that could be narrowed;
+the catalog's values on bin edges keep some columns float64), and that `build_display_frame` shares the result's numeric buffers instead
+of copying them. Exits with status 1 if a target is missed.
+
+Usage: python benchmarks/memory.py [--rows 1000000] [--seed 0]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import make_catalog  # noqa: E402
+
+from nutriscore.columns import COMPONENT_COLUMNS, NUTRIENT_COLUMNS, TOTAL_COLUMNS  # noqa: E402
+from nutriscore.frame import build_display_frame, process_dataframe  # noqa: E402
+
+# 7 float64 nutrients, 3 bool flags, 1 category code, 8 int8 points,
+# 3 int16 totals and 1 grade code: 75 bytes (47 with float32 nutrients)
+TARGET_BYTES_PER_ROW = 80
+FLOAT32_SAVING = 4  # bytes per row for each nutrient column stored as float32
+EXCLUDED_COLUMNS = ["Product Name"]
+
+
+def bytes_per_row(df):
+    return df.drop(columns=EXCLUDED_COLUMNS, errors="ignore").memory_usage(index=False, deep=True).sum() / len(df)
+
+
+def shared_columns(display_df, result_df):
+    """Names of the numeric result columns the display frame holds without a copy."""
+    shared = []
+    result_arrays = [result_df[name].to_numpy() for name in NUTRIENT_COLUMNS + COMPONENT_COLUMNS + TOTAL_COLUMNS]
+    for name in display_df.columns:
+        values = display_df[name]
+        if values.dtype.kind in "fiu" and any(np.shares_memory(values.to_numpy(), a) for a in result_arrays):
+            shared.append(name)
+    return shared
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.rows, args.seed)
+    print(f"{'input catalog':<32} {bytes_per_row(catalog):7.1f} B/row")
+    missed = False
+    for float32_nutrients in (False, True):
+        result_df = process_dataframe(catalog, "general", float32_nutrients=float32_nutrients)
+        size = bytes_per_row(result_df)
+        narrowed = sum(result_df[name].dtype == np.float32 for name in NUTRIENT_COLUMNS)
+        target = TARGET_BYTES_PER_ROW - FLOAT32_SAVING * narrowed
+        label = f"result ({narrowed} float32 nutrients)"
+        ok = size <= target
+        missed |= not ok
+        print(f"{label:<32} {size:7.1f} B/row  target {target} B/row  {'ok' if ok else 'MISSED'}")
+
+    display_df = build_display_frame(result_df)
+    shared = shared_columns(display_df, result_df)
+    expected = len(NUTRIENT_COLUMNS) + len(COMPONENT_COLUMNS) + len(TOTAL_COLUMNS)
+    ok = len(shared) == expected
+    missed |= not ok
+    print(f"{'display frame views':<32} {len(shared):7d} of {expected} numeric columns  {'ok' if ok else 'MISSED'}")
+    return 1 if missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Parallel scoring benchmark.
+
+Writes a synthetic catalog CSV (5M rows by default, see `catalog.py`) and times
+``score_file`` with an increasing number of worker processes, reporting the
+speedup over a single worker and checking that every run writes the same
+output.
+
+Usage: python benchmarks/parallel.py [--rows 5000000] [--workers 1 2 4 8 16]
+"""
+
+import argparse
+import filecmp
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import write_catalog  # noqa: E402
+
+from nutriscore.cli import score_file  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "catalog.csv")
+        write_catalog(input_path, args.rows)
+
+        reference = None
+        baseline = None
+        for workers in args.workers:
+            output_path = os.path.join(tmp, f"scored_{workers}.csv")
+            start = time.perf_counter()
+            score_file(input_path, output_path, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            baseline = baseline or elapsed
+            print(f"{workers:>3} workers: {elapsed:7.2f} s  {args.rows / elapsed:>12,.0f} rows/s  "
+                  f"speedup {baseline / elapsed:5.2f}x")
+            if reference is None:
+                reference = output_path
+            elif not filecmp.cmp(reference, output_path, shallow=False):
+                print(f"FAIL: output with {workers} workers differs from {args.workers[0]} worker(s)")
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
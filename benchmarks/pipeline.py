@@ -0,0 +1,184 @@
+"""
+Per-stage benchmark of the scoring pipeline.
+
+Generates seeded synthetic catalogs (see `catalog.py`) of 1k, 100k and 1M
+rows and times every stage separately: CSV parsing, row-wise
+`get_individual_scores` / `compute_score` and `get_grade`, pandas-free
+`score_batch` over the same records, input validation
+(`validate_products`, under a second for 1M rows), reading and checking
+the file as an upload source (`read_sources`), columnar
+`process_dataframe`, display-frame construction, reformulation targets
+(`single_nutrient_changes`), the sensitivity report (`boundary_distances`),
+scoring under the 2023 and 2017 rule packs in one pass (`score_versions`),
+CSV export and the end-to-end ``score``
+command. Each stage reports its best time over
+``--repeat`` runs.
+
+Results are written as JSON (``--output``) so runs on different commits can
+be compared with ``--compare old.json``. Row-wise stages only run the first
+``--rowwise-limit`` rows; their rows/s rate is what to compare.
+
+Usage: python benchmarks/pipeline.py [--sizes 1000 100000 1000000] [--output results.json]
+                                     [--compare baseline.json] [--repeat 3]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import write_catalog  # noqa: E402
+
+from nutriscore import scoring  # noqa: E402
+from nutriscore.batch import score_batch  # noqa: E402
+from nutriscore.cli import score_file  # noqa: E402
+from nutriscore.frame import build_display_frame, process_dataframe  # noqa: E402
+from nutriscore.ingest import iter_csv_chunks  # noqa: E402
+from nutriscore.reformulate import boundary_distances, single_nutrient_changes  # noqa: E402
+from nutriscore.rules import RULE_PACKS, score_versions  # noqa: E402
+from nutriscore.sources import read_sources  # noqa: E402
+from nutriscore.validate import validate_products  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FORMAT = 1
+
+
+def best_time(stage, repeat):
+    times = []
+    for _ in range(repeat):
+        scoring._score_profile.cache_clear()  # row-wise stages start cold
+        start = time.perf_counter()
+        stage()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def score_rows(records):
+    for row in records:
+        scoring.get_individual_scores(row, row["Category"])
+        scoring.compute_score(row, row["Category"])
+
+
+def grade_rows(records, scores):
+    for row, score in zip(records, scores):
+        scoring.get_grade(score, row["Category"], row)
+
+
+def run_size(rows, tmp, repeat, rowwise_limit, seed):
+    """Time every stage on a catalog of `rows` products; return {stage: seconds} and stage row counts."""
+    input_path = os.path.join(tmp, f"catalog_{rows}.csv")
+    output_path = os.path.join(tmp, f"scored_{rows}.csv")
+    write_catalog(input_path, rows, seed)
+
+    df = pd.read_csv(input_path)
+    records = df.head(rowwise_limit).to_dict("records")
+    scores = [scoring.compute_score(row, row["Category"]) for row in records]
+    result_df = process_dataframe(df, "general")
+    display_df = build_display_frame(result_df)
+    valid_df, _ = validate_products(df)
+    categories = result_df["Category"].to_numpy(dtype=object)
+
+    stages = {
+        "parse_csv": (lambda: pd.read_csv(input_path), rows),
+        "parse_csv_stdlib": (lambda: list(iter_csv_chunks(input_path)), rows),
+        "score_rows": (lambda: score_rows(records), len(records)),
+        "get_grade": (lambda: grade_rows(records, scores), len(records)),
+        "score_batch": (lambda: score_batch(records), len(records)),
+        "validate": (lambda: validate_products(df), rows),
+        "read_sources": (lambda: read_sources([input_path]), rows),
+        "process_dataframe": (lambda: process_dataframe(df, "general"), rows),
+        "display_frame": (lambda: build_display_frame(result_df), rows),
+        "reformulation": (lambda: single_nutrient_changes(valid_df, categories, "B"), rows),
+        "sensitivity": (lambda: boundary_distances(valid_df, categories), rows),
+        "versions": (lambda: score_versions(valid_df, categories, list(RULE_PACKS)), rows),
+        "export_csv": (lambda: display_df.to_csv(io.StringIO(), index=False), rows),
+        "score_file_csv": (lambda: score_file(input_path, output_path), rows),
+    }
+    results = []
+    for name, (stage, stage_rows) in stages.items():
+        seconds = best_time(stage, repeat)
+        results.append({
+            "stage": name,
+            "rows": rows,
+            "stage_rows": stage_rows,
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(stage_rows / seconds) if seconds else None,
+        })
+        print(f"{rows:>9,} rows  {name:<18} {seconds:9.4f} s  {stage_rows / seconds:>14,.0f} rows/s", flush=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, results):
+    """Print the time ratio of every stage against a baseline results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    print(f"\nAgainst {baseline_path} (commit {baseline.get('commit')}):")
+    for result in results:
+        old = previous.get((result["stage"], result["rows"]))
+        if old is None:
+            continue
+        # Compare rates, so row-wise stages run with a different limit stay comparable
+        ratio = old["rows_per_second"] / result["rows_per_second"]
+        print(f"{result['rows']:>9,} rows  {result['stage']:<18} {ratio:6.2f}x time "
+              f"({old['rows_per_second']:,} -> {result['rows_per_second']:,} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--rowwise-limit", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="results JSON file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            results.extend(run_size(rows, tmp, args.repeat, args.rowwise_limit, args.seed))
+
+    report = {
+        "format": RESULTS_FORMAT,
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Load benchmark of the HTTP scoring service (``python -m nutriscore serve``).
+
+Starts the service on a free port in a subprocess, then drives it with
+``--clients`` concurrent keep-alive connections, each sending single-product
+``POST /score`` requests (products from a seeded synthetic catalog, see
+`catalog.py`) back to back for ``--seconds``. Reports requests/s and the
+client-side p50/p99 latency, then the server's own ``/metrics``. Exits with
+status 1 if the p99 latency is above ``--max-p99-ms``.
+
+Usage: python benchmarks/service.py [--clients 64] [--seconds 10] [--batch-window-ms 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import make_catalog  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_P99_MS = 50.0
+
+
+def start_server(window_ms, max_batch):
+    """Run the service on a free port; returns (process, port)."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "nutriscore", "serve", "--port", "0",
+         "--batch-window-ms", str(window_ms), "--max-batch", str(max_batch)],
+        cwd=ROOT, stderr=subprocess.PIPE, text=True,
+    )
+    line = process.stderr.readline()  # "Serving Nutri-Score on http://127.0.0.1:<port>"
+    if not line.startswith("Serving"):
+        process.kill()
+        raise RuntimeError(f"The service did not start: {line}{process.stderr.read()}")
+    return process, int(line.rsplit(":", 1)[1])
+
+
+def request_bytes(method, path, body=b""):
+    return (
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode() + body
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = next(
+        int(line.split(b":", 1)[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length:")
+    )
+    return status, await reader.readexactly(length)
+
+
+async def client(port, bodies, deadline, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        writer.write(request_bytes("POST", "/score", bodies[i % len(bodies)]))
+        status, _ = await read_response(reader)
+        if status != 200:
+            raise RuntimeError(f"POST /score returned {status}")
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    writer.close()
+
+
+async def fetch_metrics(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(request_bytes("GET", "/metrics"))
+    _, body = await read_response(reader)
+    writer.close()
+    return json.loads(body)
+
+
+async def run_load(port, bodies, clients, seconds):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, bodies[i::clients], deadline, latencies) for i in range(clients)))
+    return latencies, time.perf_counter() - start, await fetch_metrics(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=64, help="concurrent connections")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch-window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=512)
+    parser.add_argument("--products", type=int, default=10_000, help="distinct products sent")
+    parser.add_argument("--max-p99-ms", type=float, default=MAX_P99_MS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.products, args.seed)
+    bodies = [json.dumps(record).encode() for record in catalog.to_dict("records")]
+
+    process, port = start_server(args.batch_window_ms, args.max_batch)
+    try:
+        latencies, elapsed, metrics = asyncio.run(run_load(port, bodies, args.clients, args.seconds))
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+    print(f"{len(latencies):,} requests from {args.clients} clients in {elapsed:.1f} s: "
+          f"{len(latencies) / elapsed:,.0f} requests/s, p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"Server: {json.dumps(metrics)}")
+    if p99 > args.max_p99_ms:
+        print(f"p99 latency {p99:.2f} ms is above {args.max_p99_ms:g} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
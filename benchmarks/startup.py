@@ -0,0 +1,84 @@
+"""
+Startup-time benchmark for the headless scorer.
+
+Times ``python -m nutriscore score`` on a one-product CSV against a bare
+``python -c pass`` and fails (exit code 1) when the difference, i.e. the
+time from interpreter start to a scored and written row, exceeds the budget.
+It also checks that importing `nutriscore` does not pull in pandas or
+Streamlit.
+
+Usage: python benchmarks/startup.py [--budget-ms 200] [--repeat 7]
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_ROW = {
+    "Product Name": "Orange juice",
+    "Energy (kJ/100 g)": 190,
+    "Sugar (g/100 g)": 8.9,
+    "Saturates (g/100 g)": 0,
+    "Salt (g/100 g)": 0.01,
+    "Fruits, vegetables, and pulses (%)": 100,
+    "Fibre (g/100 g)": 0.2,
+    "Protein (g/100 g)": 0.7,
+    "Contains sweeteners": False,
+    "is_water": False,
+}
+
+
+def best_time(command, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=200.0)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    heavy = subprocess.run(
+        [sys.executable, "-c", "import sys, nutriscore; print(*sorted({'pandas', 'streamlit'} & set(sys.modules)))"],
+        cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout.split()
+    if heavy:
+        print(f"FAIL: 'import nutriscore' imports {', '.join(heavy)}")
+        return 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "one_product.csv")
+        with open(input_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(SAMPLE_ROW))
+            writer.writeheader()
+            writer.writerow(SAMPLE_ROW)
+
+        baseline = best_time([sys.executable, "-c", "pass"], args.repeat)
+        scorer = best_time(
+            [sys.executable, "-m", "nutriscore", "score", input_path,
+             "-o", os.path.join(tmp, "out.csv"), "--category", "drink"],
+            args.repeat,
+        )
+
+    overhead_ms = (scorer - baseline) * 1000
+    print(f"interpreter: {baseline * 1000:.0f} ms, scorer: {scorer * 1000:.0f} ms, "
+          f"startup to first scored row: {overhead_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if overhead_ms > args.budget_ms:
+        print("FAIL: startup budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
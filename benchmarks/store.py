@@ -0,0 +1,78 @@
+"""
+Insert and query speed of the SQLite result store (`nutriscore.store`).
+
+Scores a synthetic catalog (see `catalog.py`) once, with a brand drawn for
+every product, then stores it ``--runs`` times in a fresh store file as
+consecutive runs and reports insert rows/s per run. Then times typical
+portfolio questions against the full store (best of ``--repeat``): E-grade
+drinks with sweeteners in the last run, one product's history, and the
+grade distribution by brand and by category over the last 10 runs.
+
+Usage: python benchmarks/store.py [--rows 300000] [--runs 5] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import make_catalog  # noqa: E402
+
+from nutriscore.frame import process_dataframe  # noqa: E402
+from nutriscore.store import ResultStore  # noqa: E402
+
+BRANDS = [f"Brand {i}" for i in range(50)]
+
+
+def best_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.rows, args.seed)
+    result_df = process_dataframe(catalog, "general")
+    brands = np.random.default_rng(args.seed).choice(BRANDS, len(result_df))
+    product_id = result_df["Product Name"].iloc[len(result_df) // 2]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with ResultStore(os.path.join(tmp, "results.sqlite")) as store:
+            for run in range(args.runs):
+                start = time.perf_counter()
+                store.add_run(result_df, source=f"run {run}", brands=brands)
+                seconds = time.perf_counter() - start
+                print(f"insert run {run + 1}: {len(result_df):,} rows in {seconds:.2f} s "
+                      f"({len(result_df) / seconds:,.0f} rows/s)")
+
+            queries = {
+                "E-grade drinks with sweeteners": lambda: store.query(
+                    grades=["E"], categories=["drink"], contains_sweeteners=True
+                ),
+                "product history": lambda: store.query(product_id=product_id),
+                "grades by brand, last 10 runs": lambda: store.grade_distribution(by="brand", last_runs=10),
+                "grades by category, last 10 runs": lambda: store.grade_distribution(last_runs=10),
+            }
+            for name, query in queries.items():
+                rows = len(query())
+                print(f"{name}: {best_ms(query, args.repeat):.1f} ms ({rows:,} rows)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Nutri-Score scoring core (2023 updated algorithm).
+
+Pure scoring code shared by the Streamlit app, the beverage demo and batch
+jobs. Importing the package only loads the tables and the row-wise scoring
+functions; NumPy and pandas are imported when the columnar engine or the
+DataFrame helpers are first used.
+"""
+
+from importlib import import_module
+
+from .columns import COMPONENT_COLUMNS, FLAG_COLUMNS, NUTRIENT_COLUMNS
+from .scoring import (
+    compute_score,
+    get_energy_from_sat_fat_points,
+    get_energy_points,
+    get_fibre_points,
+    get_fruit_points,
+    get_grade,
+    get_individual_scores,
+    get_protein_points,
+    get_sat_fat_points,
+    get_sodium_points,
+    get_sugar_points,
+    score_component,
+    score_product,
+)
+from .tables import (
+    CATEGORY_ALIASES,
+    CATEGORY_MAP,
+    CATEGORY_THRESHOLDS,
+    ENERGY_SCORING,
+    FIBRE_SCORING,
+    FRUIT_SCORING,
+    PROTEIN_SCORING,
+    SALT_SCORING,
+    SAT_FAT_SCORING,
+    SUGAR_SCORING,
+    ScoringTable,
+)
+
+# Loaded on first access so that `import nutriscore` stays cheap
+_LAZY_ATTRIBUTES = {
+    "get_grade_array": "engine",
+    "score_columns": "engine",
+    "score_columns_by_category": "engine",
+    "score_table": "engine",
+    "score_batch": "batch",
+    "score_unique_profiles": "engine",
+    "build_display_frame": "frame",
+    "process_dataframe": "frame",
+    "resolve_categories": "frame",
+    "score_csv_stream": "frame",
+    "score_file": "cli",
+    "process_dataframe_parallel": "parallel",
+    "rescore_changed": "incremental",
+    "coerce_products": "validate",
+    "validate_products": "validate",
+    "boundary_distances": "reformulate",
+    "reformulation_options": "reformulate",
+    "single_nutrient_changes": "reformulate",
+    "compile_rules": "rules",
+    "migration_counts": "rules",
+    "score_versions": "rules",
+    "ResultStore": "store",
+    "read_sources": "sources",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
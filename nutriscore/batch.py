@@ -0,0 +1,159 @@
+"""
+Batch scoring without pandas: `score_batch`.
+
+For services that score a few products at a time, where building a
+DataFrame costs more than scoring it. A batch is a dict of column arrays, a
+sequence of records (dicts) or a 2-D array of nutrient values; columns go
+by their input names ("Energy (kJ/100 g)", ...) or the short names of
+`SHORT_NAMES` ("energy", ...). Cells are read and checked like the command
+line tool reads CSV cells (`parse_number`, `parse_flag`, the
+`NUTRIENT_RANGES`), and the first unusable one raises ValueError. Nothing
+here imports pandas; `process_dataframe` is an adapter over `score_batch`.
+"""
+
+from collections.abc import Mapping
+
+import numpy as np
+
+from .columns import FLAG_COLUMNS, INPUT_COLUMNS, NUTRIENT_COLUMNS
+from .engine import resolve_category_values, score_columns_by_category, score_unique_profiles
+from .ingest import _check_nutrients, _parse_flags, _parse_numbers
+from .tables import CATEGORY_THRESHOLDS
+
+# Short column names accepted besides the input column names
+SHORT_NAMES = {
+    "energy": "Energy (kJ/100 g)",
+    "sugar": "Sugar (g/100 g)",
+    "saturates": "Saturates (g/100 g)",
+    "salt": "Salt (g/100 g)",
+    "fruit": "Fruits, vegetables, and pulses (%)",
+    "fibre": "Fibre (g/100 g)",
+    "protein": "Protein (g/100 g)",
+    "sweeteners": "Contains sweeteners",
+    "red_meat": "Is red meat",
+    "water": "is_water",
+    "name": "Product Name",
+    "category": "Category",
+}
+_INPUT_NAMES = {**{name: name for name in INPUT_COLUMNS}, **SHORT_NAMES}
+
+
+def batch_columns(data):
+    """
+    Column arrays of a batch, keyed by input column name.
+
+    `data` is a dict of column arrays, a sequence of records (dicts) or a
+    2-D array with one row per product and the `NUTRIENT_COLUMNS` as
+    columns. Keys other than the input and short column names are ignored;
+    a record without a column has an empty cell there.
+    """
+    if isinstance(data, np.ndarray):
+        if data.ndim != 2 or data.shape[1] != len(NUTRIENT_COLUMNS):
+            raise ValueError(f"A nutrient array must have {len(NUTRIENT_COLUMNS)} columns, one per nutrient")
+        return {name: data[:, i] for i, name in enumerate(NUTRIENT_COLUMNS)}
+    if isinstance(data, Mapping):
+        columns = {}
+        for key, values in data.items():
+            name = _INPUT_NAMES.get(key)
+            if name is not None:
+                if name in columns:
+                    raise ValueError(f"Column {name!r} is given twice")
+                columns[name] = values
+        return columns
+
+    records = data if isinstance(data, (list, tuple)) else list(data)
+    if not records:
+        return {name: np.empty(0) for name in NUTRIENT_COLUMNS}
+    keys = set().union(*records)
+    columns = {}
+    for key in keys:
+        name = _INPUT_NAMES.get(key)
+        if name is None:
+            continue
+        if name in columns:
+            raise ValueError(f"Column {name!r} is given twice")
+        columns[name] = [record.get(key) for record in records]
+    return columns
+
+
+def score_batch(data, category="general", dedupe=False, factorize=None, check=True):
+    """
+    Score a batch of products without pandas.
+
+    Parameters
+    ----------
+    data : dict, sequence of dict or numpy.ndarray
+        The products (see `batch_columns`): nutrient columns, optional flag
+        columns and an optional "Category" column of category keys or
+        `CATEGORY_MAP` labels.
+    category : str or array-like
+        Category of every product without a "Category" cell, or an array of
+        category keys, one per product (the "Category" column is then
+        ignored).
+    dedupe : bool
+        Score repeated (nutrients, flags, category) tuples once (see
+        `score_unique_profiles`); pays off for large tables with repeats.
+    factorize : callable, optional
+        Passed on to `score_unique_profiles`.
+    check : bool
+        Reject empty and out-of-range nutrients. Without it they are scored
+        as given (NaN with the most unfavourable points), for callers that
+        checked their inputs against their own limits.
+
+    Returns
+    -------
+    dict
+        "Category" (category keys) and the `SCORE_COLUMNS`: int8 component
+        points, int16 totals and grade letters, one per product.
+
+    Raises
+    ------
+    ValueError
+        For missing nutrient columns, and for the first unreadable nutrient,
+        empty or out-of-range one (with `check`), unreadable flag or unknown category; rows are
+        numbered from 0 in batch order.
+    """
+    columns = batch_columns(data)
+    missing_columns = [name for name in NUTRIENT_COLUMNS if name not in columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    n_rows = len(columns[NUTRIENT_COLUMNS[0]])
+    row_numbers = range(n_rows)
+    checked = {}
+    for name in NUTRIENT_COLUMNS:
+        values = columns[name]
+        if isinstance(values, np.ndarray) and values.dtype.kind in "fiu":
+            checked[name] = values.astype(float, copy=False)
+        else:
+            checked[name] = _parse_numbers(name, values, row_numbers, strict=True)
+        if len(checked[name]) != n_rows:
+            raise ValueError(f"Column {name!r} has {len(checked[name])} values, expected {n_rows}")
+    if check:
+        _check_nutrients(checked, row_numbers)
+    for name in FLAG_COLUMNS:
+        if name in columns:
+            values = columns[name]
+            is_bool = isinstance(values, np.ndarray) and values.dtype == bool
+            checked[name] = values if is_bool else _parse_flags(name, values, row_numbers, strict=True)
+
+    if isinstance(category, str):
+        if "Category" in columns:
+            # Empty cells (None, NaN) take `category`
+            labels = ["" if label is None or label != label else label for label in columns["Category"]]
+            categories = resolve_category_values(labels, category)
+        else:
+            categories = np.full(n_rows, category, dtype=object)
+    else:
+        categories = np.asarray(category, dtype=object)
+    known = np.zeros(n_rows, dtype=bool)
+    for key in CATEGORY_THRESHOLDS:
+        known |= categories == key
+    if not known.all():
+        raise ValueError(f"Unknown category {categories[~known][0]!r} (row {np.flatnonzero(~known)[0]})")
+
+    if dedupe:
+        scores = score_unique_profiles(checked, categories, factorize=factorize)
+    else:
+        scores = score_columns_by_category(checked, categories)
+    return {"Category": categories, **scores}
@@ -0,0 +1,168 @@
+"""
+Content-addressed cache for parsed uploads and scored results.
+
+Entries are keyed on a hash of the uploaded file's bytes (plus category and
+`ALGORITHM_VERSION` for scored results), so reruns and re-uploads of the
+same file skip parsing and scoring. Memory use is bounded by an LRU policy;
+an optional on-disk tier keeps entries across app restarts.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+from .tables import ALGORITHM_VERSION
+
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+DEFAULT_MAX_DISK_BYTES = 4 * 1024 ** 3
+
+# Bump when the readers' frames change (e.g. the columns they keep), so older cached frames are ignored
+PARSED_VERSION = "2"
+
+
+def content_hash(data):
+    """Return a hex digest identifying `data` (bytes)."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def parsed_key(file_hash, file_name, sheet=None):
+    """Cache key of the frame parsed from an uploaded file (or one sheet of a workbook)."""
+    key = ("parsed", PARSED_VERSION, file_hash, os.path.splitext(file_name)[1].lower())
+    return key if sheet is None else key + (sheet,)
+
+
+def scored_key(file_hash, category, id_column=None):
+    """Cache key of the scored result of an uploaded file (with products matched on `id_column`)."""
+    return ("scored", file_hash, category, id_column, ALGORITHM_VERSION)
+
+
+def _size_of(value):
+    if hasattr(value, "memory_usage"):  # pandas DataFrame / Series
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache with an optional on-disk tier.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory budget; least recently used entries are evicted beyond it.
+    disk_dir : str, optional
+        Directory for the on-disk tier. Entries are pickled there on `put`
+        and loaded back (and promoted to memory) on a memory miss.
+    max_disk_bytes : int
+        Budget for the on-disk tier; the least recently used files are
+        removed beyond it.
+
+    Notes
+    -----
+    Cached values are shared between callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()  # key -> (value, size in bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes_used(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default`."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+        value = self._load(key)
+        if value is None:
+            return default
+        self._store(key, value)
+        return value
+
+    def put(self, key, value, persist=True):
+        """Cache `value` under `key`, and on disk if a disk tier is set and `persist` is true."""
+        self._store(key, value)
+        if persist:
+            self._save(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key, value):
+        size = _size_of(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    # ----------------------------
+    # On-disk tier
+    # ----------------------------
+    def _path(self, key):
+        return os.path.join(self.disk_dir, content_hash(repr(key).encode()) + ".pkl")
+
+    def _load(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if stored_key != key:
+            return None
+        os.utime(path)  # mark as recently used for disk eviction
+        return value
+
+    def _save(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self._prune_disk()
+
+    def _prune_disk(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,240 @@
+"""
+Command line interface: ``python -m nutriscore score input.csv -o out.parquet``.
+
+CSV input is read and scored chunk by chunk without importing pandas, so
+small files are scored almost as soon as the interpreter is up. Excel, Parquet
+and Arrow input go through pandas.
+"""
+
+import argparse
+import os
+import sys
+from collections import Counter
+from contextlib import ExitStack
+from itertools import chain
+
+from .instrument import log_stages_to_stderr, profile_to, record_stages, stage
+from .tables import CATEGORY_THRESHOLDS
+
+
+def _iter_encoded_blocks(path, category, encode, chunksize, workers=1, sidecar=True):
+    """Yield (encoded result block, row count, grade counts) for an input file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv" and workers != 1:
+        from .parallel import iter_scored_csv_parallel
+
+        yield from iter_scored_csv_parallel(path, category, encode, chunksize, workers)
+    elif extension == ".csv":
+        from .engine import score_table
+        from .ingest import iter_csv_chunks
+
+        rows_done = 0
+        for columns in iter_csv_chunks(path, chunksize=chunksize):
+            result = score_table(columns, category)
+            grades = result["Nutri-Score Grade"]
+            yield encode(result, len(grades), rows_done), len(grades), Counter(grades.tolist())
+            rows_done += len(grades)
+    elif extension in (".xlsx", ".xls"):
+        from .ingest import read_excel_products
+        from .parallel import process_dataframe_parallel
+
+        df = read_excel_products(path, sidecar=f"{path}.nutriscore.parquet" if sidecar else None)
+        result_df = process_dataframe_parallel(df, category, workers, validate=True)
+        grades = result_df["Nutri-Score Grade"]
+        yield encode(result_df, len(result_df)), len(result_df), Counter(grades.tolist())
+    elif extension in (".parquet", ".feather", ".arrow"):
+        from .ingest import read_columnar_products
+        from .parallel import process_dataframe_parallel
+
+        result_df = process_dataframe_parallel(read_columnar_products(path), category, workers, validate=True)
+        grades = result_df["Nutri-Score Grade"]
+        yield encode(result_df, len(result_df)), len(result_df), Counter(grades.tolist())
+    else:
+        raise ValueError(
+            f"Unsupported input format {extension!r} (use .csv, .xlsx, .xls, .parquet, .feather or .arrow)"
+        )
+
+
+def score_file(input_path, output_path, category="general", chunksize=100_000, workers=1, sidecar=True):
+    """
+    Score a product file and write the results table to `output_path`.
+
+    With `workers` other than 1 the file is scored on a process pool
+    (None or 0: one worker per CPU core); the output is the same. Excel
+    input is parsed once into a ``<input>.nutriscore.parquet`` sidecar that
+    later runs load instead, unless `sidecar` is False.
+
+    Returns
+    -------
+    collections.Counter
+        Number of products per Nutri-Score grade.
+    """
+    from .export import result_writer_class
+
+    writer_class = result_writer_class(output_path)
+    blocks = _iter_encoded_blocks(input_path, category, writer_class.encode, chunksize, workers, sidecar)
+    # Read the first block before creating the output, so bad input leaves no empty file
+    first = next(blocks, None)
+
+    grade_counts = Counter()
+    writer = writer_class(output_path)
+    try:
+        for block, n_rows, block_grades in chain([first] if first else [], blocks):
+            with stage("write", n_rows):
+                writer.write_encoded(block, n_rows)
+            grade_counts.update(block_grades)
+    finally:
+        writer.close()
+    return grade_counts
+
+
+def _read_products(path, sidecar=True):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        import pandas as pd
+
+        return pd.read_csv(path)
+    if extension in (".xlsx", ".xls"):
+        from .ingest import read_excel_products
+
+        return read_excel_products(path, sidecar=f"{path}.nutriscore.parquet" if sidecar else None)
+    if extension in (".parquet", ".feather", ".arrow"):
+        from .ingest import read_columnar_products
+
+        return read_columnar_products(path)
+    raise ValueError(
+        f"Unsupported input format {extension!r} (use .csv, .xlsx, .xls, .parquet, .feather or .arrow)"
+    )
+
+
+def rescore_file(input_path, output_path, snapshot_path, category="general", id_column="Product Name",
+                 workers=1, sidecar=True):
+    """
+    Score a product file, reusing unchanged rows from the snapshot of the last run.
+
+    Rows are matched on `id_column`; only new and changed rows are scored
+    (see `rescore_changed`). The results table goes to `output_path` and the
+    new snapshot replaces the one at `snapshot_path`.
+
+    Returns
+    -------
+    (collections.Counter, collections.Counter)
+        Number of products per Nutri-Score grade, and the change counts from
+        `summarize_changes`.
+    """
+    from .export import write_result_frame
+    from .incremental import load_snapshot, rescore_changed, save_snapshot, summarize_changes
+
+    with stage("parse") as parsed:
+        df = _read_products(input_path, sidecar)
+        parsed["rows"] = len(df)
+    previous = load_snapshot(snapshot_path, id_column)
+    with stage("rescore", len(df)):
+        snapshot, changes = rescore_changed(df, category, previous, id_column, workers)
+
+    with stage("write", len(snapshot)):
+        write_result_frame(snapshot, output_path)
+    save_snapshot(snapshot, snapshot_path, id_column)
+    return Counter(snapshot["Nutri-Score Grade"].tolist()), summarize_changes(changes)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m nutriscore", description="Nutri-Score calculator (2023 algorithm)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="score a CSV or Excel file of products")
+    score.add_argument("input", help="product file (.csv, .xlsx, .xls, .parquet, .feather, .arrow)")
+    score.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="results file (.csv, .csv.gz, .csv.zst, .parquet, or .xlsx with one sheet per category)",
+    )
+    score.add_argument(
+        "--category",
+        choices=sorted(CATEGORY_THRESHOLDS),
+        default="general",
+        help="category of all products, or fallback for rows of a 'Category' column (default: general)",
+    )
+    score.add_argument("--chunksize", type=int, default=100_000, help="rows scored at a time (default: 100000)")
+    score.add_argument(
+        "--workers", type=int, default=1, help="worker processes, 0 for one per CPU core (default: 1)"
+    )
+    score.add_argument(
+        "--no-sidecar",
+        dest="sidecar",
+        action="store_false",
+        help="do not write or read a Parquet sidecar next to Excel input",
+    )
+    score.add_argument(
+        "--snapshot",
+        help="snapshot of the last run: only new and changed rows are scored, then the snapshot is updated",
+    )
+    score.add_argument(
+        "--id-column",
+        default="Product Name",
+        help="column identifying products between runs, with --snapshot (default: 'Product Name')",
+    )
+    score.add_argument(
+        "--timings",
+        action="store_true",
+        help="log wall time, rows/s and peak memory of each stage to stderr as JSON lines",
+    )
+    score.add_argument("--profile", metavar="PATH", help="write a cProfile dump of the run to PATH")
+
+    serve = commands.add_parser("serve", help="run a local HTTP scoring service")
+    serve.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8000, help="port to listen on, 0 for any free port (default: 8000)")
+    serve.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=2.0,
+        help="how long a single-product request waits to be scored with others (default: 2)",
+    )
+    serve.add_argument("--max-batch", type=int, default=512, help="products per micro-batch at most (default: 512)")
+    return parser
+
+
+def _serve(args):
+    from .service import serve
+
+    serve(args.host, args.port, args.batch_window_ms / 1000, args.max_batch)
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        return _serve(args)
+
+    change_counts = None
+    instrumentation = ExitStack()
+    if args.timings:
+        log_stages_to_stderr()
+        instrumentation.enter_context(record_stages())
+    if args.profile:
+        instrumentation.enter_context(profile_to(args.profile))
+    try:
+        if args.snapshot:
+            grade_counts, change_counts = rescore_file(
+                args.input, args.output, args.snapshot, args.category, args.id_column, args.workers, args.sidecar
+            )
+        else:
+            grade_counts = score_file(
+                args.input, args.output, args.category, args.chunksize, args.workers, args.sidecar
+            )
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        instrumentation.close()
+
+    summary = ", ".join(f"{grade}: {count}" for grade, count in sorted(grade_counts.items()))
+    print(f"Scored {sum(grade_counts.values())} products -> {args.output} ({summary})", file=sys.stderr)
+    if change_counts is not None:
+        print(
+            f"Since the last snapshot: {change_counts['added']} added, {change_counts['changed']} changed "
+            f"({change_counts['grade changed']} changed grade), {change_counts['removed']} removed",
+            file=sys.stderr,
+        )
+    return 0
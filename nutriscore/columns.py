@@ -0,0 +1,169 @@
+"""
+Column names shared by the scoring engine, the result tables and the app.
+"""
+
+NUTRIENT_COLUMNS = [
+    "Energy (kJ/100 g)", "Sugar (g/100 g)", "Saturates (g/100 g)",
+    "Salt (g/100 g)", "Fruits, vegetables, and pulses (%)",
+    "Fibre (g/100 g)", "Protein (g/100 g)"
+]
+
+FLAG_COLUMNS = ["Contains sweeteners", "Is red meat", "is_water"]
+
+TEXT_COLUMNS = ["Product Name", "Category"]
+
+# Every input column the scorer uses
+INPUT_COLUMNS = NUTRIENT_COLUMNS + FLAG_COLUMNS + TEXT_COLUMNS
+
+# Text columns the readers keep without scoring them (the result store groups by "Brand")
+PASSTHROUGH_COLUMNS = ["Brand"]
+
+# Every column the product readers keep
+PRODUCT_COLUMNS = INPUT_COLUMNS + PASSTHROUGH_COLUMNS
+
+# Columns naming the file and worksheet of every product read from several sources
+SOURCE_COLUMNS = ["Source File", "Sheet"]
+
+# Physically possible (min, max) of every nutrient, per 100 g or 100 mL as labelled; values
+# outside cannot be real. Not the manual entry form's bounds, which are a UI choice.
+# - energy: 100 g of pure fat is 3700 kJ at 37 kJ/g (3766 kJ when converted from 900 kcal),
+#   with room for rounding
+# - grams: dense syrups hold more than 100 g per 100 mL (up to about 1.5 g/mL)
+# - fruits, vegetables and pulses: a share of the product
+NUTRIENT_RANGES = {name: (0.0, 150.0) for name in NUTRIENT_COLUMNS}
+NUTRIENT_RANGES["Energy (kJ/100 g)"] = (0.0, 4000.0)
+NUTRIENT_RANGES["Fruits, vegetables, and pulses (%)"] = (0.0, 100.0)
+
+# Cell text read as an empty cell (case-insensitive, surrounding spaces ignored)
+MISSING_VALUES = {"", "n/a", "na", "nan", "none", "null", "-"}
+
+# Flag cell text read as yes / no; empty flag cells are "no", other text is invalid
+TRUE_FLAG_VALUES = {"1", "1.0", "true", "yes", "y"}
+FALSE_FLAG_VALUES = {"0", "0.0", "false", "no", "n"}
+
+COMPONENT_COLUMNS = [
+    "Energy Score", "Sugar Score", "Saturates Score", "Salt Score",
+    "Sweetener Penalty", "Fruit Score", "Fibre Score", "Protein Score"
+]
+
+# Columns returned by the scoring engine, in result-table order
+SCORE_COLUMNS = COMPONENT_COLUMNS + [
+    "Nutri-Score Points", "Nutri-Score Grade", "N-points Total", "P-points Total"
+]
+
+# Columns of the engine results held as int16 (component points are int8)
+TOTAL_COLUMNS = ["Nutri-Score Points", "N-points Total", "P-points Total"]
+
+# Display table: (display column, result column, value if the result column is missing).
+# A missing default means the result column is required.
+DISPLAY_COLUMNS = [
+    ("Water (without any addition)", "Is Water", False),
+    ("Energy (kJ/100 mL or 100 g)", "Energy (kJ/100 g)", None),
+    ("Sugar (g/100 mL or 100 g)", "Sugar (g/100 g)", None),
+    ("Saturates (g/100 mL or 100 g)", "Saturates (g/100 g)", None),
+    ("Salt (g/100 mL or 100 g)", "Salt (g/100 g)", None),
+    ("Presence of non-nutritive sweetener (YES/NO)", "Contains sweeteners", False),
+    ("Fruits, vegetables and legumes (%)", "Fruits, vegetables, and pulses (%)", None),
+    ("Fibre (g/100 mL or 100 g)", "Fibre (g/100 g)", None),
+    ("Protein (g/100 mL or 100 g)", "Protein (g/100 g)", None),
+    ("Energy points", "Energy Score", None),
+    ("Sugar points", "Sugar Score", None),
+    ("SFA points", "Saturates Score", None),
+    ("Salt points", "Salt Score", None),
+    ("Sweetener Penalty", "Sweetener Penalty", 0),
+    ("FVL points", "Fruit Score", None),
+    ("Fibre points", "Fibre Score", None),
+    ("Protein points", "Protein Score", None),
+    ("Points A", "N-points Total", None),
+    ("Points C", "P-points Total", None),
+    ("Score", "Nutri-Score Points", None),
+    ("Nutri-Score", "Nutri-Score Grade", None),
+]
+
+
+def display_columns(result, n_rows, start=0):
+    """
+    Map scored result columns to the display table layout.
+
+    Parameters
+    ----------
+    result : pandas.DataFrame or dict
+        Columns as produced by `process_dataframe` / `score_columns`.
+    n_rows : int
+        Number of rows in `result`.
+    start : int
+        Number of rows before this block, used to number unnamed products.
+
+    Returns
+    -------
+    dict
+        Display column name -> column values. Optional columns that are
+        missing from `result` come back as a single default value.
+    """
+    columns = {}
+
+    # Product identification
+    if "Product Name" in result:
+        columns["Products"] = result["Product Name"]
+    else:
+        columns["Products"] = [f"Product {start+i+1}" for i in range(n_rows)]
+
+    if "Category" in result:
+        columns["Category"] = result["Category"]
+
+    for name in SOURCE_COLUMNS:
+        if name in result:
+            columns[name] = result[name]
+
+    for display_name, result_name, default in DISPLAY_COLUMNS:
+        if result_name in result or default is None:
+            columns[display_name] = result[result_name]
+        else:
+            columns[display_name] = default
+    return columns
+
+
+# ----------------------------
+# Cell parsing shared by the readers, the validation pass and the row-wise scorer
+# ----------------------------
+def parse_number(cell):
+    """
+    Read a nutrient cell as a float.
+
+    Takes numbers and numeric text; text with one comma and no point is read
+    with a decimal comma ("1,2" is 1.2), and `MISSING_VALUES` read as NaN.
+    Raises ValueError for anything else.
+    """
+    if cell is None:
+        return float("nan")
+    if isinstance(cell, str):
+        text = cell.strip()
+        if text.lower() in MISSING_VALUES:
+            return float("nan")
+        if text.count(",") == 1 and "." not in text:
+            text = text.replace(",", ".")
+        return float(text)
+    return float(cell)
+
+
+def parse_flag(cell):
+    """
+    Read a flag cell ("Contains sweeteners", "Is red meat", "is_water") as a bool.
+
+    Takes bools, 0 and 1, and `TRUE_FLAG_VALUES` / `FALSE_FLAG_VALUES` text
+    (any case); empty cells (None, NaN, `MISSING_VALUES`) are False. Raises
+    ValueError for anything else, so "NO" can no longer read as true.
+    """
+    if cell is None:
+        return False
+    if isinstance(cell, str):
+        text = cell.strip().lower()
+        if text in TRUE_FLAG_VALUES:
+            return True
+        if text in FALSE_FLAG_VALUES or text in MISSING_VALUES:
+            return False
+    elif cell != cell:  # NaN
+        return False
+    elif cell in (0, 1):
+        return bool(cell)
+    raise ValueError(f"Invalid flag value {cell!r} (use yes/no, true/false or 1/0)")
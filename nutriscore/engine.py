@@ -0,0 +1,360 @@
+"""
+Columnar Nutri-Score engine.
+
+Scores whole columns of nutrient values at once with NumPy. Results match
+the row-wise functions in `nutriscore.scoring`; the category rules are
+applied as masks over the columns.
+"""
+
+import numpy as np
+
+from .columns import FLAG_COLUMNS, NUTRIENT_COLUMNS, SCORE_COLUMNS, TOTAL_COLUMNS, parse_flag
+from .instrument import stage
+from .tables import (
+    CATEGORY_ALIASES,
+    CATEGORY_THRESHOLDS,
+    ENERGY_TABLES,
+    FIBRE_TABLES,
+    FRUIT_TABLES,
+    GRADE_TABLES,
+    PROTEIN_TABLES,
+    SALT_TABLES,
+    SAT_FAT_TABLES,
+    SUGAR_TABLES,
+)
+
+
+def get_grade_array(scores, category):
+    """Column-wise counterpart of `get_grade` (without the water rule)."""
+    return GRADE_TABLES[category].lookup_many(scores)
+
+def _column_values(columns, name):
+    return np.asarray(columns[name], dtype=float)
+
+def _flag_values(columns, name, n_rows):
+    # Same reading as `parse_flag` in the row-wise functions; validated input is already bool
+    if name not in columns:
+        return np.zeros(n_rows, dtype=bool)
+    values = np.asarray(columns[name])
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in "iuf":
+        with np.errstate(invalid="ignore"):
+            invalid = ~np.isnan(values) & (values != 0) & (values != 1)
+        if invalid.any():
+            parse_flag(values[invalid][0])  # raises ValueError
+        return values == 1
+    return np.array([parse_flag(value) for value in values], dtype=bool)
+
+def combine_points(energy, sugar, saturates, salt, sweetener, fruit, fibre, protein, category):
+    """
+    N and P totals and the final points from component points (arrays of any shape).
+
+    Returns (n_total, p_total, score) as int16 arrays, applying the N/P
+    protein rule: protein only counts below 11 N points for foods and 7
+    for fats.
+    """
+    # Totals in int16 so sums of int8 points cannot overflow
+    n_total = np.asarray(energy).astype(np.int16) + sugar + saturates + salt + sweetener
+    fruit_fibre = np.asarray(fruit).astype(np.int16) + fibre
+    p_total = fruit_fibre + protein
+
+    if category == "drink":
+        score = n_total - p_total
+    else:
+        n_threshold = 7 if category == "fat" else 11
+        score = np.where(n_total >= n_threshold, n_total - fruit_fibre, n_total - p_total)
+    return n_total, p_total, score
+
+def score_columns(columns, category):
+    """
+    Calculate component points, totals and grades for many products at once.
+
+    Parameters
+    ----------
+    columns : pandas.DataFrame or dict
+        Nutrient columns (see `NUTRIENT_COLUMNS`) and optional flag columns
+        ("Contains sweeteners", "Is red meat", "is_water"), one value per product.
+    category : str
+        Product category ("general", "drink", "fat").
+
+    Returns
+    -------
+    dict
+        Arrays keyed by the result column names used in `process_dataframe`:
+        int8 component points, int16 totals and object grades.
+
+    Notes
+    -----
+    Gives the same numbers as `get_individual_scores`, `compute_score` and
+    `get_grade`; the category rules are applied as masks over whole columns.
+    """
+    energy = _column_values(columns, "Energy (kJ/100 g)")
+    saturates = _column_values(columns, "Saturates (g/100 g)")
+    n_rows = len(energy)
+
+    # N-component scores
+    if category == "fat":
+        energy_points = ENERGY_TABLES[category].lookup_many(saturates * 37)
+    else:
+        energy_points = ENERGY_TABLES[category].lookup_many(energy)
+
+    sugar_points = SUGAR_TABLES[category].lookup_many(_column_values(columns, "Sugar (g/100 g)"))
+    sat_fat_points = SAT_FAT_TABLES[category].lookup_many(saturates)
+    salt_points = SALT_TABLES[category].lookup_many(_column_values(columns, "Salt (g/100 g)"))
+
+    # Sweetener penalty for beverages
+    if category == "drink":
+        sweetener_points = np.where(_flag_values(columns, "Contains sweeteners", n_rows), np.int8(4), np.int8(0))
+    else:
+        sweetener_points = np.zeros(n_rows, dtype=np.int8)
+
+    # P-component scores
+    fruit_points = FRUIT_TABLES[category].lookup_many(
+        _column_values(columns, "Fruits, vegetables, and pulses (%)")
+    )
+    fibre_points = FIBRE_TABLES[category].lookup_many(_column_values(columns, "Fibre (g/100 g)"))
+    protein_points = PROTEIN_TABLES[category].lookup_many(_column_values(columns, "Protein (g/100 g)"))
+
+    # Red meat protein cap
+    if category == "general":
+        is_red_meat = _flag_values(columns, "Is red meat", n_rows)
+        protein_points = np.where(is_red_meat, np.minimum(protein_points, 2), protein_points)
+
+    n_total, p_total, score = combine_points(
+        energy_points, sugar_points, sat_fat_points, salt_points, sweetener_points,
+        fruit_points, fibre_points, protein_points, category,
+    )
+
+    with stage("grade", n_rows):
+        grade = get_grade_array(score, category)
+
+    # Water is always 0 points and grade A
+    if category == "drink":
+        is_water = _flag_values(columns, "is_water", n_rows)
+        score = np.where(is_water, 0, score)
+        grade = np.where(is_water, "A", grade)
+
+    return {
+        "Energy Score": energy_points,
+        "Sugar Score": sugar_points,
+        "Saturates Score": sat_fat_points,
+        "Salt Score": salt_points,
+        "Sweetener Penalty": sweetener_points,
+        "Fruit Score": fruit_points,
+        "Fibre Score": fibre_points,
+        "Protein Score": protein_points,
+        "Nutri-Score Points": score,
+        "Nutri-Score Grade": grade,
+        "N-points Total": n_total,
+        "P-points Total": p_total,
+    }
+
+# Tables that read each nutrient column, and the factor applied to it first
+_NUTRIENT_LOOKUPS = {
+    "Energy (kJ/100 g)": [(ENERGY_TABLES, 1)],
+    "Sugar (g/100 g)": [(SUGAR_TABLES, 1)],
+    "Saturates (g/100 g)": [(SAT_FAT_TABLES, 1), ({"fat": ENERGY_TABLES["fat"]}, 37)],
+    "Salt (g/100 g)": [(SALT_TABLES, 1)],
+    "Fruits, vegetables, and pulses (%)": [(FRUIT_TABLES, 1)],
+    "Fibre (g/100 g)": [(FIBRE_TABLES, 1)],
+    "Protein (g/100 g)": [(PROTEIN_TABLES, 1)],
+}
+
+def float32_preserves_scores(name, values):
+    """
+    Return True if the nutrient column `name` can be stored as float32.
+
+    Rounding to float32 can move a value across a bin edge (e.g. 0.5 g of
+    sugar for drinks is exact, 3.4 g for foods is not); the column qualifies
+    only if every value lands in the same bin of every category's table.
+    """
+    values = np.asarray(values, dtype=float)
+    narrowed = values.astype(np.float32).astype(float)
+    for tables, factor in _NUTRIENT_LOOKUPS[name]:
+        for table in tables.values():
+            if not np.array_equal(table.lookup_many(values * factor), table.lookup_many(narrowed * factor)):
+                return False
+    return True
+
+# ----------------------------
+# Mixed-category batches
+# ----------------------------
+def resolve_category_labels(labels, default_category):
+    """
+    Translate distinct "Category" cell values into category keys.
+
+    Labels may be a key such as "drink" or a `CATEGORY_MAP` label (any case);
+    empty labels map to `default_category`. Unknown labels raise ValueError.
+    """
+    resolved = []
+    unknown = []
+    for label in labels:
+        text = "" if label is None else str(label).strip()
+        key = CATEGORY_ALIASES.get(text.lower())
+        if key is None and text:
+            unknown.append(text)
+        resolved.append(key or default_category)
+    if unknown:
+        raise ValueError(f"Unknown categories: {', '.join(unknown)}")
+    return resolved
+
+def resolve_category_values(values, default_category):
+    """Return the category key for every cell of a column of category labels (text)."""
+    labels, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return np.array(resolve_category_labels(labels, default_category), dtype=object)[codes]
+
+def _result_dtype(name):
+    if name == "Nutri-Score Grade":
+        return object
+    return np.int16 if name in TOTAL_COLUMNS else np.int8
+
+def score_columns_by_category(columns, categories):
+    """
+    Score rows of several categories, each category in one bulk pass.
+
+    Rows are partitioned by `categories`, every partition is scored by
+    `score_columns` with its own tables and thresholds, and the results are
+    written back in the original row order.
+    """
+    categories = np.asarray(categories, dtype=object)
+    masks = {category: categories == category for category in CATEGORY_THRESHOLDS}
+    present = [category for category, mask in masks.items() if mask.any()]
+    if len(present) == 1 and masks[present[0]].all():
+        return score_columns(columns, present[0])
+
+    needed = [name for name in NUTRIENT_COLUMNS + FLAG_COLUMNS if name in columns]
+    arrays = {name: np.asarray(columns[name]) for name in needed}
+
+    results = {
+        name: np.empty(len(categories), dtype=_result_dtype(name))
+        for name in SCORE_COLUMNS
+    }
+    for category in present:
+        mask = masks[category]
+        part = score_columns({name: values[mask] for name, values in arrays.items()}, category)
+        for name, values in part.items():
+            results[name][mask] = values
+    return results
+
+# ----------------------------
+# Deduplicated scoring
+# ----------------------------
+# Skip the broadcast when fewer than half of the rows repeat an earlier profile
+DEDUPE_MAX_UNIQUE_FRACTION = 0.5
+# Large tables are first probed with a random 1/8 sample: if 90% of the sampled
+# rows are distinct, grouping the whole table would not pay for itself
+DEDUPE_SAMPLE_STEP = 8
+DEDUPE_MAX_SAMPLE_UNIQUE_FRACTION = 0.9
+DEDUPE_MIN_SAMPLE = 1_000
+
+_KEY_MULTIPLIER = np.uint64(0xFF51AFD7ED558CCD)
+_KEY_SHIFT = np.uint64(33)
+
+def _profile_arrays(columns, n_rows):
+    arrays = {name: _column_values(columns, name) for name in NUTRIENT_COLUMNS}
+    arrays.update({name: _flag_values(columns, name, n_rows) for name in FLAG_COLUMNS})
+    return arrays
+
+def _bits(values):
+    # Compare floats by bit pattern so NaN rows group with each other
+    return values.view(np.uint64) if values.dtype == np.float64 else values
+
+def profile_keys(arrays):
+    """Hash the values of every row of equally long arrays into one uint64 key."""
+    keys = np.zeros(len(next(iter(arrays.values()))), dtype=np.uint64)
+    for values in arrays.values():
+        keys ^= _bits(values).astype(np.uint64, copy=False)
+        keys *= _KEY_MULTIPLIER
+        keys ^= keys >> _KEY_SHIFT
+    return keys
+
+def _factorize_keys(keys):
+    return np.unique(keys, return_inverse=True)[1]
+
+def _mostly_unique(keys, factorize):
+    sample_size = len(keys) // DEDUPE_SAMPLE_STEP
+    if sample_size < DEDUPE_MIN_SAMPLE:
+        return False
+    sample = keys[np.random.default_rng(0).choice(len(keys), sample_size, replace=False)]
+    return int(np.max(factorize(sample))) + 1 > DEDUPE_MAX_SAMPLE_UNIQUE_FRACTION * sample_size
+
+def score_unique_profiles(columns, categories, factorize=None):
+    """
+    Score each distinct (nutrients, flags, category) tuple once.
+
+    Pack-size variants and relabelled clones share their nutrition rows; the
+    rows are grouped by a hash of the tuple, one representative per group is
+    scored with `score_columns_by_category` and the results are broadcast
+    back to every row. Tables with mostly unique rows, or where two different
+    tuples share a hash, are scored row by row instead.
+
+    Parameters
+    ----------
+    columns : pandas.DataFrame or dict
+        Nutrient and optional flag columns, as for `score_columns`.
+    categories : array-like
+        Category key of every row.
+    factorize : callable, optional
+        Maps the uint64 row keys to group codes 0..k-1 (`pandas.factorize`
+        is much faster than the default `numpy.unique` on large tables).
+    """
+    categories = np.asarray(categories, dtype=object)
+    n_rows = len(categories)
+    arrays = _profile_arrays(columns, n_rows)
+    if n_rows < 2:
+        return score_columns_by_category(arrays, categories)
+
+    category_codes = np.zeros(n_rows, dtype=np.uint8)
+    for code, category in enumerate(CATEGORY_THRESHOLDS):
+        category_codes[categories == category] = code
+    arrays["Category"] = category_codes
+
+    factorize = factorize or _factorize_keys
+    keys = profile_keys(arrays)
+    if _mostly_unique(keys, factorize):
+        return score_columns_by_category(arrays, categories)
+
+    codes = np.asarray(factorize(keys))
+    n_unique = int(codes.max()) + 1
+    if n_unique > DEDUPE_MAX_UNIQUE_FRACTION * n_rows:
+        return score_columns_by_category(arrays, categories)
+
+    # First row of every group (reverse order so the earliest index wins)
+    first = np.empty(n_unique, dtype=np.intp)
+    first[codes[::-1]] = np.arange(n_rows - 1, -1, -1)
+    representative = first[codes]
+    if not all(np.array_equal(_bits(values)[representative], _bits(values)) for values in arrays.values()):
+        return score_columns_by_category(arrays, categories)  # hash collision
+
+    unique_scores = score_columns_by_category(
+        {name: values[first] for name, values in arrays.items()}, categories[first]
+    )
+    return {name: values[codes] for name, values in unique_scores.items()}
+
+def score_table(columns, category):
+    """
+    Score a table given as plain column arrays, without pandas.
+
+    Returns the same columns as `process_dataframe` (nutrients, flags,
+    "Product Name" and "Category" when given, then the scores) as a dict
+    of arrays.
+    """
+    result = {name: np.asarray(columns[name], dtype=float) for name in NUTRIENT_COLUMNS}
+    for name, result_name in (("Contains sweeteners", "Contains sweeteners"),
+                              ("Is red meat", "Is red meat"),
+                              ("is_water", "Is Water"),
+                              ("Product Name", "Product Name")):
+        if name in columns:
+            result[result_name] = columns[name]
+
+    n_rows = len(result[NUTRIENT_COLUMNS[0]])
+    if "Category" in columns:
+        categories = resolve_category_values(columns["Category"], category)
+    else:
+        categories = np.full(n_rows, category, dtype=object)
+    result["Category"] = categories
+
+    with stage("score", n_rows):
+        result.update(score_unique_profiles(columns, categories))
+    return result
@@ -0,0 +1,302 @@
+"""
+Writers for scored results.
+
+Results are written block by block in the display table layout, so large
+inputs can be scored and saved without holding the whole table in memory.
+Each writer splits a write into `encode` (pure, can run in a worker
+process) and `write_encoded` (appends to the file, in order). Writers take
+a path (the format follows its suffix, see `RESULT_WRITERS`) or a binary
+file object.
+"""
+
+import csv
+import gzip
+import io
+import os
+
+from .columns import display_columns
+
+# Compression of CSV output by file name suffix
+CSV_COMPRESSIONS = {".csv": None, ".csv.gz": "gzip", ".csv.zst": "zstd"}
+GZIP_LEVEL = 6  # zlib's default: output close to level 9 in size, several times faster
+ZSTD_LEVEL = 3
+
+# Rows per block when a whole result frame is written (see `write_result_frame`)
+WRITE_BLOCK_ROWS = 100_000
+
+
+def _as_list(values, n_rows):
+    if isinstance(values, (str, bool, int, float)):
+        return [values] * n_rows
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def _compressed_stream(raw, compression):
+    # Closing the returned stream finishes the compressed data but leaves `raw` open
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("Writing .zst files requires zstandard (pip install zstandard)") from e
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+
+
+def _suffix_of(path, suffixes):
+    name = os.fspath(path).lower()
+    matches = [suffix for suffix in suffixes if name.endswith(suffix)]
+    return max(matches, key=len) if matches else os.path.splitext(name)[1]
+
+
+class CsvResultWriter:
+    """
+    Write result blocks to a CSV file, header first.
+
+    Output is gzip- or zstd-compressed on the fly for ``.csv.gz`` and
+    ``.csv.zst`` paths (or with `compression` "gzip" / "zstd" for file
+    objects); zstd needs the optional zstandard package.
+    """
+
+    def __init__(self, target, compression=None):
+        self._owns_file = isinstance(target, (str, os.PathLike))
+        if self._owns_file:
+            compression = CSV_COMPRESSIONS.get(_suffix_of(target, CSV_COMPRESSIONS))
+            target = open(target, "wb")
+        self._raw = target
+        try:
+            self._stream = _compressed_stream(target, compression) if compression else None
+        except RuntimeError:
+            if self._owns_file:
+                target.close()
+            raise
+        self._file = io.TextIOWrapper(self._stream or target, encoding="utf-8", newline="")
+        self.rows_written = 0
+
+    @staticmethod
+    def encode(result, n_rows, start=0):
+        """Format a result block as (header line, CSV text of the rows)."""
+        columns = display_columns(result, n_rows, start)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        header_end = buffer.tell()
+        writer.writerows(zip(*(_as_list(values, n_rows) for values in columns.values())))
+        text = buffer.getvalue()
+        return text[:header_end], text[header_end:]
+
+    def write_encoded(self, block, n_rows):
+        header, rows = block
+        if self.rows_written == 0:
+            self._file.write(header)
+        self._file.write(rows)
+        self.rows_written += n_rows
+
+    def write(self, result, n_rows):
+        self.write_encoded(self.encode(result, n_rows, self.rows_written), n_rows)
+
+    def close(self):
+        self._file.flush()
+        self._file.detach()  # leaves the file (or compressor) open
+        if self._stream is not None:
+            self._stream.close()
+        if self._owns_file:
+            self._raw.close()
+
+
+# Narrow Parquet types for the display columns (points fit in int8, totals in int16)
+_POINT_COLUMNS = [
+    "Energy points", "Sugar points", "SFA points", "Salt points", "Sweetener Penalty",
+    "FVL points", "Fibre points", "Protein points",
+]
+_TOTAL_COLUMNS = ["Points A", "Points C", "Score"]
+_DICTIONARY_COLUMNS = ["Nutri-Score", "Category"]
+
+
+def compact_arrow_table(table):
+    """Cast a results table to compact types: int8 points, int16 totals, dictionary-encoded grades."""
+    import pyarrow as pa
+
+    compact_types = {
+        **{name: pa.int8() for name in _POINT_COLUMNS},
+        **{name: pa.int16() for name in _TOTAL_COLUMNS},
+        **{name: pa.dictionary(pa.int8(), pa.string()) for name in _DICTIONARY_COLUMNS},
+    }
+    fields = [
+        field.with_type(compact_types[field.name]) if field.name in compact_types else field
+        for field in table.schema
+    ]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def parquet_bytes(display_df):
+    """Return a results table (as built by `build_display_frame`) as compact Parquet file bytes."""
+    pa = _import_pyarrow()
+    table = compact_arrow_table(pa.Table.from_pandas(display_df, preserve_index=False))
+    buffer = io.BytesIO()
+    pa.parquet.write_table(table, buffer)
+    return buffer.getvalue()
+
+
+class ParquetResultWriter:
+    """Write result blocks to a Parquet file as row groups (needs pyarrow)."""
+
+    def __init__(self, target):
+        self._pq = _import_pyarrow().parquet
+        self._path = target
+        self._writer = None
+        self.rows_written = 0
+
+    @staticmethod
+    def encode(result, n_rows, start=0):
+        """Convert a result block to a compact pyarrow Table."""
+        pa = _import_pyarrow()
+        columns = display_columns(result, n_rows, start)
+        return compact_arrow_table(pa.table({
+            # from_pandas: NaN in text columns becomes a null
+            name: pa.array(values if hasattr(values, "dtype") else _as_list(values, n_rows), from_pandas=True)
+            for name, values in columns.items()
+        }))
+
+    def write_encoded(self, table, n_rows):
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+        self.rows_written += n_rows
+
+    def write(self, result, n_rows):
+        self.write_encoded(self.encode(result, n_rows, self.rows_written), n_rows)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Writing Parquet files requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+# Worksheet titles of the categories (Excel allows at most 31 characters)
+SHEET_TITLES = {"general": "General food", "fat": "Fats, oils, nuts and seeds", "drink": "Beverages"}
+EXCEL_MAX_ROWS = 1_048_576  # per worksheet, header included
+
+
+def _excel_cells(values, n_rows):
+    cells = _as_list(values, n_rows)
+    if getattr(getattr(values, "dtype", None), "kind", None) == "O":
+        return [None if cell != cell else cell for cell in cells]  # missing names are NaN
+    return cells
+
+
+class XlsxResultWriter:
+    """
+    Write result blocks to an Excel workbook, one worksheet per category.
+
+    Uses openpyxl's write-only mode, which streams rows to temporary files
+    instead of building the workbook in memory. A category with more rows
+    than a worksheet holds continues on "<title> (2)" and so on; worksheets
+    are added in the order their categories first appear.
+    """
+
+    def __init__(self, target):
+        from openpyxl import Workbook
+
+        self._target = target
+        self._workbook = Workbook(write_only=True)
+        self._sheets = {}  # category -> [worksheet, rows used, part number]
+        self.rows_written = 0
+
+    @staticmethod
+    def encode(result, n_rows, start=0):
+        """Format a result block as (header, {category: rows}), in the order the rows came."""
+        columns = display_columns(result, n_rows, start)
+        rows = zip(*(_excel_cells(values, n_rows) for values in columns.values()))
+        by_category = {}
+        for category, row in zip(_as_list(columns["Category"], n_rows), rows):
+            by_category.setdefault(category, []).append(row)
+        return list(columns), by_category
+
+    def _add_sheet(self, category, header, part):
+        title = SHEET_TITLES.get(category, str(category)[:31])
+        worksheet = self._workbook.create_sheet(title if part == 1 else f"{title[:26]} ({part})")
+        worksheet.append(header)
+        self._sheets[category] = [worksheet, 1, part]
+        return self._sheets[category]
+
+    def write_encoded(self, block, n_rows):
+        header, by_category = block
+        for category, rows in by_category.items():
+            done = 0
+            while done < len(rows):
+                sheet = self._sheets.get(category)
+                if sheet is None or sheet[1] == EXCEL_MAX_ROWS:
+                    sheet = self._add_sheet(category, header, 1 if sheet is None else sheet[2] + 1)
+                take = min(len(rows) - done, EXCEL_MAX_ROWS - sheet[1])
+                append = sheet[0].append
+                for row in rows[done:done + take]:
+                    append(row)
+                sheet[1] += take
+                done += take
+        self.rows_written += n_rows
+
+    def write(self, result, n_rows):
+        self.write_encoded(self.encode(result, n_rows, self.rows_written), n_rows)
+
+    def close(self):
+        if not self._sheets:
+            self._workbook.create_sheet("Results")  # a workbook needs a worksheet
+        self._workbook.save(self._target)
+
+
+RESULT_WRITERS = {
+    ".csv": CsvResultWriter,
+    ".csv.gz": CsvResultWriter,
+    ".csv.zst": CsvResultWriter,
+    ".parquet": ParquetResultWriter,
+    ".xlsx": XlsxResultWriter,
+}
+
+
+def result_writer_class(path):
+    """Return the result writer class for `path`, chosen by its file name suffix."""
+    suffix = _suffix_of(path, RESULT_WRITERS)
+    if suffix not in RESULT_WRITERS:
+        raise ValueError(
+            f"Unsupported output format {suffix!r} (use {', '.join(RESULT_WRITERS)})"
+        )
+    return RESULT_WRITERS[suffix]
+
+
+def open_result_writer(target, suffix=None):
+    """
+    Return a result writer for `target`, chosen by the suffix of its path.
+
+    For a binary file object give the `suffix` (e.g. ".csv.gz") instead.
+    """
+    suffix = suffix or _suffix_of(target, RESULT_WRITERS)
+    writer_class = result_writer_class(suffix)
+    if suffix in CSV_COMPRESSIONS:
+        return writer_class(target, CSV_COMPRESSIONS[suffix])
+    return writer_class(target)
+
+
+def write_result_frame(result_df, target, suffix=None, block_rows=WRITE_BLOCK_ROWS):
+    """
+    Write a whole result frame, `block_rows` rows at a time (see `open_result_writer`).
+
+    The writers never hold more than one encoded block, so exporting a large
+    table takes little memory beyond the table itself.
+    """
+    writer = open_result_writer(target, suffix)
+    try:
+        for start in range(0, len(result_df), block_rows):
+            block = result_df.iloc[start:start + block_rows]
+            writer.write(block, len(block))
+    finally:
+        writer.close()
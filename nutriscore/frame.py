@@ -0,0 +1,299 @@
+"""
+DataFrame front end of the scoring engine.
+
+`process_dataframe` turns a table of products into the scored result table,
+`build_display_frame` lays it out for display and download, and
+`score_csv_stream` does both chunk by chunk for large CSV files.
+`select_rows` and `summarize_results` back the app's paginated result
+browser, `reformulation_table` lists the reformulation targets of a scored
+table and `sensitivity_table` how close its products are to a grade change.
+`version_table` and `migration_matrix` compare the grades of a scored table
+under several algorithm versions.
+"""
+
+import os
+from collections import Counter
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+
+from .batch import score_batch
+from .columns import COMPONENT_COLUMNS, FLAG_COLUMNS, INPUT_COLUMNS, NUTRIENT_COLUMNS, TOTAL_COLUMNS, display_columns
+from .engine import float32_preserves_scores, resolve_category_labels
+from .instrument import stage
+from .reformulate import boundary_distances, single_nutrient_changes
+from .rules import migration_counts, score_versions
+from .tables import CATEGORY_THRESHOLDS, GRADES
+from .validate import coerce_products, describe_errors, validate_products
+
+
+def resolve_categories(df, default_category):
+    """
+    Return the category key of every row of `df`.
+
+    Rows take their category from an optional "Category" column (a key such
+    as "drink" or a `CATEGORY_MAP` label); empty cells and frames without the
+    column fall back to `default_category`.
+    """
+    if "Category" not in df.columns:
+        return np.full(len(df), default_category, dtype=object)
+
+    codes, labels = pd.factorize(df["Category"])
+    lookup = np.array(resolve_category_labels(labels, default_category) + [default_category], dtype=object)
+    return lookup[codes]  # code -1 (empty cell) picks the default
+
+def _factorize_keys(keys):
+    return pd.factorize(keys)[0]
+
+def process_dataframe(df, category, dedupe=True, float32_nutrients=False, validate=False):
+    """Process a dataframe to calculate Nutri-Score values.
+
+    `category` applies to every row unless the frame has a "Category" column,
+    in which case it is only the fallback for rows left empty there. With
+    `dedupe`, rows sharing the same nutrients, flags and category are scored
+    once (see `score_unique_profiles`). Scoring itself is `score_batch`;
+    this function adds the pandas validation report and the result table.
+
+    Cells are read like `validate_products` reads them (comma decimals,
+    yes/no flags), but every row is scored: empty or unreadable nutrients
+    get the most unfavourable points and out-of-range values are scored as
+    given (see `coerce_products`). With `validate`, a frame with unusable
+    cells raises ValueError naming them instead; callers that want to score
+    the valid rows anyway call `validate_products` themselves.
+
+    The result is compact: int8 component points, int16 totals, bool flags
+    and categorical categories and grades (ordered A-E), about 75 bytes per
+    row besides the product names. With `float32_nutrients` the nutrient
+    columns are stored as float32 wherever that changes no score (down to
+    about 47 bytes per row)."""
+    n_rows = len(df)
+    with stage("validate", n_rows):
+        if validate:
+            df, errors = validate_products(df)
+            if len(errors):
+                raise ValueError(describe_errors(errors))
+        else:
+            df = coerce_products(df)
+
+    with stage("copy inputs", n_rows):
+        # Include original nutrient values
+        raw_nutrients = df[NUTRIENT_COLUMNS].copy()
+        if float32_nutrients:
+            for name in NUTRIENT_COLUMNS:
+                if float32_preserves_scores(name, raw_nutrients[name]):
+                    raw_nutrients[name] = raw_nutrients[name].astype(np.float32)
+
+        # Add flags if they exist
+        if "Contains sweeteners" in df.columns:
+            raw_nutrients["Contains sweeteners"] = df["Contains sweeteners"]
+        if "Is red meat" in df.columns:
+            raw_nutrients["Is red meat"] = df["Is red meat"]
+        if "is_water" in df.columns:
+            raw_nutrients["Is Water"] = df["is_water"]
+
+        # Add product name if it exists
+        if "Product Name" in df.columns:
+            raw_nutrients["Product Name"] = df["Product Name"]
+
+    with stage("resolve categories", n_rows):
+        categories = resolve_categories(df, category)
+        raw_nutrients["Category"] = pd.Categorical(categories, categories=list(CATEGORY_THRESHOLDS))
+
+    # Component scores, final score, grade and N/P totals in one columnar pass
+    with stage("score", n_rows):
+        columns = {name: df[name].to_numpy() for name in NUTRIENT_COLUMNS + FLAG_COLUMNS if name in df.columns}
+        scores = score_batch(columns, categories, dedupe=dedupe, factorize=_factorize_keys, check=False)
+        del scores["Category"]
+
+    # Combine everything
+    with stage("combine", n_rows):
+        scores["Nutri-Score Grade"] = pd.Categorical(scores["Nutri-Score Grade"], categories=GRADES, ordered=True)
+        component_df = pd.DataFrame(scores, index=df.index)
+        return pd.concat([raw_nutrients, component_df], axis=1)
+
+def score_csv_stream(source, destination, category, chunksize=100_000):
+    """
+    Score a CSV file chunk by chunk, appending results to `destination`.
+
+    Only one chunk is held in memory at a time, so memory use depends on
+    `chunksize` rather than on the size of the file.
+
+    Parameters
+    ----------
+    source : str or file-like
+        CSV file with the `NUTRIENT_COLUMNS` and optional flag columns;
+        unusable cells raise ValueError (see `validate_products`).
+    destination : str or file-like
+        Where the results table (as built by `build_display_frame`) is written.
+    category : str
+        Product category, or fallback for rows of a "Category" column.
+    chunksize : int
+        Number of rows read and scored at a time.
+
+    Returns
+    -------
+    collections.Counter
+        Running count of products per Nutri-Score grade.
+    """
+    wanted = set(INPUT_COLUMNS)
+    grade_counts = Counter()
+    rows_done = 0
+
+    with ExitStack() as stack:
+        if isinstance(destination, (str, os.PathLike)):
+            destination = stack.enter_context(open(destination, "w", newline="", encoding="utf-8"))
+
+        for chunk in pd.read_csv(source, chunksize=chunksize, usecols=lambda col: col in wanted):
+            missing_columns = [col for col in NUTRIENT_COLUMNS if col not in chunk.columns]
+            if missing_columns:
+                raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+            result_df = process_dataframe(chunk, category, validate=True)
+            build_display_frame(result_df, start=rows_done).to_csv(
+                destination, header=rows_done == 0, index=False
+            )
+            grade_counts.update(result_df["Nutri-Score Grade"].tolist())
+            rows_done += len(chunk)
+
+    return grade_counts
+
+def build_display_frame(result_df, start=0):
+    """
+    Build the results table shown in the app and offered as download.
+
+    Parameters
+    ----------
+    result_df : pandas.DataFrame
+        DataFrame with computed Nutri-Score results.
+    start : int
+        Number of rows before this frame, used to number unnamed products
+        when results are built chunk by chunk.
+    """
+    # copy=False: the display table shares the result's column buffers
+    return pd.DataFrame(display_columns(result_df, len(result_df), start), index=result_df.index, copy=False)
+
+# ----------------------------
+# Result browsing
+# ----------------------------
+# Sort options of the result browser: option -> display table column
+SORT_COLUMNS = {"Grade": "Nutri-Score", "Score": "Score", "Product name": "Products"}
+
+def select_rows(display_df, grades=None, name_contains="", sort_by=None, descending=False):
+    """
+    Return the positions of the display-table rows to show, in order.
+
+    Parameters
+    ----------
+    display_df : pandas.DataFrame
+        Table built by `build_display_frame`.
+    grades : list of str, optional
+        Keep only these Nutri-Score grades.
+    name_contains : str
+        Keep only products whose name contains this text (any case).
+    sort_by : str, optional
+        A `SORT_COLUMNS` option; rows keep their order otherwise (ties too).
+    descending : bool
+        Sort from the highest grade letter, score or name down.
+    """
+    keep = np.ones(len(display_df), dtype=bool)
+    if grades:
+        keep &= display_df["Nutri-Score"].isin(grades).to_numpy()
+    if name_contains:
+        names = display_df["Products"].astype("string")
+        keep &= names.str.contains(name_contains, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+    positions = np.flatnonzero(keep)
+
+    if sort_by is not None:
+        values = display_df[SORT_COLUMNS[sort_by]].iloc[positions].reset_index(drop=True)
+        order = values.sort_values(ascending=not descending, kind="stable").index.to_numpy()
+        positions = positions[order]
+    return positions
+
+def summarize_results(result_df):
+    """
+    Summary statistics of a scored table.
+
+    Returns the grade distribution (a DataFrame with "Products" and "Share"
+    for every grade A-E, zero counts included) and the mean points of every
+    component and total (a Series).
+    """
+    counts = pd.Series(pd.Categorical(result_df["Nutri-Score Grade"], categories=GRADES)).value_counts(sort=False)
+    distribution = pd.DataFrame({"Products": counts, "Share": counts / max(len(result_df), 1)})
+    distribution.index.name = "Nutri-Score"
+    return distribution, result_df[COMPONENT_COLUMNS + TOTAL_COLUMNS].mean()
+
+def _result_columns(result_df):
+    """Nutrient and flag columns of a scored table, as the solver functions of `reformulate` take them."""
+    columns = {name: result_df[name].to_numpy(dtype=float) for name in NUTRIENT_COLUMNS}
+    for name, source in (("Contains sweeteners", "Contains sweeteners"), ("Is red meat", "Is red meat"),
+                         ("is_water", "Is Water")):
+        if source in result_df.columns:
+            columns[name] = result_df[source].to_numpy(dtype=bool)
+    return columns
+
+
+def _identity_columns(result_df):
+    return result_df[[col for col in ("Product Name", "Category", "Nutri-Score Grade") if col in result_df.columns]]
+
+
+def reformulation_table(result_df, target_grade):
+    """
+    Smallest change of each nutrient alone that brings every scored product to `target_grade`.
+
+    Returns "Product Name" (if present), "Category" and "Nutri-Score Grade"
+    of `result_df` plus a "<nutrient> change" column per nutrient (see
+    `single_nutrient_changes`: 0 for products already there, NaN where the
+    nutrient alone cannot get the product there).
+    """
+    with stage("reformulation", len(result_df)):
+        changes = single_nutrient_changes(
+            _result_columns(result_df), result_df["Category"].to_numpy(dtype=object), target_grade
+        )
+    return _identity_columns(result_df).assign(**{f"{name} change": values for name, values in changes.items()})
+
+
+def sensitivity_table(result_df):
+    """
+    How close every scored product is to a bin edge or grade band.
+
+    Returns "Product Name" (if present), "Category" and "Nutri-Score Grade"
+    of `result_df` plus the `boundary_distances` columns: per nutrient the
+    margin down and up to the next bin edge and the grade past it, and the
+    points to the better and worse grade.
+    """
+    with stage("sensitivity", len(result_df)):
+        distances = boundary_distances(_result_columns(result_df), result_df["Category"].to_numpy(dtype=object))
+    return _identity_columns(result_df).assign(**distances)
+
+
+# ----------------------------
+# Algorithm versions
+# ----------------------------
+def version_table(result_df, versions):
+    """
+    Points and grade of every scored product under several `RULE_PACKS` versions.
+
+    Returns "Product Name" (if present), "Category" and, per version, the
+    "Nutri-Score Points (<version>)" and "Nutri-Score Grade (<version>)"
+    columns (grades categorical, ordered A-E). All versions are scored in
+    one pass over the inputs of `result_df` (see `score_versions`).
+    """
+    with stage("versions", len(result_df)):
+        scores = score_versions(_result_columns(result_df), result_df["Category"].to_numpy(dtype=object), versions)
+    table = result_df[[col for col in ("Product Name", "Category") if col in result_df.columns]]
+    columns = {}
+    for version, version_scores in scores.items():
+        columns[f"Nutri-Score Points ({version})"] = version_scores["Nutri-Score Points"]
+        columns[f"Nutri-Score Grade ({version})"] = pd.Categorical(
+            version_scores["Nutri-Score Grade"], categories=GRADES, ordered=True
+        )
+    return table.assign(**columns)
+
+def migration_matrix(table, from_version, to_version):
+    """Products per grade under `from_version` (rows) and `to_version` (columns) of a `version_table`."""
+    counts = migration_counts(
+        table[f"Nutri-Score Grade ({from_version})"].to_numpy(dtype=object),
+        table[f"Nutri-Score Grade ({to_version})"].to_numpy(dtype=object),
+    )
+    return pd.DataFrame(counts, index=pd.Index(GRADES, name=from_version), columns=pd.Index(GRADES, name=to_version))
@@ -0,0 +1,194 @@
+"""
+Incremental re-scoring of a catalog against the previous run.
+
+A snapshot is the scored table of the last run plus a fingerprint of every
+row's scoring inputs, keyed by a product ID column ("Product Name" unless
+told otherwise). `rescore_changed` scores only the rows that are new or whose
+fingerprint changed, copies the others from the snapshot, and reports which
+products were added, removed or changed and how their grades moved.
+"""
+
+import os
+import pickle
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from .cache import content_hash
+from .columns import INPUT_COLUMNS, NUTRIENT_COLUMNS
+from .frame import resolve_categories
+from .tables import ALGORITHM_VERSION, CATEGORY_THRESHOLDS
+from .validate import describe_errors, validate_products
+
+DEFAULT_ID_COLUMN = "Product Name"
+FINGERPRINT_COLUMN = "Row Fingerprint"
+
+# Bump when the snapshot layout changes, so older snapshots are ignored
+SNAPSHOT_VERSION = "2"
+
+
+def match_ids(ids, previous_ids):
+    """
+    Find every ID of `ids` in `previous_ids` (both pandas Series).
+
+    Returns the position of each ID in `previous_ids`, or -1 for new IDs.
+    Raises ValueError if `ids` has empty or duplicate values (`previous_ids`
+    comes from a snapshot and is already known to be unique).
+    """
+    # Same products in the same order as last time: nothing to look up
+    if len(ids) == len(previous_ids) and np.array_equal(ids.to_numpy(), previous_ids.to_numpy()):
+        return np.arange(len(ids))
+
+    # One factorization over both columns instead of two hash tables
+    codes, uniques = pd.factorize(pd.concat([previous_ids, ids], ignore_index=True))
+    previous_codes, codes = codes[:len(previous_ids)], codes[len(previous_ids):]
+    if (codes < 0).any():
+        raise ValueError(f"{int((codes < 0).sum())} rows have no {ids.name!r}")
+    counts = np.bincount(codes, minlength=len(uniques))
+    if counts.max(initial=0) > 1:
+        duplicated = uniques[counts > 1]
+        raise ValueError(f"Duplicate values in {ids.name!r}: {', '.join(map(str, duplicated[:5]))}")
+
+    slots = np.full(len(uniques), -1, dtype=np.intp)
+    slots[previous_codes] = np.arange(len(previous_codes))
+    return slots[codes]
+
+
+def row_fingerprints(df, categories, id_column=DEFAULT_ID_COLUMN):
+    """
+    Hash the scoring inputs of every row into a uint64 fingerprint.
+
+    Covers the nutrient, flag and name columns present in `df` (except
+    `id_column`, which keys the rows) and the resolved category of each
+    row. The set of columns and `ALGORITHM_VERSION` are folded in as well,
+    so a new column or a new algorithm changes every fingerprint.
+    """
+    names = [name for name in INPUT_COLUMNS if name in df.columns and name not in ("Category", id_column)]
+    category_codes = np.zeros(len(df), dtype=np.int8)
+    for code, key in enumerate(CATEGORY_THRESHOLDS):
+        category_codes[categories == key] = code
+    inputs = df[names].assign(Category=category_codes)
+    salt = content_hash(repr((ALGORITHM_VERSION, names)).encode())
+    return pd.util.hash_pandas_object(inputs, index=False).to_numpy() ^ np.uint64(int(salt[:16], 16))
+
+
+def rescore_changed(df, category, previous=None, id_column=DEFAULT_ID_COLUMN, workers=1):
+    """
+    Score a catalog, reusing the rows of `previous` whose inputs are unchanged.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The catalog, with the `NUTRIENT_COLUMNS` and a unique `id_column`;
+        unusable cells raise ValueError (see `validate_products`).
+    category : str
+        Product category, or fallback for rows of a "Category" column.
+    previous : pandas.DataFrame, optional
+        Snapshot returned by an earlier call (or `load_snapshot`); without
+        one every row is scored and reported as added.
+    id_column : str
+        Column identifying a product between runs.
+    workers : int
+        Worker processes for the rows that need scoring (see
+        `process_dataframe_parallel`).
+
+    Returns
+    -------
+    snapshot : pandas.DataFrame
+        The `process_dataframe` result for `df` (with `id_column` in front if
+        it is not a result column) plus a `FINGERPRINT_COLUMN`. Pass it as
+        `previous` next time.
+    changes : pandas.DataFrame
+        One row per added, changed or removed product: `id_column`,
+        "Change", "Previous Grade" and "Nutri-Score Grade".
+    """
+    from .parallel import process_dataframe_parallel
+
+    missing_columns = [col for col in NUTRIENT_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+    if id_column not in df.columns:
+        raise ValueError(f"ID column {id_column!r} not found")
+    # Fingerprint the coerced values, so "1,2" and 1.2 count as the same input
+    df, errors = validate_products(df)
+    if len(errors):
+        raise ValueError(describe_errors(errors))
+    ids = df[id_column]
+    if previous is None:
+        previous = pd.DataFrame(columns=[id_column, FINGERPRINT_COLUMN, "Nutri-Score Grade"])
+    positions = match_ids(ids, previous[id_column])
+    fingerprints = row_fingerprints(df, resolve_categories(df, category), id_column)
+    known = positions >= 0
+    unchanged = known.copy()
+    unchanged[known] = previous[FINGERPRINT_COLUMN].to_numpy()[positions[known]] == fingerprints[known]
+
+    # Score the new and changed rows; copy the rest from the snapshot
+    rescored = process_dataframe_parallel(df[~unchanged], category, workers)
+    if id_column not in rescored.columns:
+        rescored.insert(0, id_column, ids[~unchanged].to_numpy())
+    rescored[FINGERPRINT_COLUMN] = fingerprints[~unchanged]
+    if unchanged.any():
+        reused = previous.iloc[positions[unchanged]].set_axis(df.index[unchanged])
+        order = np.argsort(np.concatenate([np.flatnonzero(unchanged), np.flatnonzero(~unchanged)]), kind="stable")
+        snapshot = pd.concat([reused, rescored[reused.columns]]).iloc[order]
+    else:
+        snapshot = rescored
+
+    # Change report: added and changed rows in catalog order, then removed ones
+    was_known = known[~unchanged]
+    previous_grades = previous["Nutri-Score Grade"]
+    grades_before = np.full(len(was_known), None, dtype=object)
+    grades_before[was_known] = previous_grades.iloc[positions[~unchanged][was_known]].to_numpy(dtype=object)
+    removed = np.ones(len(previous), dtype=bool)
+    removed[positions[known]] = False
+    changes = pd.DataFrame({
+        id_column: np.concatenate([
+            ids[~unchanged].to_numpy(dtype=object), previous[id_column][removed].to_numpy(dtype=object)
+        ]),
+        "Change": np.concatenate([np.where(was_known, "changed", "added"), np.full(removed.sum(), "removed")]),
+        "Previous Grade": np.concatenate([grades_before, previous_grades[removed].to_numpy(dtype=object)]),
+        "Nutri-Score Grade": np.concatenate([
+            rescored["Nutri-Score Grade"].to_numpy(dtype=object), np.full(removed.sum(), None, dtype=object)
+        ]),
+    })
+    return snapshot, changes
+
+
+def summarize_changes(changes):
+    """Count the rows of a change report per kind, plus "grade changed" for changed products."""
+    counts = Counter(changes["Change"].tolist())
+    changed = changes[changes["Change"] == "changed"]
+    counts["grade changed"] = int((changed["Previous Grade"] != changed["Nutri-Score Grade"]).sum())
+    return counts
+
+
+def save_snapshot(snapshot, path, id_column=DEFAULT_ID_COLUMN):
+    """Write a snapshot to `path` (pickle, replaced atomically)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"version": SNAPSHOT_VERSION, "id_column": id_column, "frame": snapshot}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_snapshot(path, id_column=DEFAULT_ID_COLUMN):
+    """
+    Load a snapshot written by `save_snapshot`.
+
+    Returns None if there is no file at `path`, or if it was written by
+    another snapshot version or for another ID column (the next run then
+    scores everything).
+    """
+    try:
+        with open(path, "rb") as f:
+            stored = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    if stored.get("version") != SNAPSHOT_VERSION or stored.get("id_column") != id_column:
+        return None
+    return stored["frame"]
@@ -0,0 +1,425 @@
+"""
+Input readers for product files.
+
+`iter_csv_chunks` reads a CSV file with the standard library only, so the
+command line tool can start scoring without importing pandas.
+`read_excel_products` streams only the product columns out of a worksheet
+and keeps a Parquet sidecar so later runs skip parsing the workbook;
+`excel_sheet_names` lists the sheets of a workbook.
+`read_columnar_products` reads Parquet and Arrow IPC (Feather) files,
+loading only the product columns.
+"""
+
+import csv
+import io
+import os
+from itertools import islice
+
+import numpy as np
+
+from .columns import (
+    FLAG_COLUMNS,
+    PASSTHROUGH_COLUMNS,
+    PRODUCT_COLUMNS,
+    NUTRIENT_COLUMNS,
+    NUTRIENT_RANGES,
+    TEXT_COLUMNS,
+    parse_flag,
+    parse_number,
+)
+
+
+def _text_cells(cells):
+    # Unreadable cells are kept as text for `validate_products` to report
+    return np.array([None if cell is None else str(cell) for cell in cells], dtype=object)
+
+
+def _parse_numbers(name, cells, row_numbers, strict):
+    try:
+        return np.array(cells, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    # Slow path: comma decimals and missing-value text, one cell at a time
+    values = np.empty(len(cells), dtype=float)
+    for i, cell in enumerate(cells):
+        try:
+            values[i] = parse_number(cell)
+        except (TypeError, ValueError):
+            if not strict:
+                return _text_cells(cells)
+            raise ValueError(f"Invalid number {cell!r} in column {name!r} (row {row_numbers[i]})") from None
+    return values
+
+
+def _parse_flags(name, cells, row_numbers, strict):
+    values = np.empty(len(cells), dtype=bool)
+    for i, cell in enumerate(cells):
+        try:
+            values[i] = parse_flag(cell)
+        except (TypeError, ValueError):
+            if not strict:
+                return _text_cells(cells)
+            raise ValueError(f"Invalid flag value {cell!r} in column {name!r} (row {row_numbers[i]})") from None
+    return values
+
+
+def _check_nutrients(columns, row_numbers):
+    """Raise ValueError for empty and out-of-range nutrient values (they would be scored wrongly)."""
+    for name in NUTRIENT_COLUMNS:
+        low, high = NUTRIENT_RANGES[name]
+        values = columns[name]
+        with np.errstate(invalid="ignore"):
+            bad = np.isnan(values) | (values < low) | (values > high)
+        if bad.any():
+            first = np.flatnonzero(bad)[0]
+            value = values[first]
+            problem = "missing value" if np.isnan(value) else f"{value:g} outside {low:g} to {high:g}"
+            raise ValueError(
+                f"{int(bad.sum())} invalid values in column {name!r}, first in row {row_numbers[first]}: {problem}"
+            )
+
+
+def check_header(header):
+    """Raise ValueError if a header row lacks any of the `NUTRIENT_COLUMNS`."""
+    missing_columns = [col for col in NUTRIENT_COLUMNS if col not in header]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+
+def is_blank_line(line):
+    """
+    Whether a CSV line is a blank line that `columns_from_rows` skips.
+
+    `csv.reader` yields a row without cells only for an empty line; a line
+    of spaces is a row with one cell, and is scored (or reported) like any
+    other row.
+    """
+    return not line.rstrip("\r\n")
+
+
+def columns_from_rows(header, rows, first_row=2, strict=True):
+    """
+    Turn parsed CSV rows (or worksheet rows) into typed column arrays.
+
+    Returns a dict of column name -> NumPy array (float nutrients, bool flags,
+    text for names, categories and `PASSTHROUGH_COLUMNS`), or None if `rows` only holds blank lines.
+    Cells are read with `parse_number` and `parse_flag`. With `strict`,
+    unreadable cells and empty or out-of-range nutrients raise ValueError
+    naming the file row (`first_row` is the row number of ``rows[0]``);
+    otherwise a column with unreadable cells is returned as text, for
+    `validate_products` to report row by row.
+    """
+    position = {name: i for i, name in enumerate(header)}
+    width = len(header)
+
+    # Skip blank lines (rows without cells, see `is_blank_line`) and pad
+    # short rows so every column has one cell per row
+    row_numbers = [first_row + i for i, row in enumerate(rows) if row]
+    rows = [row if len(row) >= width else row + [""] * (width - len(row)) for row in rows if row]
+    if not rows:
+        return None
+    cells = list(zip(*rows))
+
+    columns = {
+        name: _parse_numbers(name, cells[position[name]], row_numbers, strict) for name in NUTRIENT_COLUMNS
+    }
+    if strict:
+        _check_nutrients(columns, row_numbers)
+    for name in FLAG_COLUMNS:
+        if name in position:
+            columns[name] = _parse_flags(name, cells[position[name]], row_numbers, strict)
+    for name in TEXT_COLUMNS + PASSTHROUGH_COLUMNS:
+        if name in position:
+            columns[name] = np.array(
+                [cell if cell is None or isinstance(cell, str) else str(cell) for cell in cells[position[name]]],
+                dtype=object,
+            )
+    return columns
+
+
+def iter_csv_chunks(path, chunksize=100_000):
+    """
+    Read a product CSV file in chunks of column arrays.
+
+    Parameters
+    ----------
+    path : str or os.PathLike
+        CSV file with the `NUTRIENT_COLUMNS` and optional flag,
+        "Product Name" and "Category" columns.
+    chunksize : int
+        Number of rows per chunk.
+
+    Yields
+    ------
+    dict
+        Column arrays as returned by `columns_from_rows`, ready for
+        `score_table`.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        check_header(header)
+
+        while True:
+            first_row = reader.line_num + 1
+            rows = list(islice(reader, chunksize))
+            if not rows:
+                break
+            columns = columns_from_rows(header, rows, first_row)
+            if columns is not None:
+                yield columns
+
+
+# ----------------------------
+# Excel workbooks
+# ----------------------------
+# Bump when the frames produced by `read_excel_products` change, so older sidecars are ignored
+SIDECAR_VERSION = "3"
+
+
+def _iter_sheet_rows(source, extension, sheet=0):
+    """Yield the rows of a worksheet (index or name) as tuples of cell values."""
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+
+    if CalamineWorkbook is not None:
+        # Optional Rust reader: much faster, and reads .xls as well
+        if hasattr(source, "read"):
+            workbook = CalamineWorkbook.from_filelike(source)
+        else:
+            workbook = CalamineWorkbook.from_path(os.fspath(source))
+        if isinstance(sheet, int):
+            worksheet = workbook.get_sheet_by_index(sheet)
+        else:
+            worksheet = workbook.get_sheet_by_name(sheet)
+        yield from worksheet.to_python(skip_empty_area=False)
+        return
+
+    if extension == ".xls":
+        raise RuntimeError("Reading .xls files requires python-calamine (pip install python-calamine)")
+
+    from openpyxl import load_workbook
+
+    # Read-only mode streams rows instead of loading the whole workbook
+    workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        worksheet = workbook.worksheets[sheet] if isinstance(sheet, int) else workbook[sheet]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def excel_sheet_names(source, file_name=None):
+    """
+    Names of the worksheets of an Excel workbook, in workbook order.
+
+    `file_name` is used to detect the file type when `source` is a file
+    object, which is rewound afterwards.
+    """
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+
+    if CalamineWorkbook is not None:
+        if hasattr(source, "read"):
+            names = CalamineWorkbook.from_filelike(source).sheet_names
+            source.seek(0)
+        else:
+            names = CalamineWorkbook.from_path(os.fspath(source)).sheet_names
+        return list(names)
+
+    extension = os.path.splitext(file_name or os.fspath(source))[1].lower()
+    if extension == ".xls":
+        raise RuntimeError("Reading .xls files requires python-calamine (pip install python-calamine)")
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+
+def _read_sheet_columns(source, extension, sheet=0):
+    rows = _iter_sheet_rows(source, extension, sheet)
+    header = ["" if cell is None else str(cell) for cell in next(rows, ())]
+    check_header(header)
+
+    # Keep only the product columns, and stop each row after the last one needed
+    keep = [i for i, name in enumerate(header) if name in PRODUCT_COLUMNS]
+    last = max(keep) + 1
+    product_header = [header[i] for i in keep]
+    product_rows = []
+    for row in rows:
+        row = row[:last]
+        cells = [row[i] if i < len(row) else None for i in keep]
+        if any(cell is not None and cell != "" for cell in cells):
+            product_rows.append(cells)
+    return product_header, product_rows
+
+
+def _frame_from_columns(columns):
+    import pandas as pd
+
+    if columns is None:
+        columns = {name: np.empty(0) for name in NUTRIENT_COLUMNS}
+    frame = pd.DataFrame({name: columns[name] for name in PRODUCT_COLUMNS if name in columns})
+    for name in frame.columns:
+        # Names, categories, brands and columns left as text for validation
+        if frame[name].dtype == object:
+            frame[name] = frame[name].astype("string")
+    return frame
+
+
+def _load_sidecar(path, source_hash):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    try:
+        table = pq.read_table(path)
+    except (OSError, ValueError):
+        return None
+    metadata = table.schema.metadata or {}
+    if (metadata.get(b"nutriscore.source_hash") != source_hash.encode()
+            or metadata.get(b"nutriscore.sidecar_version") != SIDECAR_VERSION.encode()):
+        return None
+    return table.to_pandas()
+
+
+def _write_sidecar(path, frame, source_hash):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return  # the sidecar is only a speed-up
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"nutriscore.source_hash": source_hash.encode(),
+        b"nutriscore.sidecar_version": SIDECAR_VERSION.encode(),
+    })
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_excel_products(source, sidecar=None, file_name=None, sheet=0):
+    """
+    Read the product columns of one sheet of an Excel workbook.
+
+    Only `PRODUCT_COLUMNS` are kept, with explicit dtypes: float nutrients,
+    bool flags and string names, categories and brands (a nutrient or flag
+    column with unreadable cells stays text, for `validate_products` to
+    report). Rows are streamed from the sheet (python-calamine when
+    installed, otherwise openpyxl in read-only mode) instead of loading the
+    whole workbook.
+
+    Parameters
+    ----------
+    source : str, os.PathLike or file-like
+        The workbook.
+    sidecar : str, optional
+        Path of a Parquet sidecar. If it holds the columns of this exact
+        workbook (checked by content hash) it is loaded instead of the
+        workbook; otherwise it is (re)written after parsing. Needs pyarrow;
+        without it the sidecar is skipped.
+    file_name : str, optional
+        Name used to detect the file type when `source` is a file object.
+    sheet : int or str
+        Index or name of the sheet (default: the first one).
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    from .cache import content_hash
+
+    if hasattr(source, "read"):
+        data = source.read()
+        source = io.BytesIO(data)
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+        file_name = file_name or os.fspath(source)
+        source = io.BytesIO(data)
+    extension = os.path.splitext(file_name or "")[1].lower()
+
+    source_hash = content_hash(data)
+    if sheet != 0:
+        # A sidecar holds one sheet
+        source_hash = f"{source_hash}:{sheet}"
+    if sidecar is not None:
+        frame = _load_sidecar(sidecar, source_hash)
+        if frame is not None:
+            return frame
+
+    header, rows = _read_sheet_columns(source, extension, sheet)
+    frame = _frame_from_columns(columns_from_rows(header, rows, strict=False))
+    if sidecar is not None:
+        _write_sidecar(sidecar, frame, source_hash)
+    return frame
+
+
+# ----------------------------
+# Parquet and Arrow IPC (Feather) files
+# ----------------------------
+COLUMNAR_EXTENSIONS = (".parquet", ".feather", ".arrow")
+
+
+def read_columnar_products(source, file_name=None):
+    """
+    Read the product columns of a Parquet or Arrow IPC (Feather) file.
+
+    Only `PRODUCT_COLUMNS` are read from the file (column projection), so
+    wide data-lake exports cost no more than the columns the scorer and
+    the result store use.
+
+    Parameters
+    ----------
+    source : str, os.PathLike or file-like
+        The file.
+    file_name : str, optional
+        Name used to detect the format when `source` is a file object.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    try:
+        import pyarrow.feather as feather
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Reading Parquet/Arrow files requires pyarrow (pip install pyarrow)") from e
+
+    if file_name is None:
+        file_name = os.fspath(source)
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in COLUMNAR_EXTENSIONS:
+        raise ValueError(f"Unsupported columnar format {extension!r} (use {', '.join(COLUMNAR_EXTENSIONS)})")
+
+    if extension == ".parquet":
+        names = pq.read_schema(source).names
+    else:
+        names = ipc.open_file(source).schema.names
+        if hasattr(source, "seek"):
+            source.seek(0)
+    check_header(names)
+
+    wanted = [name for name in PRODUCT_COLUMNS if name in names]
+    if extension == ".parquet":
+        table = pq.read_table(source, columns=wanted)
+    else:
+        table = feather.read_table(source, columns=wanted)
+    return table.to_pandas()
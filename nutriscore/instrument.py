@@ -0,0 +1,179 @@
+"""
+Optional per-stage instrumentation of the scoring pipeline.
+
+Code marks its stages with ``with stage("score", rows=n):``. Outside of
+`record_stages` that is a no-op; inside it every stage records its wall
+time, rows per second and peak memory (traced with `tracemalloc`, relative
+to the memory in use when the stage started), and is logged as one JSON
+line on the ``nutriscore.stages`` logger. `profile_to` captures a cProfile
+dump of a block for offline analysis (``python -m pstats dump.prof``).
+
+Stages run by pool workers (threads or processes) do not see the caller's
+log: a task records into its own log with `worker_stages`, returns the
+records, and the caller adds them to its log with `merge_stages`.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# tracemalloc, logging, json and cProfile are imported on first use: the engine imports
+# this module, and the headless scorer's startup time is budgeted
+LOGGER_NAME = "nutriscore.stages"
+
+_current_log = ContextVar("nutriscore_stage_log", default=None)
+
+
+class StageLog:
+    """Stage records of one run, in the order the stages finished."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._open = []  # peak memory seen so far by each unfinished stage
+
+    def summary(self):
+        """Records of repeated stages (e.g. one per category) merged into one per stage name."""
+        merged = {}
+        for record in self.records:
+            total = merged.get(record["stage"])
+            if total is None:
+                merged[record["stage"]] = dict(record)
+                continue
+            total["seconds"] += record["seconds"]
+            if record["rows"] is not None:
+                total["rows"] = (total["rows"] or 0) + record["rows"]
+            if record["peak_bytes"] is not None:
+                total["peak_bytes"] = max(total["peak_bytes"] or 0, record["peak_bytes"])
+        for total in merged.values():
+            total["rows_per_second"] = _rate(total["rows"], total["seconds"])
+        return list(merged.values())
+
+
+def _rate(rows, seconds):
+    return round(rows / seconds) if rows and seconds else None
+
+
+@contextmanager
+def record_stages(trace_memory=True):
+    """
+    Record the stages run inside the block.
+
+    Yields the `StageLog`. With `trace_memory`, `tracemalloc` runs for the
+    duration of the block (it slows allocation-heavy code down, so leave it
+    off when only times are needed).
+    """
+    import tracemalloc
+
+    log = StageLog(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def recording_stages():
+    """Whether the caller records stages, to tell pool workers (see `worker_stages`)."""
+    return _current_log.get() is not None
+
+
+@contextmanager
+def worker_stages(enabled):
+    """
+    Record the stages of a pool task, if `enabled` (`recording_stages()` in the caller).
+
+    Yields the list the records are appended to; return it to the caller
+    for `merge_stages`. Memory is not traced: tracemalloc peaks are
+    process-wide, and tasks run side by side.
+    """
+    if not enabled:
+        yield []
+        return
+    with record_stages(trace_memory=False) as log:
+        yield log.records
+
+
+def merge_stages(records):
+    """Add the stage records returned by a pool task to the caller's log (if recording)."""
+    log = _current_log.get()
+    if log is not None:
+        log.records.extend(records)
+
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Time a stage of the pipeline (no-op unless inside `record_stages`).
+
+    Yields a dict; set ``record["rows"]`` inside the block when the row
+    count is only known afterwards.
+    """
+    log = _current_log.get()
+    record = {"stage": name, "rows": rows}
+    if log is None:
+        yield record
+        return
+
+    import tracemalloc
+
+    tracing = log.trace_memory and tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if log._open:
+            log._open[-1] = max(log._open[-1], peak)
+        tracemalloc.reset_peak()
+        log._open.append(current)
+        start_memory = current
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        seconds = time.perf_counter() - start
+        peak_bytes = None
+        if tracing:
+            peak = max(log._open.pop(), tracemalloc.get_traced_memory()[1])
+            peak_bytes = peak - start_memory
+            if log._open:
+                log._open[-1] = max(log._open[-1], peak)
+        record.update(seconds=seconds, rows_per_second=_rate(record["rows"], seconds), peak_bytes=peak_bytes)
+        log.records.append(record)
+        _log_record(record)
+
+
+def log_stages_to_stderr():
+    """Send the stage log lines to stderr, one JSON object per line."""
+    import logging
+
+    stage_logger = logging.getLogger(LOGGER_NAME)
+    if not stage_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        stage_logger.addHandler(handler)
+    stage_logger.setLevel(logging.INFO)
+
+
+def _log_record(record):
+    import json
+    import logging
+
+    logging.getLogger(LOGGER_NAME).info(json.dumps(record))
+
+
+@contextmanager
+def profile_to(path):
+    """Run the block under cProfile and write the stats to `path`."""
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
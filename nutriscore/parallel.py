@@ -0,0 +1,141 @@
+"""
+Multi-process scoring for very large inputs.
+
+Inputs are cut into contiguous shards that are scored independently on a
+process pool; results are collected in submission order, so the output is
+identical to single-process scoring whatever the number of workers.
+"""
+
+import csv
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from .instrument import merge_stages, recording_stages, worker_stages
+
+# Below this many rows per shard the cost of shipping data to the workers
+# outweighs the gain
+MIN_ROWS_PER_SHARD = 50_000
+
+
+def resolve_workers(workers):
+    """Return the worker count to use; None or 0 means one per CPU core."""
+    if not workers or workers < 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _score_shard(df, category, record, validate=False):
+    from .frame import process_dataframe
+
+    with worker_stages(record) as records:
+        result = process_dataframe(df, category, validate=validate)
+    return result, records
+
+
+def process_dataframe_parallel(df, category, workers=None, min_rows_per_shard=MIN_ROWS_PER_SHARD,
+                               validate=False):
+    """
+    `process_dataframe` spread over a process pool.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Products to score.
+    category : str
+        Product category, or fallback for rows of a "Category" column.
+    workers : int, optional
+        Number of worker processes (default: one per CPU core).
+    min_rows_per_shard : int
+        Smallest shard worth sending to a worker; small frames are scored
+        in the calling process.
+    validate : bool
+        Raise ValueError for unusable cells (see `process_dataframe`).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Same result as `process_dataframe(df, category, validate=validate)`.
+    """
+    import pandas as pd
+
+    from .frame import process_dataframe
+
+    n_shards = min(resolve_workers(workers), len(df) // min_rows_per_shard)
+    if n_shards <= 1:
+        return process_dataframe(df, category, validate=validate)
+
+    bounds = [len(df) * i // n_shards for i in range(n_shards + 1)]
+    shards = [df.iloc[start:stop] for start, stop in zip(bounds, bounds[1:])]
+    parts = []
+    with ProcessPoolExecutor(max_workers=n_shards) as pool:
+        arguments = [category] * n_shards, [recording_stages()] * n_shards, [validate] * n_shards
+        for part, records in pool.map(_score_shard, shards, *arguments):
+            parts.append(part)
+            merge_stages(records)
+    return pd.concat(parts)
+
+
+def _score_csv_block(header, lines, category, start, encode, first_row=2, record=False):
+    from .engine import score_table
+    from .ingest import columns_from_rows
+
+    rows = list(csv.reader(lines))
+    if len(rows) != len(lines):
+        raise ValueError(
+            "Line breaks inside quoted CSV fields are not supported with several workers; "
+            "use a single worker for this file"
+        )
+    with worker_stages(record) as records:
+        columns = columns_from_rows(header, rows, first_row)
+        if columns is None:
+            return None, records
+        result = score_table(columns, category)
+        grades = result["Nutri-Score Grade"]
+        block = encode(result, len(grades), start), len(grades), Counter(grades.tolist())
+    return block, records
+
+
+def iter_scored_csv_parallel(path, category, encode, chunksize=100_000, workers=None):
+    """
+    Score a CSV file block by block on a process pool.
+
+    The calling process only splits the file into blocks of `chunksize`
+    lines; parsing, scoring and encoding the output (with `encode`, e.g.
+    `CsvResultWriter.encode`) happen in the workers. At most two blocks per
+    worker are in flight, so memory stays bounded.
+
+    Yields
+    ------
+    tuple
+        (encoded block, row count, grade counts) per block, in file order.
+    """
+    from .ingest import check_header, is_blank_line
+
+    workers = resolve_workers(workers)
+    record = recording_stages()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader([f.readline()]), [])
+        check_header(header)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            rows_submitted = 0
+            lines_read = 1  # the header
+            while True:
+                lines = list(islice(f, chunksize))
+                if lines:
+                    pending.append(pool.submit(
+                        _score_csv_block, header, lines, category, rows_submitted, encode, lines_read + 1, record
+                    ))
+                    # Row numbers for unnamed products; blank lines are skipped by the parser
+                    rows_submitted += sum(1 for line in lines if not is_blank_line(line))
+                    lines_read += len(lines)
+                while pending and (len(pending) >= 2 * workers or not lines):
+                    block, records = pending.popleft().result()
+                    merge_stages(records)
+                    if block is not None:
+                        yield block
+                if not lines:
+                    break
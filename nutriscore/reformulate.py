@@ -0,0 +1,417 @@
+"""
+Reformulation targets: the smallest nutrient changes that reach a grade.
+
+Component points only change where a nutrient value crosses a bin edge of
+its scoring table, so every nutrient's valid range splits into a handful of
+segments of constant points (`boundary_index`, computed once per category
+and nutrient). Moving a product to the nearest value of another segment is
+the smallest change that gives it that segment's points; scoring those
+candidates with the real rules (`combine_points`: sweetener penalty, red
+meat protein cap, the N/P protein rule) and the `CATEGORY_THRESHOLDS`
+bands tells which of them reach the target grade. Only reformulations in
+the favourable direction (`DIRECTIONS`) are proposed.
+
+`reformulation_options` lists the Pareto-optimal combinations for one
+product; `single_nutrient_changes` gives the smallest one-nutrient change
+for every product of a catalog in one vectorized pass, and
+`boundary_distances` how far every product is from its neighbouring bin
+edges and grade bands, for sensitivity reports.
+"""
+
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from .columns import COMPONENT_COLUMNS, FLAG_COLUMNS, NUTRIENT_COLUMNS, NUTRIENT_RANGES
+from .engine import combine_points, score_columns
+from .tables import (
+    CATEGORY_THRESHOLDS,
+    ENERGY_TABLES,
+    FIBRE_TABLES,
+    FRUIT_TABLES,
+    GRADE_TABLES,
+    GRADES,
+    PROTEIN_TABLES,
+    SALT_TABLES,
+    SAT_FAT_TABLES,
+    SUGAR_TABLES,
+)
+
+# Resolution of proposed values: whole kJ, 0.01 g, 0.1 %
+CHANGE_DECIMALS = {name: 2 for name in NUTRIENT_COLUMNS}
+CHANGE_DECIMALS["Energy (kJ/100 g)"] = 0
+CHANGE_DECIMALS["Fruits, vegetables, and pulses (%)"] = 1
+
+# Size of a change relative to the other nutrients' changes: 1 kJ of energy counts
+# like 0.025 g of a nutrient or 0.025 % fruit
+CHANGE_SCALES = {name: 100.0 for name in NUTRIENT_COLUMNS}
+CHANGE_SCALES["Energy (kJ/100 g)"] = 4000.0
+
+# Reformulation lowers the N nutrients and raises the P nutrients, never the other way round
+DIRECTIONS = {name: -1 for name in NUTRIENT_COLUMNS[:4]}
+DIRECTIONS.update({name: 1 for name in NUTRIENT_COLUMNS[4:]})
+
+# Float noise allowed in `segment_changes`, in units of the resolution
+_TOLERANCE = 1e-10
+
+# Rows per vectorized block in `single_nutrient_changes` (rows x segments candidates)
+SOLVE_BLOCK_ROWS = 65_536
+
+
+def _components(category, name):
+    """(result column, scoring table, factor) of every component point the nutrient `name` moves."""
+    if name == "Energy (kJ/100 g)":
+        return [] if category == "fat" else [("Energy Score", ENERGY_TABLES[category], 1)]
+    if name == "Saturates (g/100 g)":
+        parts = [("Saturates Score", SAT_FAT_TABLES[category], 1)]
+        if category == "fat":
+            parts.append(("Energy Score", ENERGY_TABLES["fat"], 37))  # energy from saturates
+        return parts
+    column, tables = {
+        "Sugar (g/100 g)": ("Sugar Score", SUGAR_TABLES),
+        "Salt (g/100 g)": ("Salt Score", SALT_TABLES),
+        "Fruits, vegetables, and pulses (%)": ("Fruit Score", FRUIT_TABLES),
+        "Fibre (g/100 g)": ("Fibre Score", FIBRE_TABLES),
+        "Protein (g/100 g)": ("Protein Score", PROTEIN_TABLES),
+    }[name]
+    return [(column, tables[category], 1)]
+
+
+@lru_cache(maxsize=None)
+def boundary_index(category, name):
+    """
+    Segments of nutrient `name`'s values with constant points in `category`.
+
+    Returns (starts, ends, points): every segment holds the values in
+    (start, end], and `points` maps each result column the nutrient moves to
+    its int8 points per segment. The lower end of the valid range is a
+    segment of its own, since table bins exclude their lower edge.
+    """
+    components = _components(category, name)
+    low, high = NUTRIENT_RANGES[name]
+    edges = sorted({
+        edge / factor
+        for _, table, factor in components
+        for edge in table.lows + table.highs
+        if low < edge / factor < high
+    })
+    starts = np.array([low - 1, low] + edges)
+    ends = np.array([low] + edges + [high])
+    points = {
+        column: np.array([table.lookup(end * factor) for end in ends], dtype=np.int8)
+        for column, table, factor in components
+    }
+    return starts, ends, points
+
+
+def segment_changes(values, name, starts, ends):
+    """
+    Smallest change that moves each value into each segment (values x segments).
+
+    Changes are multiples of the `CHANGE_DECIMALS` resolution, except a
+    change to the lower end of the valid range (all of the nutrient
+    removed); NaN for segments in the unfavourable direction (`DIRECTIONS`),
+    outside the valid range or narrower than the resolution.
+    """
+    scale = 10 ** CHANGE_DECIMALS[name]
+    low, high = NUTRIENT_RANGES[name]
+    values = np.asarray(values, dtype=float)[:, None]
+    # Down to at most `end`, or up to just above `start`, in resolution units; the tolerance
+    # absorbs float noise such as (0.8 - 2.45) * 100 = -165.00000000000003
+    down = np.maximum(np.floor((ends - values) * scale + _TOLERANCE) / scale, low - values)
+    up = (np.floor((starts - values) * scale + _TOLERANCE) + 1) / scale
+    changes = np.where(values > ends, down, np.where(values <= starts, up, 0.0))
+    moved = values + changes
+    valid = (moved > starts) & ((moved - np.minimum(ends, high)) * scale <= _TOLERANCE) & (moved >= low)
+    valid &= (values > starts) if DIRECTIONS[name] < 0 else (values <= ends)
+    return np.where(valid, np.round(changes, CHANGE_DECIMALS[name]) + 0.0, np.nan)  # + 0.0: no -0.0
+
+
+def max_points(category, target_grade):
+    """Highest score that still gets `target_grade` or better in `category` (None if no score does)."""
+    rank = GRADES.index(target_grade)
+    highs = [high for _, high, grade in CATEGORY_THRESHOLDS[category] if GRADES.index(grade) <= rank]
+    return max(highs) if highs else None
+
+
+def _scores_with(base, replaced, category, is_red_meat):
+    """Final points with some component points replaced (arrays broadcast against `base`)."""
+    points = {**base, **replaced}
+    if "Protein Score" in replaced and category == "general":
+        points["Protein Score"] = np.where(is_red_meat, np.minimum(points["Protein Score"], 2), points["Protein Score"])
+    return combine_points(*(points[column] for column in COMPONENT_COLUMNS), category)[2]
+
+
+def _grade_rank(grades):
+    return np.searchsorted(np.array(GRADES), np.asarray(grades, dtype=str))
+
+
+def _flag_column(columns, name, n_rows):
+    return np.asarray(columns[name], dtype=bool) if name in columns else np.zeros(n_rows, dtype=bool)
+
+
+def single_nutrient_changes(columns, categories, target_grade, nutrients=None):
+    """
+    Smallest change of each nutrient alone that brings a product to `target_grade` or better.
+
+    Parameters
+    ----------
+    columns : pandas.DataFrame or dict
+        Validated nutrient columns and optional bool flag columns, as for
+        `score_columns`.
+    categories : str or array-like
+        Category key of all products, or of every product.
+    target_grade : str
+        "A" to "E".
+    nutrients : list of str, optional
+        Nutrient columns to consider (default: all).
+
+    Returns
+    -------
+    dict
+        Float array per nutrient: the change (negative: less of it) in the
+        nutrient's unit, at the `CHANGE_DECIMALS` resolution; 0 where the
+        product already reaches the target and NaN where that nutrient
+        alone cannot get it there.
+    """
+    nutrients = NUTRIENT_COLUMNS if nutrients is None else nutrients
+    n_rows = len(np.asarray(columns[NUTRIENT_COLUMNS[0]]))
+    categories = np.full(n_rows, categories, dtype=object) if isinstance(categories, str) else np.asarray(categories)
+    changes = {name: np.full(n_rows, np.nan) for name in nutrients}
+
+    for category in CATEGORY_THRESHOLDS:
+        mask = categories == category
+        if not mask.any():
+            continue
+        part = {name: np.asarray(columns[name])[mask] for name in NUTRIENT_COLUMNS + FLAG_COLUMNS if name in columns}
+        scores = score_columns(part, category)
+        reached = _grade_rank(scores["Nutri-Score Grade"]) <= GRADES.index(target_grade)
+        limit = max_points(category, target_grade)
+        base = {column: scores[column][:, None] for column in COMPONENT_COLUMNS}
+        is_red_meat = _flag_column(part, "Is red meat", len(reached))[:, None]
+
+        for name in nutrients:
+            result = np.full(len(reached), np.nan)
+            starts, ends, points = boundary_index(category, name)
+            if points and limit is not None:
+                values = np.asarray(part[name], dtype=float)
+                replaced = {column: segment_points[None, :] for column, segment_points in points.items()}
+                for start in range(0, len(values), SOLVE_BLOCK_ROWS):
+                    block = slice(start, start + SOLVE_BLOCK_ROWS)
+                    score = _scores_with(
+                        {column: points_[block] for column, points_ in base.items()},
+                        replaced, category, is_red_meat[block],
+                    )
+                    result[block] = _nearest_changes(values[block], name, starts, ends, score <= limit)
+            result[reached] = 0.0
+            changes[name][mask] = result
+    return changes
+
+
+def boundary_distances(columns, categories):
+    """
+    How far every product is from changing points or grade.
+
+    Parameters
+    ----------
+    columns : pandas.DataFrame or dict
+        Validated nutrient columns and optional bool flag columns, as for
+        `score_columns`.
+    categories : str or array-like
+        Category key of all products, or of every product.
+
+    Returns
+    -------
+    dict
+        Per nutrient, four arrays:
+
+        - "<nutrient> margin down": how much less of the nutrient keeps the
+          component points; removing this much or more crosses into the
+          next lower bin (NaN at the lower end of the valid range).
+        - "<nutrient> grade down": the grade just past that edge.
+        - "<nutrient> margin up": how much more keeps the points; adding
+          more than this crosses into the next higher bin (NaN in the top
+          bin of the valid range).
+        - "<nutrient> grade up": the grade just past that edge.
+
+        Margins are NaN and grades None for nutrients that do not count in
+        the category (energy for fats). Protein edges of red meat products
+        are reported above the 2-point cap too, with an unchanged grade. "Points to better grade" and
+        "Points to worse grade" give the distance of the final points to
+        the neighbouring `CATEGORY_THRESHOLDS` bands (NaN at either end and
+        for water).
+    """
+    n_rows = len(np.asarray(columns[NUTRIENT_COLUMNS[0]]))
+    categories = np.full(n_rows, categories, dtype=object) if isinstance(categories, str) else np.asarray(categories)
+    distances = {}
+    for name in NUTRIENT_COLUMNS:
+        distances[f"{name} margin down"] = np.full(n_rows, np.nan)
+        distances[f"{name} grade down"] = np.full(n_rows, None, dtype=object)
+        distances[f"{name} margin up"] = np.full(n_rows, np.nan)
+        distances[f"{name} grade up"] = np.full(n_rows, None, dtype=object)
+    distances["Points to better grade"] = np.full(n_rows, np.nan)
+    distances["Points to worse grade"] = np.full(n_rows, np.nan)
+
+    for category in CATEGORY_THRESHOLDS:
+        mask = categories == category
+        if not mask.any():
+            continue
+        part = {name: np.asarray(columns[name])[mask] for name in NUTRIENT_COLUMNS + FLAG_COLUMNS if name in columns}
+        scores = score_columns(part, category)
+        n_part = len(scores["Nutri-Score Points"])
+        base = {column: scores[column] for column in COMPONENT_COLUMNS}
+        is_red_meat = _flag_column(part, "Is red meat", n_part)
+        is_water = _flag_column(part, "is_water", n_part) & (category == "drink")
+
+        for name in NUTRIENT_COLUMNS:
+            starts, ends, points = boundary_index(category, name)
+            if not points:
+                continue
+            values = np.asarray(part[name], dtype=float)
+            current = np.searchsorted(ends, values, side="left")
+            for direction, neighbour, margin in (
+                ("down", current - 1, values - starts[current]),
+                ("up", current + 1, ends[current] - values),
+            ):
+                exists = (neighbour >= 0) & (neighbour < len(ends))
+                neighbour = np.clip(neighbour, 0, len(ends) - 1)
+                replaced = {column: segment_points[neighbour] for column, segment_points in points.items()}
+                grades = GRADE_TABLES[category].lookup_many(_scores_with(base, replaced, category, is_red_meat))
+                grades = np.where(is_water, "A", grades)
+                distances[f"{name} margin {direction}"][mask] = np.where(exists, np.round(margin, 9), np.nan)
+                distances[f"{name} grade {direction}"][mask] = np.where(exists, grades, None)
+
+        # Distance to the neighbouring grade bands
+        bands = CATEGORY_THRESHOLDS[category]
+        lows = np.array([low for low, _, _ in bands])
+        highs = np.array([high for _, high, _ in bands])
+        score = scores["Nutri-Score Points"].astype(float)
+        band = np.searchsorted(highs, score, side="left")
+        better = np.where(band > 0, score - highs[np.maximum(band - 1, 0)], np.nan)
+        worse = np.where(band < len(bands) - 1, lows[np.minimum(band + 1, len(bands) - 1)] - score, np.nan)
+        distances["Points to better grade"][mask] = np.where(is_water, np.nan, better)
+        distances["Points to worse grade"][mask] = np.where(is_water, np.nan, worse)
+    return distances
+
+
+def _nearest_changes(values, name, starts, ends, feasible):
+    """Per value, the change into the nearest feasible segment in the favourable direction (NaN if none)."""
+    # Segments are ordered by value, so the nearest one needs the smallest change
+    index = np.arange(len(ends))
+    current = np.searchsorted(ends, values, side="left")[:, None]
+    if DIRECTIONS[name] < 0:
+        best = np.where(feasible & (index <= current), index, -1).max(axis=1)
+    else:
+        best = np.where(feasible & (index >= current), index, len(ends)).min(axis=1)
+    found = (best >= 0) & (best < len(ends))
+    chosen = np.clip(best, 0, len(ends) - 1)[:, None]
+    changes = np.where(found, segment_changes(values, name, starts[chosen], ends[chosen])[:, 0], np.nan)
+
+    # A segment narrower than the resolution cannot be reached: compare all segments for those rows
+    retry = np.flatnonzero(found & np.isnan(changes))
+    if len(retry):
+        candidates = segment_changes(values[retry], name, starts, ends)
+        size = np.where(feasible[retry] & ~np.isnan(candidates), np.abs(candidates), np.inf)
+        best = size.argmin(axis=1)
+        changes[retry] = np.where(np.isfinite(size.min(axis=1)), candidates[np.arange(len(retry)), best], np.nan)
+    return changes
+
+
+def _pareto_front(costs):
+    """Positions of the rows of `costs` that no other row matches or beats in every column."""
+    order = np.argsort(costs.sum(axis=1), kind="stable")  # a dominating row sums to less
+    front = []
+    for i in order:
+        if not front or not (costs[front] <= costs[i]).all(axis=1).any():
+            front.append(i)
+    return front
+
+
+def reformulation_options(product_values, category, target_grade, max_nutrients=2, nutrients=None):
+    """
+    Pareto-optimal nutrient changes that bring one product to `target_grade` or better.
+
+    Parameters
+    ----------
+    product_values : dict
+        Nutrient values and optional flags of the product (typed, e.g. from
+        `validate_products`).
+    category : str
+        Product category ("general", "drink", "fat").
+    target_grade : str
+        "A" to "E".
+    max_nutrients : int
+        Largest number of nutrients changed together.
+    nutrients : list of str, optional
+        Nutrients that may change (default: all).
+
+    Returns
+    -------
+    list of dict
+        One entry per option, fewest nutrients and smallest changes first:
+        "changes" and "values" (nutrient -> change and new value) and the
+        resulting "Nutri-Score Points" and "Nutri-Score Grade". No option is
+        matched by another with smaller or equal changes of every nutrient.
+        An already compliant product gets one option without changes; an
+        unreachable target (e.g. A for a drink that is not water) gets none.
+    """
+    nutrients = NUTRIENT_COLUMNS if nutrients is None else nutrients
+    columns = {
+        name: np.array([product_values[name]]) for name in NUTRIENT_COLUMNS + FLAG_COLUMNS if name in product_values
+    }
+    scores = score_columns(columns, category)
+    grade = scores["Nutri-Score Grade"][0]
+    if GRADES.index(grade) <= GRADES.index(target_grade):
+        return [{"changes": {}, "values": {}, "Nutri-Score Points": int(scores["Nutri-Score Points"][0]),
+                 "Nutri-Score Grade": grade}]
+    limit = max_points(category, target_grade)
+    if limit is None:
+        return []
+
+    base = {column: scores[column] for column in COMPONENT_COLUMNS}
+    is_red_meat = bool(_flag_column(columns, "Is red meat", 1)[0])
+    # Per nutrient: the changes into the segments in its favourable direction, and their points
+    candidates = {}
+    for name in nutrients:
+        starts, ends, points = boundary_index(category, name)
+        if not points:
+            continue
+        changes = segment_changes([float(product_values[name])], name, starts, ends)[0]
+        moved = np.abs(changes) > 0  # NaN compares False
+        candidates[name] = (changes[moved], {column: p[moved] for column, p in points.items()})
+
+    names = list(candidates)
+    scales = np.array([CHANGE_SCALES[name] for name in names])
+    option_changes = []  # one row of changes per feasible option, 0 for the nutrients it leaves alone
+    for size in range(1, max_nutrients + 1):
+        for subset in combinations(range(len(names)), size):
+            grids = np.meshgrid(*(np.arange(len(candidates[names[i]][0])) for i in subset), indexing="ij")
+            grids = [grid.ravel() for grid in grids]
+            replaced = {}
+            for i, grid in zip(subset, grids):
+                replaced.update({column: p[grid] for column, p in candidates[names[i]][1].items()})
+            feasible = _scores_with(base, replaced, category, is_red_meat) <= limit
+            if not feasible.any():
+                continue
+            changes = np.zeros((int(feasible.sum()), len(names)))
+            for i, grid in zip(subset, grids):
+                changes[:, i] = candidates[names[i]][0][grid[feasible]]
+            option_changes.append(changes)
+    if not option_changes:
+        return []
+
+    changes = np.concatenate(option_changes)
+    options = []
+    for i in _pareto_front(np.abs(changes) / scales):
+        changed = {names[j]: float(changes[i, j]) for j in np.flatnonzero(changes[i])}
+        values = {name: round(float(product_values[name]) + change, 9) for name, change in changed.items()}
+        new_scores = score_columns({**columns, **{name: np.array([value]) for name, value in values.items()}}, category)
+        options.append({
+            "changes": changed,
+            "values": values,
+            "Nutri-Score Points": int(new_scores["Nutri-Score Points"][0]),
+            "Nutri-Score Grade": new_scores["Nutri-Score Grade"][0],
+        })
+    options.sort(key=lambda option: len(option["changes"]))  # stable: smallest changes first within a size
+    return options
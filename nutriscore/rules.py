@@ -0,0 +1,357 @@
+"""
+Versioned Nutri-Score rule packs.
+
+A rule pack is plain data: the grade bands and component tables per
+category, in the same (low, high, value) form as `nutriscore.tables`, and
+the parameters of the special rules (sweetener penalty, red meat protein
+cap, the N/P protein rule, the water grade). `RULE_PACKS` holds the 2023
+algorithm (`ALGORITHM_VERSION`, built from the tables the rest of the
+package scores with) and the previous 2017 one; more versions are added by
+putting their pack in `RULE_PACKS`.
+
+`compile_rules` turns a pack into a `RuleEngine` once per version, and
+`score_versions` scores a batch under several versions in one pass: the
+input columns are read and split by category once, and a table shared by
+several versions is looked up once. `migration_counts` cross-tabulates the
+grades of two versions.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from .columns import COMPONENT_COLUMNS, FLAG_COLUMNS, NUTRIENT_COLUMNS, SCORE_COLUMNS
+from .engine import _column_values, _flag_values, _result_dtype
+from .tables import (
+    ALGORITHM_VERSION,
+    CATEGORY_THRESHOLDS,
+    ENERGY_SCORING,
+    FIBRE_SCORING,
+    FRUIT_SCORING,
+    GRADES,
+    PROTEIN_SCORING,
+    SALT_SCORING,
+    SAT_FAT_SCORING,
+    SUGAR_SCORING,
+    ScoringTable,
+)
+
+# Nutrient column each table-based component reads
+COMPONENT_NUTRIENTS = {
+    "Energy Score": "Energy (kJ/100 g)",
+    "Sugar Score": "Sugar (g/100 g)",
+    "Saturates Score": "Saturates (g/100 g)",
+    "Salt Score": "Salt (g/100 g)",
+    "Fruit Score": "Fruits, vegetables, and pulses (%)",
+    "Fibre Score": "Fibre (g/100 g)",
+    "Protein Score": "Protein (g/100 g)",
+}
+
+# Pack keys:
+#   thresholds     category -> grade bands (low, high, grade), bounds included
+#   tables         component -> category -> (low, high, points) bins
+#   inputs         component -> category -> (nutrient, factor) where the table
+#                  reads another nutrient than `COMPONENT_NUTRIENTS`, times factor
+#   sweetener_points      category -> penalty for non-nutritive sweeteners
+#   red_meat_protein_cap  category -> highest protein points of red meat
+#   protein_rule   category -> N points from which protein no longer counts
+#                  (no entry: protein always counts)
+#   protein_with_max_fruit  protein counts anyway when the fruit points are the
+#                  highest of their table
+#   water_grade    grade of plain water (drinks flagged "is_water"), scored 0
+RULES_2023 = {
+    "version": ALGORITHM_VERSION,
+    "name": "2023 updated algorithm",
+    "thresholds": CATEGORY_THRESHOLDS,
+    "tables": {
+        "Energy Score": ENERGY_SCORING,
+        "Sugar Score": SUGAR_SCORING,
+        "Saturates Score": SAT_FAT_SCORING,
+        "Salt Score": SALT_SCORING,
+        "Fruit Score": FRUIT_SCORING,
+        "Fibre Score": FIBRE_SCORING,
+        "Protein Score": PROTEIN_SCORING,
+    },
+    "inputs": {"Energy Score": {"fat": ("Saturates (g/100 g)", 37)}},  # energy from saturates
+    "sweetener_points": {"drink": 4},
+    "red_meat_protein_cap": {"general": 2},
+    "protein_rule": {"general": 11, "fat": 7},
+    "protein_with_max_fruit": False,
+    "water_grade": "A",
+}
+
+_INF = float("inf")
+
+
+def _bins(highs, points=None):
+    """Bins (low, high] from the upper edges, the first one open below."""
+    points = range(len(highs) + 1) if points is None else points
+    lows = [-_INF] + list(highs)
+    return [(low, high, p) for low, high, p in zip(lows, list(highs) + [_INF], points)]
+
+
+# Salt edges of the 2017 sodium table (90 mg steps, salt = 2.5 x sodium)
+_SALT_2017 = _bins([0.225, 0.45, 0.675, 0.9, 1.125, 1.35, 1.575, 1.8, 2.025, 2.25])
+_SAT_FAT_2017 = _bins([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+_FIBRE_2017 = _bins([0.9, 1.9, 2.8, 3.7, 4.7])
+_PROTEIN_2017 = _bins([1.6, 3.2, 4.8, 6.4, 8.0])
+_FOOD_2017 = {
+    "energy": _bins([335, 670, 1005, 1340, 1675, 2010, 2345, 2680, 3015, 3350]),
+    "sugar": _bins([4.5, 9, 13.5, 18, 22.5, 27, 31, 36, 40, 45]),
+    "fruit": _bins([40, 60, 80], [0, 1, 2, 5]),
+}
+
+# The 2017 algorithm. Its fats rule reads saturates as a share of total fat,
+# which the input does not carry, so fats are scored with the food tables.
+RULES_2017 = {
+    "version": "2017",
+    "name": "2017 algorithm",
+    "thresholds": {
+        "general": [(-_INF, -1, "A"), (0, 2, "B"), (3, 10, "C"), (11, 18, "D"), (19, _INF, "E")],
+        "drink": [(-_INF, 1, "B"), (2, 5, "C"), (6, 9, "D"), (10, _INF, "E")],
+        "fat": [(-_INF, -1, "A"), (0, 2, "B"), (3, 10, "C"), (11, 18, "D"), (19, _INF, "E")],
+    },
+    "tables": {
+        "Energy Score": {
+            "general": _FOOD_2017["energy"],
+            "drink": _bins([0, 30, 60, 90, 120, 150, 180, 210, 240, 270]),
+            "fat": _FOOD_2017["energy"],
+        },
+        "Sugar Score": {
+            "general": _FOOD_2017["sugar"],
+            "drink": _bins([0, 1.5, 3, 4.5, 6, 7.5, 9, 10.5, 12, 13.5]),
+            "fat": _FOOD_2017["sugar"],
+        },
+        "Saturates Score": dict.fromkeys(CATEGORY_THRESHOLDS, _SAT_FAT_2017),
+        "Salt Score": dict.fromkeys(CATEGORY_THRESHOLDS, _SALT_2017),
+        "Fruit Score": {
+            "general": _FOOD_2017["fruit"],
+            "drink": _bins([40, 60, 80], [0, 2, 4, 10]),
+            "fat": _FOOD_2017["fruit"],
+        },
+        "Fibre Score": dict.fromkeys(CATEGORY_THRESHOLDS, _FIBRE_2017),
+        "Protein Score": dict.fromkeys(CATEGORY_THRESHOLDS, _PROTEIN_2017),
+    },
+    "inputs": {},
+    "sweetener_points": {},
+    "red_meat_protein_cap": {},
+    "protein_rule": dict.fromkeys(CATEGORY_THRESHOLDS, 11),
+    "protein_with_max_fruit": True,
+    "water_grade": "A",
+}
+
+# Rule packs by version, the current algorithm first
+RULE_PACKS = {pack["version"]: pack for pack in (RULES_2023, RULES_2017)}
+
+
+@lru_cache(maxsize=None)
+def _compile_table(bins, default=None, include_low=False):
+    # Identical bins give the same table object, so `score_versions` can share its lookups
+    return ScoringTable(bins, default=default, include_low=include_low)
+
+
+def _freeze(bins):
+    return tuple(tuple(b) for b in bins)
+
+
+class RuleEngine:
+    """
+    Columnar scorer compiled from one rule pack (see `compile_rules`).
+
+    `score_columns` and `score_columns_by_category` mirror the functions of
+    `nutriscore.engine` and return the same columns; for the 2023 pack the
+    results are identical.
+    """
+
+    __slots__ = ("version", "name", "grades", "lookups", "sweetener_points", "protein_cap",
+                 "protein_rule", "max_fruit_points", "water_grade")
+
+    def __init__(self, pack):
+        missing = [key for key in ("version", "thresholds", "tables") if key not in pack]
+        if missing:
+            raise ValueError(f"Rule pack is missing {', '.join(missing)}")
+        unknown = set(pack["tables"]) - set(COMPONENT_NUTRIENTS)
+        if unknown:
+            raise ValueError(f"Rule pack {pack['version']!r} has unknown components: {', '.join(sorted(unknown))}")
+
+        self.version = pack["version"]
+        self.name = pack.get("name", self.version)
+        self.grades = {
+            category: _compile_table(_freeze(bands), default="E", include_low=True)
+            for category, bands in pack["thresholds"].items()
+        }
+        # category -> [(component, table, nutrient, factor)]
+        self.lookups = {}
+        for category in self.grades:
+            lookups = []
+            for component, nutrient in COMPONENT_NUTRIENTS.items():
+                tables = pack["tables"].get(component, {})
+                if category not in tables:
+                    raise ValueError(f"Rule pack {self.version!r} has no {component} table for {category!r}")
+                nutrient, factor = pack.get("inputs", {}).get(component, {}).get(category, (nutrient, 1))
+                lookups.append((component, _compile_table(_freeze(tables[category])), nutrient, factor))
+            self.lookups[category] = lookups
+        self.sweetener_points = dict(pack.get("sweetener_points", {}))
+        self.protein_cap = dict(pack.get("red_meat_protein_cap", {}))
+        self.protein_rule = dict(pack.get("protein_rule", {}))
+        self.max_fruit_points = {}
+        if pack.get("protein_with_max_fruit"):
+            for category, lookups in self.lookups.items():
+                fruit_table = next(table for component, table, _, _ in lookups if component == "Fruit Score")
+                self.max_fruit_points[category] = max(fruit_table.values)
+        self.water_grade = pack.get("water_grade")
+
+    def __repr__(self):
+        return f"RuleEngine({self.version!r})"
+
+    def score_columns(self, columns, category, _points=None):
+        """
+        Component points, totals and grades of many products of one category.
+
+        Takes the same columns as `nutriscore.engine.score_columns` and
+        returns the same dict of arrays. `_points` caches table lookups
+        across engines (see `score_versions`).
+        """
+        if category not in self.grades:
+            raise ValueError(f"Rule pack {self.version!r} has no {category!r} category")
+        n_rows = len(_column_values(columns, NUTRIENT_COLUMNS[0]))
+        _points = {} if _points is None else _points
+
+        points = {}
+        for component, table, nutrient, factor in self.lookups[category]:
+            key = (id(table), nutrient, factor)
+            if key not in _points:
+                values = _column_values(columns, nutrient)
+                _points[key] = table.lookup_many(values * factor if factor != 1 else values)
+            points[component] = _points[key]
+
+        sweetener = self.sweetener_points.get(category)
+        if sweetener:
+            is_sweetened = _flag_values(columns, "Contains sweeteners", n_rows)
+            points["Sweetener Penalty"] = np.where(is_sweetened, np.int8(sweetener), np.int8(0))
+        else:
+            points["Sweetener Penalty"] = np.zeros(n_rows, dtype=np.int8)
+
+        cap = self.protein_cap.get(category)
+        if cap is not None:
+            is_red_meat = _flag_values(columns, "Is red meat", n_rows)
+            points["Protein Score"] = np.where(
+                is_red_meat, np.minimum(points["Protein Score"], cap), points["Protein Score"]
+            )
+
+        n_total = points["Energy Score"].astype(np.int16) + points["Sugar Score"] + points["Saturates Score"]
+        n_total += points["Salt Score"] + points["Sweetener Penalty"]
+        fruit_fibre = points["Fruit Score"].astype(np.int16) + points["Fibre Score"]
+        p_total = fruit_fibre + points["Protein Score"]
+
+        threshold = self.protein_rule.get(category)
+        if threshold is None:
+            score = n_total - p_total
+        else:
+            drops_protein = n_total >= threshold
+            if category in self.max_fruit_points:
+                drops_protein &= points["Fruit Score"] < self.max_fruit_points[category]
+            score = np.where(drops_protein, n_total - fruit_fibre, n_total - p_total)
+
+        grade = self.grades[category].lookup_many(score)
+        if self.water_grade and category == "drink":
+            is_water = _flag_values(columns, "is_water", n_rows)
+            score = np.where(is_water, 0, score)
+            grade = np.where(is_water, self.water_grade, grade)
+
+        return {
+            **{column: points[column] for column in COMPONENT_COLUMNS},
+            "Nutri-Score Points": score,
+            "Nutri-Score Grade": grade,
+            "N-points Total": n_total,
+            "P-points Total": p_total,
+        }
+
+    def score_columns_by_category(self, columns, categories):
+        """Score rows of several categories; see `score_versions` for several versions at once."""
+        return score_versions(columns, categories, [self])[self.version]
+
+
+@lru_cache(maxsize=None)
+def compile_rules(version=ALGORITHM_VERSION):
+    """The `RuleEngine` of the `RULE_PACKS` entry `version`, built once per version."""
+    if version not in RULE_PACKS:
+        raise ValueError(f"Unknown rule pack {version!r} (available: {', '.join(RULE_PACKS)})")
+    return RuleEngine(RULE_PACKS[version])
+
+
+def score_versions(columns, categories, versions):
+    """
+    Score a batch under several rule packs in one pass.
+
+    Parameters
+    ----------
+    columns : pandas.DataFrame or dict
+        Nutrient and optional flag columns, as for `score_columns`.
+    categories : str or array-like
+        Category key of all products, or of every product.
+    versions : list
+        `RULE_PACKS` versions or compiled `RuleEngine` objects.
+
+    Returns
+    -------
+    dict
+        Version -> the result arrays of `score_columns_by_category`.
+
+    Notes
+    -----
+    The columns are converted and split by category once for all versions,
+    and a table that several versions share (same bins, same nutrient) is
+    looked up once per category, so every extra version costs little more
+    than its own lookups and totals.
+    """
+    engines = [compile_rules(version) if isinstance(version, str) else version for version in versions]
+    n_rows = len(np.asarray(columns[NUTRIENT_COLUMNS[0]]))
+    categories = np.full(n_rows, categories, dtype=object) if isinstance(categories, str) else np.asarray(
+        categories, dtype=object
+    )
+    arrays = {name: _column_values(columns, name) for name in NUTRIENT_COLUMNS}
+    arrays.update({name: _flag_values(columns, name, n_rows) for name in FLAG_COLUMNS})
+
+    results = {
+        engine.version: {name: np.empty(n_rows, dtype=_result_dtype(name)) for name in SCORE_COLUMNS}
+        for engine in engines
+    }
+    for category in CATEGORY_THRESHOLDS:
+        mask = categories == category
+        if not mask.any():
+            continue
+        whole = mask.all()
+        part = arrays if whole else {name: values[mask] for name, values in arrays.items()}
+        points = {}
+        for engine in engines:
+            scores = engine.score_columns(part, category, _points=points)
+            if whole:
+                # Copies, since versions sharing a table got the same points array
+                results[engine.version] = {name: values.copy() for name, values in scores.items()}
+                continue
+            for name, values in scores.items():
+                results[engine.version][name][mask] = values
+    return results
+
+
+def grade_codes(grades):
+    """Position of every grade in `GRADES` (0 for A); raises ValueError for other values."""
+    grades = np.asarray(grades, dtype=object)
+    codes = np.full(len(grades), -1, dtype=np.intp)
+    for code, grade in enumerate(GRADES):
+        codes[grades == grade] = code
+    if (codes < 0).any():
+        raise ValueError(f"Not a Nutri-Score grade: {grades[codes < 0][0]!r}")
+    return codes
+
+
+def migration_counts(grades_from, grades_to):
+    """
+    Number of products per (grade under one version, grade under another).
+
+    Returns a `len(GRADES)` x `len(GRADES)` int64 array: row i, column j
+    counts the products graded `GRADES[i]` before and `GRADES[j]` after.
+    """
+    pairs = grade_codes(grades_from) * len(GRADES) + grade_codes(grades_to)
+    return np.bincount(pairs, minlength=len(GRADES) ** 2).reshape(len(GRADES), len(GRADES))
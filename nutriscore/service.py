@@ -0,0 +1,382 @@
+"""
+Local HTTP scoring service: ``python -m nutriscore serve``.
+
+A small asyncio HTTP/1.1 server (standard library only) around the columnar
+engine, for systems that score products as they are saved:
+
+- ``POST /score``: one product as a JSON object; returns its scores.
+- ``POST /score/bulk``: a JSON array of products, or NDJSON (one product per
+  line, ``Content-Type: application/x-ndjson``); returns the results in the
+  same format and order. Invalid products get an ``{"error": ...}`` entry.
+- ``GET /metrics``: request counts, p50/p99 latency per endpoint and
+  micro-batch sizes.
+- ``GET /health``.
+
+Products use the input column names ("Energy (kJ/100 g)", ..., optional
+flags, "Product Name" and "Category"); a ``?category=`` query parameter sets
+the fallback category. Concurrent single-product requests are coalesced by
+`MicroBatcher` into one vectorized engine call per `DEFAULT_BATCH_WINDOW`.
+The server binds to localhost unless told otherwise; it has no
+authentication, so only expose it behind something that does.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .columns import FLAG_COLUMNS, NUTRIENT_COLUMNS, NUTRIENT_RANGES, SCORE_COLUMNS, parse_flag, parse_number
+from .engine import score_columns_by_category
+from .tables import CATEGORY_ALIASES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_BATCH_WINDOW = 0.002  # seconds a single request may wait for others to batch with
+DEFAULT_MAX_BATCH = 512       # products per engine call
+MAX_BODY_BYTES = 64 * 1024 ** 2
+METRICS_WINDOW = 10_000       # latest requests per endpoint behind the percentiles
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Content Too Large", 500: "Internal Server Error",
+}
+
+
+class RequestError(Exception):
+    """A request the service rejects, with its HTTP status."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ----------------------------
+# Products in, results out
+# ----------------------------
+def parse_product(record, default_category="general"):
+    """
+    Check one product (a dict of input columns) and return its typed values.
+
+    Raises ValueError for missing, unreadable or out-of-range nutrients,
+    unrecognized flags and unknown categories (the rules of
+    `validate_products`).
+    """
+    if not isinstance(record, dict):
+        raise ValueError("A product must be a JSON object")
+    product = {}
+    for name in NUTRIENT_COLUMNS:
+        if name not in record:
+            raise ValueError(f"Missing {name!r}")
+        try:
+            value = parse_number(record[name])
+        except (TypeError, ValueError):
+            raise ValueError(f"{name!r}: {record[name]!r} is not a number") from None
+        low, high = NUTRIENT_RANGES[name]
+        if not low <= value <= high:  # NaN fails too
+            raise ValueError(f"{name!r}: {record[name]!r} is outside {low:g} to {high:g}")
+        product[name] = value
+    for name in FLAG_COLUMNS:
+        try:
+            product[name] = parse_flag(record.get(name))
+        except ValueError as e:
+            raise ValueError(f"{name!r}: {e}") from None
+    label = str(record.get("Category") or "").strip()
+    category = CATEGORY_ALIASES.get(label.lower(), default_category if not label else None)
+    if category is None:
+        raise ValueError(f"Unknown category {label!r}")
+    product["Category"] = category
+    if record.get("Product Name") is not None:
+        product["Product Name"] = record["Product Name"]
+    return product
+
+
+def score_products(products):
+    """Score parsed products (see `parse_product`) in one vectorized call; return one result dict each."""
+    columns = {name: np.array([product[name] for product in products], dtype=float) for name in NUTRIENT_COLUMNS}
+    columns.update({name: np.array([product[name] for product in products], dtype=bool) for name in FLAG_COLUMNS})
+    categories = [product["Category"] for product in products]
+    scores = score_columns_by_category(columns, categories)
+    values = [scores[name].tolist() for name in SCORE_COLUMNS]
+    results = []
+    for product, row in zip(products, zip(*values)):
+        result = {"Product Name": product["Product Name"]} if "Product Name" in product else {}
+        result["Category"] = product["Category"]
+        result.update(zip(SCORE_COLUMNS, row))
+        results.append(result)
+    return results
+
+
+class MicroBatcher:
+    """
+    Coalesce single-product requests into vectorized engine calls.
+
+    The first product to arrive opens a batch; it is scored `window`
+    seconds later, or as soon as it holds `max_batch` products, together
+    with everything that arrived meanwhile.
+    """
+
+    def __init__(self, window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.batched_products = 0
+        self._pending = []  # (product, future)
+        self._timer = None
+
+    def submit(self, product):
+        """Queue a parsed product; returns a future of its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((product, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self.batches += 1
+        self.batched_products += len(pending)
+        try:
+            results = score_products([product for product, _ in pending])
+        except Exception as e:  # hand the failure to every waiting request
+            results = [e] * len(pending)
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue  # the client went away
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class LatencyMetrics:
+    """Request counts and latency percentiles per endpoint (over the last `METRICS_WINDOW` requests)."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self._window = window
+        self._latencies = {}
+        self._counts = {}
+        self.started = time.time()
+
+    def record(self, route, seconds):
+        if route not in self._latencies:
+            self._latencies[route] = deque(maxlen=self._window)
+            self._counts[route] = 0
+        self._latencies[route].append(seconds)
+        self._counts[route] += 1
+
+    def summary(self):
+        routes = {}
+        for route, latencies in self._latencies.items():
+            ordered = sorted(latencies)
+            routes[route] = {
+                "requests": self._counts[route],
+                "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+                "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        return {"uptime_seconds": round(time.time() - self.started, 1), "routes": routes}
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ----------------------------
+# HTTP
+# ----------------------------
+class ScoringService:
+    """The request handlers and their shared state (batcher and metrics)."""
+
+    def __init__(self, window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.batcher = MicroBatcher(window, max_batch)
+        self.metrics = LatencyMetrics()
+        self._routes = {
+            "/score": ("POST", self.score_one),
+            "/score/bulk": ("POST", self.score_bulk),
+            "/metrics": ("GET", self.report_metrics),
+            "/health": ("GET", self.health),
+        }
+
+    async def score_one(self, query, headers, body):
+        product = parse_product(_load_json(body), _default_category(query))
+        return "application/json", await self.batcher.submit(product)
+
+    async def score_bulk(self, query, headers, body):
+        ndjson = "ndjson" in headers.get("content-type", "")
+        if ndjson:
+            records = [_load_json(line) for line in body.splitlines() if line.strip()]
+        else:
+            records = _load_json(body)
+            if not isinstance(records, list):
+                raise RequestError("Expected a JSON array of products (or NDJSON)")
+        default_category = _default_category(query)
+
+        # Large bodies are scored off the event loop, so single requests keep flowing
+        results = await asyncio.to_thread(_score_records, records, default_category)
+        if ndjson:
+            return "application/x-ndjson", "".join(json.dumps(result) + "\n" for result in results)
+        return "application/json", results
+
+    async def report_metrics(self, query, headers, body):
+        summary = self.metrics.summary()
+        batcher = self.batcher
+        summary["micro_batches"] = {
+            "batches": batcher.batches,
+            "products": batcher.batched_products,
+            "mean_size": round(batcher.batched_products / batcher.batches, 2) if batcher.batches else None,
+            "window_ms": batcher.window * 1000,
+        }
+        return "application/json", summary
+
+    async def health(self, query, headers, body):
+        return "application/json", {"status": "ok"}
+
+    async def handle(self, method, target, headers, body):
+        """Dispatch one request; returns (status, content type, payload)."""
+        url = urlsplit(target)
+        route = self._routes.get(url.path)
+        if route is None:
+            return 404, "application/json", {"error": f"No endpoint {url.path}"}
+        if method != route[0]:
+            return 405, "application/json", {"error": f"Use {route[0]} for {url.path}"}
+        try:
+            content_type, payload = await route[1](parse_qs(url.query), headers, body)
+        except RequestError as e:
+            return e.status, "application/json", {"error": str(e)}
+        except ValueError as e:
+            return 400, "application/json", {"error": str(e)}
+        return 200, content_type, payload
+
+    async def handle_connection(self, reader, writer):
+        """Serve the requests of one (keep-alive) connection."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                start = time.perf_counter()
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                if "chunked" in headers.get("transfer-encoding", ""):
+                    status, content_type, payload = 411, "application/json", {"error": "Send a Content-Length"}
+                    keep_alive = False
+                else:
+                    try:
+                        length = int(headers.get("content-length") or 0)
+                    except ValueError:
+                        length = -1
+                    if length < 0:
+                        # Without a body length the connection cannot be reused
+                        status, content_type, payload = 400, "application/json", {
+                            "error": f"Invalid Content-Length {headers['content-length']!r}"
+                        }
+                        keep_alive = False
+                    elif length > MAX_BODY_BYTES:
+                        status, content_type, payload = 413, "application/json", {"error": "Body too large"}
+                        keep_alive = False
+                    else:
+                        body = await reader.readexactly(length) if length else b""
+                        try:
+                            status, content_type, payload = await self.handle(method, target, headers, body)
+                        except Exception as e:  # keep serving other requests
+                            status, content_type, payload = 500, "application/json", {"error": repr(e)}
+
+                writer.write(_response(status, content_type, payload, keep_alive))
+                await writer.drain()
+                self.metrics.record(urlsplit(target).path, time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _load_json(body):
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise RequestError(f"Invalid JSON: {e}") from None
+
+
+def _default_category(query):
+    label = query.get("category", ["general"])[-1]
+    category = CATEGORY_ALIASES.get(label.strip().lower())
+    if category is None:
+        raise RequestError(f"Unknown category {label!r}")
+    return category
+
+
+def _score_records(records, default_category):
+    parsed = []
+    results = [None] * len(records)
+    for i, record in enumerate(records):
+        try:
+            parsed.append((i, parse_product(record, default_category)))
+        except ValueError as e:
+            results[i] = {"error": str(e)}
+    if parsed:
+        for (i, _), result in zip(parsed, score_products([product for _, product in parsed])):
+            results[i] = result
+    return results
+
+
+def _response(status, content_type, payload, keep_alive):
+    body = (payload if isinstance(payload, str) else json.dumps(payload)).encode()
+    head = (
+        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT, window=DEFAULT_BATCH_WINDOW,
+                     max_batch=DEFAULT_MAX_BATCH, ready=None):
+    """
+    Serve until cancelled.
+
+    `ready`, if given, is called with the bound (host, port) once the server
+    accepts connections (useful with port 0).
+    """
+    service = ScoringService(window, max_batch)
+    server = await asyncio.start_server(service.handle_connection, host, port, limit=MAX_BODY_BYTES)
+    address = server.sockets[0].getsockname()[:2]
+    if ready is not None:
+        ready(address)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+    """Run the service in the foreground until interrupted (Ctrl+C)."""
+    def announce(address):
+        print(f"Serving Nutri-Score on http://{address[0]}:{address[1]}", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(run_server(host, port, window, max_batch, ready=announce))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,227 @@
+"""
+Reading many product files at once: several uploads, every sheet of a workbook.
+
+`list_sources` splits the inputs into sources: one per CSV, Parquet or Arrow
+file and one per worksheet of an Excel workbook. `read_sources` parses and
+validates the sources concurrently on a thread pool and reports each one as
+it finishes. A source that cannot be read (a notes sheet, a corrupt file)
+or that has unusable cells only affects itself: the good rows of every
+other source come back as one table tagged with its "Source File" and
+"Sheet", to be scored in one pass and tagged again with `with_sources`.
+"""
+
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .columns import SOURCE_COLUMNS
+from .ingest import COLUMNAR_EXTENSIONS, excel_sheet_names, read_columnar_products, read_excel_products
+from .instrument import merge_stages, recording_stages, stage, worker_stages
+from .parallel import resolve_workers
+from .validate import ERROR_COLUMNS, validate_products
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+
+# One row per source in the report of `read_sources`
+REPORT_COLUMNS = SOURCE_COLUMNS + ["Rows", "Rows left out", "Seconds", "Error"]
+
+
+def _file_data(file):
+    """Return (file name, bytes) of a path or a named file object (e.g. a Streamlit upload)."""
+    if hasattr(file, "getvalue"):
+        return file.name, file.getvalue()
+    if hasattr(file, "read"):
+        return file.name, file.read()
+    with open(file, "rb") as f:
+        return os.fspath(file), f.read()
+
+
+def list_sources(files):
+    """
+    Split product files into sources.
+
+    Parameters
+    ----------
+    files : iterable
+        Paths or named file objects (with `name` and `read` or `getvalue`).
+
+    Returns
+    -------
+    list of tuple
+        (file name, data, sheet, error) per source, in file and sheet order.
+        `sheet` is the worksheet name for Excel files and "" otherwise; a
+        workbook whose sheets cannot be listed becomes a single source with
+        the problem as `error` (None otherwise).
+    """
+    sources = []
+    for file in files:
+        name, data = _file_data(file)
+        if not name.lower().endswith(EXCEL_EXTENSIONS):
+            sources.append((name, data, "", None))
+            continue
+        try:
+            sheets = excel_sheet_names(io.BytesIO(data), file_name=name)
+        except Exception as e:
+            sources.append((name, data, "", f"{type(e).__name__}: {e}"))
+            continue
+        sources.extend((name, data, sheet, None) for sheet in sheets)
+    return sources
+
+
+def read_source(file_name, data, sheet="", cache=None, sidecar_dir=None):
+    """
+    Parse one source into a product frame.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the file; its extension selects the reader.
+    data : bytes
+        Contents of the file.
+    sheet : str
+        Worksheet to read from an Excel workbook.
+    cache : ResultCache, optional
+        Keeps the parsed frame under `parsed_key`, so the same file (and
+        sheet) uploaded again is not parsed again.
+    sidecar_dir : str, optional
+        Directory of the Parquet sidecars of Excel sheets (see
+        `read_excel_products`).
+    """
+    from .cache import content_hash, parsed_key
+
+    file_hash = content_hash(data) if cache is not None or sidecar_dir else None
+    key = parsed_key(file_hash, file_name, sheet or None) if cache is not None else None
+    frame = cache.get(key) if cache is not None else None
+    if frame is not None:
+        return frame
+
+    if file_name.lower().endswith(".csv"):
+        frame = pd.read_csv(io.BytesIO(data))
+    elif file_name.lower().endswith(COLUMNAR_EXTENSIONS):
+        frame = read_columnar_products(io.BytesIO(data), file_name=file_name)
+    else:
+        sidecar = None
+        if sidecar_dir:
+            suffix = f".{content_hash(sheet.encode())}" if sheet else ""
+            sidecar = os.path.join(sidecar_dir, f"{file_hash}{suffix}.parquet")
+        frame = read_excel_products(io.BytesIO(data), sidecar=sidecar, file_name=file_name, sheet=sheet or 0)
+    if cache is not None:
+        # Excel frames persist as sidecars instead of pickles
+        cache.put(key, frame, persist=not file_name.lower().endswith(EXCEL_EXTENSIONS))
+    return frame
+
+
+def _read_and_validate(file_name, data, sheet, cache, sidecar_dir, record=False):
+    """Products, errors, seconds, error message and stage records of one source; never raises."""
+    start = time.perf_counter()
+    with worker_stages(record) as records:
+        try:
+            with stage("read source") as parsed:
+                frame = read_source(file_name, data, sheet, cache, sidecar_dir)
+                parsed["rows"] = len(frame)
+            with stage("validate", len(frame)):
+                products, errors = validate_products(frame)
+        except Exception as e:
+            return None, None, time.perf_counter() - start, f"{type(e).__name__}: {e}", records
+    return products, errors, time.perf_counter() - start, None, records
+
+
+def read_sources(files, workers=None, progress=None, cache=None, sidecar_dir=None):
+    """
+    Read and validate product files on a thread pool, one task per source.
+
+    Parameters
+    ----------
+    files : iterable
+        Paths or named file objects, see `list_sources`.
+    workers : int, optional
+        Number of threads (default: one per CPU core, at most one per source).
+    progress : callable, optional
+        Called in the calling thread as ``progress(done, total, report_row)``
+        whenever a source finishes, with its `REPORT_COLUMNS` row as a dict.
+    cache, sidecar_dir
+        Passed on to `read_source`.
+
+    Returns
+    -------
+    products : pandas.DataFrame
+        The valid rows of every readable source, in file and sheet order,
+        with categorical "Source File" and "Sheet" columns and a fresh
+        integer index.
+    errors : pandas.DataFrame
+        The validation errors of every source (see `validate_products`),
+        "Row" being the row in its own sheet, with the source columns first.
+    report : pandas.DataFrame
+        One `REPORT_COLUMNS` row per source; "Error" is empty for sources
+        that were read.
+    """
+    sources = list_sources(files)
+    results = [None] * len(sources)
+    report = [None] * len(sources)
+
+    def finish(i, products, errors, seconds, error):
+        file_name, _, sheet, _ = sources[i]
+        results[i] = (products, errors)
+        report[i] = {
+            "Source File": file_name,
+            "Sheet": sheet,
+            "Rows": 0 if products is None else len(products),
+            "Rows left out": 0 if errors is None else errors["Row"].nunique(),
+            "Seconds": seconds,
+            "Error": error,
+        }
+        if progress is not None:
+            progress(sum(row is not None for row in report), len(sources), report[i])
+
+    pending = {}
+    record = recording_stages()
+    n_workers = max(1, min(resolve_workers(workers), len(sources)))
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        for i, (file_name, data, sheet, error) in enumerate(sources):
+            if error is None:
+                pending[pool.submit(_read_and_validate, file_name, data, sheet, cache, sidecar_dir, record)] = i
+        for i, (_, _, _, error) in enumerate(sources):
+            if error is not None:
+                finish(i, None, None, 0.0, error)
+        for future in as_completed(pending):
+            *result, records = future.result()
+            merge_stages(records)
+            finish(pending[future], *result)
+
+    report = pd.DataFrame(report, columns=REPORT_COLUMNS)
+    return _combine(sources, results), _combine_errors(sources, results), report
+
+
+def _combine(sources, results):
+    counts = [0 if products is None else len(products) for products, _ in results]
+    frames = [products for products, _ in results if products is not None]
+    if not frames:
+        return pd.DataFrame(columns=SOURCE_COLUMNS)
+    combined = pd.concat(frames, ignore_index=True)
+    positions = np.repeat(np.arange(len(sources)), counts)
+    for column, field in zip(SOURCE_COLUMNS, (0, 2)):
+        labels = np.array([source[field] for source in sources], dtype=object)
+        combined.insert(SOURCE_COLUMNS.index(column), column, pd.Categorical(labels[positions]))
+    return combined
+
+
+def _combine_errors(sources, results):
+    parts = [
+        errors.assign(**{"Source File": file_name, "Sheet": sheet})
+        for (file_name, _, sheet, _), (_, errors) in zip(sources, results)
+        if errors is not None and len(errors)
+    ]
+    if not parts:
+        return pd.DataFrame(columns=SOURCE_COLUMNS + ERROR_COLUMNS)
+    errors = pd.concat(parts, ignore_index=True)
+    return errors[SOURCE_COLUMNS + [column for column in errors.columns if column not in SOURCE_COLUMNS]]
+
+
+def with_sources(result_df, products):
+    """Add the source columns of `products` to the result table scored from it (matched on the index)."""
+    sources = {column: products[column].reindex(result_df.index) for column in SOURCE_COLUMNS}
+    return pd.concat([pd.DataFrame(sources, index=result_df.index), result_df], axis=1)
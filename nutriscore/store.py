@@ -0,0 +1,344 @@
+"""
+Local result store: every scored run kept in an SQLite file.
+
+`ResultStore.add_run` appends a scored table (as built by
+`process_dataframe`) with its run timestamp, source and
+`ALGORITHM_VERSION`; the results are indexed by run, category and grade and
+by product ID, and grade counts per run, category and brand are kept in a
+summary table at insert time. `query` answers questions such as "E-grade
+beverages with sweeteners in the last run" and `grade_distribution` the
+grade mix per brand or category over the last runs, both without rescoring
+anything.
+"""
+
+import os
+import sqlite3
+import time
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from .columns import COMPONENT_COLUMNS, NUTRIENT_COLUMNS
+from .tables import ALGORITHM_VERSION, CATEGORY_THRESHOLDS, GRADES
+
+DEFAULT_STORE_PATH = "nutriscore_results.sqlite"
+
+# SQLite page cache per connection
+CACHE_KIB = 64 * 1024
+
+# Bump when the tables below change; older store files are refused rather than misread
+STORE_SCHEMA_VERSION = 1
+
+# Result table column -> (store column, SQL type)
+STORE_COLUMNS = {
+    "Product Name": ("product_id", "TEXT"),
+    "Category": ("category", "TEXT NOT NULL"),
+    "Nutri-Score Grade": ("grade", "TEXT NOT NULL"),
+    "Nutri-Score Points": ("points", "INTEGER NOT NULL"),
+    "N-points Total": ("n_points", "INTEGER NOT NULL"),
+    "P-points Total": ("p_points", "INTEGER NOT NULL"),
+    "Energy (kJ/100 g)": ("energy", "REAL"),
+    "Sugar (g/100 g)": ("sugar", "REAL"),
+    "Saturates (g/100 g)": ("saturates", "REAL"),
+    "Salt (g/100 g)": ("salt", "REAL"),
+    "Fruits, vegetables, and pulses (%)": ("fruit", "REAL"),
+    "Fibre (g/100 g)": ("fibre", "REAL"),
+    "Protein (g/100 g)": ("protein", "REAL"),
+    "Contains sweeteners": ("sweeteners", "INTEGER NOT NULL"),
+    "Is red meat": ("red_meat", "INTEGER NOT NULL"),
+    "Is Water": ("water", "INTEGER NOT NULL"),
+}
+FLAG_RESULT_COLUMNS = ["Contains sweeteners", "Is red meat", "Is Water"]
+
+# The eight component points are packed into one integer, a byte each in
+# `COMPONENT_COLUMNS` order from the lowest byte: every bound value costs
+# insert time, and the components are read back but never filtered on.
+COMPONENT_STORE_COLUMN = "component_points"
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    source TEXT NOT NULL,
+    algorithm_version TEXT NOT NULL,
+    n_rows INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    brand TEXT,
+    {", ".join(f"{name} {sql_type}" for name, sql_type in STORE_COLUMNS.values())},
+    {COMPONENT_STORE_COLUMN} INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_run_category_grade ON results (run_id, category, grade);
+CREATE INDEX IF NOT EXISTS results_product ON results (product_id, run_id);
+CREATE TABLE IF NOT EXISTS grade_counts (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    category TEXT NOT NULL,
+    brand TEXT,
+    grade TEXT NOT NULL,
+    n_products INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS grade_counts_run ON grade_counts (run_id);
+"""
+
+
+class ResultStore:
+    """
+    SQLite file of scored runs; use as a context manager or call `close`.
+
+    Parameters
+    ----------
+    path : str
+        Store file, created with its tables on first use (":memory:" for a
+        throwaway store).
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode = WAL")  # readers do not block a running insert
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        # Product IDs arrive in no index order; a larger page cache keeps their index pages in memory
+        self._connection.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, STORE_SCHEMA_VERSION):
+            self._connection.close()
+            raise ValueError(f"{path} is a result store of schema {version}, expected {STORE_SCHEMA_VERSION}")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {STORE_SCHEMA_VERSION}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def add_run(self, result_df, source="", brands=None, created_at=None):
+        """
+        Store a scored table as a new run; returns its run ID.
+
+        Parameters
+        ----------
+        result_df : pandas.DataFrame
+            Table built by `process_dataframe`. Optional flag and name
+            columns may be missing (stored as no and NULL).
+        source : str
+            Where the products came from, e.g. the uploaded file name.
+        brands : array-like, optional
+            Brand of every row, for `grade_distribution(by="brand")`.
+        created_at : float, optional
+            Run time as a Unix timestamp; now by default.
+        """
+        n_rows = len(result_df)
+        created_at = time.time() if created_at is None else created_at
+        values = []
+        for column, (_, sql_type) in STORE_COLUMNS.items():
+            if column in result_df.columns:
+                values.append(_sql_values(result_df[column]))
+            elif column in FLAG_RESULT_COLUMNS:
+                values.append(repeat(0, n_rows))
+            elif column == "Product Name":
+                values.append(repeat(None, n_rows))
+            else:
+                raise ValueError(f"Missing result column {column!r}")
+        values.append(pack_components(result_df).tolist())
+        brand_values = _sql_values(pd.Series(brands, index=result_df.index)) if brands is not None else None
+
+        names = ["run_id", "brand"] + [name for name, _ in STORE_COLUMNS.values()] + [COMPONENT_STORE_COLUMN]
+        insert = f"INSERT INTO results ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+        with self._connection:
+            run_id = self._connection.execute(
+                "INSERT INTO runs (created_at, source, algorithm_version, n_rows) VALUES (?, ?, ?, ?)",
+                (created_at, source, ALGORITHM_VERSION, n_rows),
+            ).lastrowid
+            rows = zip(repeat(run_id), brand_values if brand_values is not None else repeat(None), *values)
+            self._connection.executemany(insert, rows)
+            self._connection.executemany(
+                "INSERT INTO grade_counts (run_id, category, brand, grade, n_products) VALUES (?, ?, ?, ?, ?)",
+                _grade_counts(run_id, result_df, brands),
+            )
+        return run_id
+
+    def runs(self, limit=None):
+        """Stored runs, newest first: run ID, timestamp, source, algorithm version and row count."""
+        return pd.read_sql_query(
+            "SELECT run_id, created_at, source, algorithm_version, n_rows FROM runs "
+            "ORDER BY created_at DESC, run_id DESC" + (" LIMIT ?" if limit else ""),
+            self._connection, params=(limit,) if limit else (),
+        ).assign(created_at=lambda runs: _timestamps(runs["created_at"]))
+
+    def latest_run(self):
+        """ID of the newest run (None for an empty store)."""
+        row = self._connection.execute("SELECT run_id FROM runs ORDER BY created_at DESC, run_id DESC LIMIT 1").fetchone()
+        return None if row is None else row[0]
+
+    def query(self, run_id=None, grades=None, categories=None, contains_sweeteners=None, is_red_meat=None,
+              product_id=None, brand=None, limit=None):
+        """
+        Stored results matching every given filter, as a result table.
+
+        Parameters
+        ----------
+        run_id : int, optional
+            Run to search; the newest run by default. With `product_id` and
+            no run ID, all runs are searched (the product's history).
+        grades, categories : list of str, optional
+            Keep only these grades and category keys.
+        contains_sweeteners, is_red_meat : bool, optional
+            Keep only products with (True) or without (False) the flag.
+        product_id, brand : str, optional
+            Keep only this product or brand.
+        limit : int, optional
+            Return at most this many rows.
+
+        Returns
+        -------
+        pandas.DataFrame
+            "Run" and "Brand" plus the `process_dataframe` result columns,
+            in stored order (by run for a product history).
+        """
+        conditions, params = [], []
+        if run_id is None and product_id is None:
+            run_id = self.latest_run()
+        if run_id is not None:
+            conditions.append("run_id = ?")
+            params.append(run_id)
+        for column, wanted in (("grade", grades), ("category", categories)):
+            if wanted is not None:
+                conditions.append(f"{column} IN ({', '.join('?' * len(wanted))})")
+                params.extend(wanted)
+        for column, flag in (("sweeteners", contains_sweeteners), ("red_meat", is_red_meat)):
+            if flag is not None:
+                conditions.append(f"{column} = ?")
+                params.append(int(flag))
+        for column, value in (("product_id", product_id), ("brand", brand)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        store_names = [name for name, _ in STORE_COLUMNS.values()] + [COMPONENT_STORE_COLUMN]
+        sql = f"SELECT run_id, brand, {', '.join(store_names)} FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY run_id, rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._connection.execute(sql, params).fetchall()
+        return _result_frame(rows, ["Run", "Brand"] + list(STORE_COLUMNS) + [COMPONENT_STORE_COLUMN])
+
+    def grade_distribution(self, by="category", last_runs=10, categories=None):
+        """
+        Products per grade for every run and `by` group ("category" or "brand").
+
+        Covers the `last_runs` newest runs (all runs if None), optionally only
+        some category keys. Returns one row per (run, group) with the run
+        time and a count column per grade, newest run first. Read from the
+        per-run summary written by `add_run`, so the cost does not grow with
+        the size of the runs.
+        """
+        if by not in ("category", "brand"):
+            raise ValueError(f"Cannot group grades by {by!r} (use 'category' or 'brand')")
+        sql = (
+            f"SELECT runs.run_id, runs.created_at, grade_counts.{by}, grade_counts.grade, "
+            "SUM(grade_counts.n_products) FROM grade_counts JOIN runs USING (run_id) "
+            "WHERE run_id IN (SELECT run_id FROM runs ORDER BY created_at DESC, run_id DESC LIMIT ?)"
+        )
+        params = [-1 if last_runs is None else last_runs]
+        if categories is not None:
+            sql += f" AND grade_counts.category IN ({', '.join('?' * len(categories))})"
+            params.extend(categories)
+        sql += f" GROUP BY runs.run_id, grade_counts.{by}, grade_counts.grade"
+        group = by.title()
+        counts = pd.DataFrame(
+            self._connection.execute(sql, params).fetchall(), columns=["Run", "Run time", group, "Grade", "Products"]
+        )
+        table = (
+            counts.groupby(["Run", "Run time", group, "Grade"], dropna=False)["Products"].sum()
+            .unstack("Grade", fill_value=0)
+            .reindex(columns=GRADES, fill_value=0)
+        )
+        table.columns.name = None
+        table = table.reset_index().sort_values(["Run", group], ascending=[False, True], ignore_index=True)
+        return table.assign(**{"Run time": _timestamps(table["Run time"])})
+
+    def delete_run(self, run_id):
+        """Remove a run and its results."""
+        with self._connection:
+            for table in ("results", "grade_counts", "runs"):
+                self._connection.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+
+def _sql_values(column):
+    """A result column as a list of plain Python values (NULL for missing cells)."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype(object)
+    if column.dtype == object or isinstance(column.dtype, pd.StringDtype):
+        return [None if value is None or value != value else str(value) for value in column.tolist()]
+    if column.dtype == bool:
+        return column.to_numpy().astype(np.int8).tolist()
+    return column.tolist()
+
+
+def _grade_counts(run_id, result_df, brands):
+    """Rows of the grade_counts summary of one run."""
+    groups = {
+        "category": result_df["Category"].astype(object).to_numpy(),
+        "grade": result_df["Nutri-Score Grade"].astype(object).to_numpy(),
+    }
+    groups["brand"] = (
+        pd.Series(brands, index=result_df.index).astype(object).to_numpy()
+        if brands is not None else np.full(len(result_df), None, dtype=object)
+    )
+    counts = pd.DataFrame(groups).value_counts(["category", "brand", "grade"], dropna=False)
+    for (category, brand, grade), n_products in counts.items():
+        brand = None if brand is None or brand != brand else str(brand)
+        yield run_id, category, brand, grade, int(n_products)
+
+
+def pack_components(result_df):
+    """The component points of every row packed into one int64 (see `COMPONENT_STORE_COLUMN`)."""
+    packed = np.zeros(len(result_df), dtype=np.int64)
+    for i, column in enumerate(COMPONENT_COLUMNS):
+        packed |= result_df[column].to_numpy().astype(np.uint8).astype(np.int64) << (8 * i)
+    return packed
+
+
+def unpack_components(packed):
+    """Inverse of `pack_components`: component column -> int8 points."""
+    packed = np.asarray(packed, dtype=np.int64)
+    return {
+        column: ((packed >> (8 * i)) & 0xFF).astype(np.uint8).astype(np.int8)
+        for i, column in enumerate(COMPONENT_COLUMNS)
+    }
+
+
+def _timestamps(seconds):
+    """Unix timestamps as datetimes to the second."""
+    return pd.to_datetime(seconds, unit="s").dt.floor("s")
+
+
+def _result_frame(rows, columns):
+    """Stored rows as a result table: categorical categories and grades, bool flags."""
+    df = pd.DataFrame(rows, columns=columns)
+    df = df.drop(columns=COMPONENT_STORE_COLUMN).assign(**unpack_components(df[COMPONENT_STORE_COLUMN]))
+    df["Category"] = pd.Categorical(df["Category"], categories=list(CATEGORY_THRESHOLDS))
+    df["Nutri-Score Grade"] = pd.Categorical(df["Nutri-Score Grade"], categories=GRADES, ordered=True)
+    for column in FLAG_RESULT_COLUMNS:
+        df[column] = df[column].astype(bool)
+    for column in ("Nutri-Score Points", "N-points Total", "P-points Total"):
+        df[column] = df[column].astype(np.int16)
+    for column in NUTRIENT_COLUMNS:
+        df[column] = df[column].astype(float)
+    return df
+
+
+def default_store_path():
+    """Store file of the app: $NUTRISCORE_STORE or `DEFAULT_STORE_PATH`."""
+    return os.environ.get("NUTRISCORE_STORE", DEFAULT_STORE_PATH)
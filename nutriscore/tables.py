@@ -0,0 +1,283 @@
+"""
+Scoring tables for the 2023 Nutri-Score algorithm.
+
+Holds the category thresholds and the per-category component tables as
+(low, high, points) bins, plus their compiled `ScoringTable` form used by
+the scoring functions. Importing this module does not import NumPy.
+"""
+
+from bisect import bisect_left
+
+# Identifies the tables and rules below; bump it whenever a scoring result
+# could change, so cached and stored results from older rules are not reused.
+ALGORITHM_VERSION = "2023.1"
+
+# ----------------------------
+# Category-specific scoring thresholds
+# ----------------------------
+CATEGORY_THRESHOLDS = {
+    "general": [(-float("inf"), 0, "A"), (1, 2, "B"), (3, 10, "C"), (11, 18, "D"), (19, float("inf"), "E")],
+    "drink": [(-float("inf"), 2, "B"), (3, 6, "C"), (7, 9, "D"), (10, float("inf"), "E")],
+    "fat": [(-float("inf"), -6, "A"), (-5, 2, "B"), (3, 10, "C"), (11, 18, "D"), (19, float("inf"), "E")]
+}
+
+# Nutri-Score grades, best first
+GRADES = ["A", "B", "C", "D", "E"]
+
+CATEGORY_MAP = {
+    "General food (incl. red meat and cheese)": "general",
+    "Fats, oils, nuts and seeds": "fat",
+    "Beverages": "drink"
+}
+
+# Accepted spellings in an optional per-row "Category" column (case-insensitive)
+CATEGORY_ALIASES = {
+    **{label.lower(): category for label, category in CATEGORY_MAP.items()},
+    **{category: category for category in CATEGORY_THRESHOLDS},
+}
+
+# ----------------------------
+# Component scoring tables (updated for beverages)
+# ----------------------------
+# FIXED: Updated tables based on PDF documentation
+ENERGY_SCORING = {
+    "general": [(0, 335, 0), (335, 670, 1), (670, 1005, 2), (1005, 1340, 3), (1340, 1675, 4), 
+               (1675, 2010, 5), (2010, 2345, 6), (2345, 2680, 7), (2680, 3015, 8), 
+               (3015, 3350, 9), (3350, float("inf"), 10)],
+    "drink": [
+        (float("-inf"), 30, 0),
+        (30, 90, 1),
+        (90, 150, 2),
+        (150, 210, 3),
+        (210, 240, 4),
+        (240, 270, 5),
+        (270, 300, 6),
+        (300, 330, 7),
+        (330, 360, 8),
+        (360, 390, 9),
+        (390, float("inf"), 10)
+    ],
+    "fat": [(0, 120, 0), (120, 240, 1), (240, 360, 2), (360, 480, 3), (480, 600, 4), 
+           (600, 720, 5), (720, 840, 6), (840, 960, 7), (960, 1080, 8), 
+           (1080, 1200, 9), (1200, float("inf"), 10)]
+}
+
+SUGAR_SCORING = {
+    "general": [(0, 3.4, 0), (3.4, 6.8, 1), (6.8, 10, 2), (10, 14, 3), (14, 17, 4), 
+               (17, 20, 5), (20, 24, 6), (24, 27, 7), (27, 31, 8), 
+               (31, 34, 9), (34, float("inf"), 10)],
+    "drink": [
+        (float("-inf"), 0.5, 0),
+        (0.5, 2, 1),
+        (2, 3.5, 2),
+        (3.5, 5, 3),
+        (5, 6, 4),
+        (6, 7, 5),
+        (7, 8, 6),
+        (8, 9, 7),
+        (9, 10, 8),
+        (10, 11, 9),
+        (11, float("inf"), 10)
+    ],
+    "fat": [(0, 3.4, 0), (3.4, 6.8, 1), (6.8, 10, 2), (10, 14, 3), (14, 17, 4), 
+           (17, 20, 5), (20, 24, 6), (24, 27, 7), (27, 31, 8), 
+           (31, 34, 9), (34, float("inf"), 10)]
+}
+
+# FIXED: Updated to match PDF documentation exactly for beverages
+SAT_FAT_SCORING = {
+    "general": [(0, 1, 0), (1, 2, 1), (2, 3, 2), (3, 4, 3), (4, 5, 4), 
+               (5, 6, 5), (6, 7, 6), (7, 8, 7), (8, 9, 8), 
+               (9, 10, 9), (10, float("inf"), 10)],
+    "drink": [
+        (float("-inf"), 1, 0),
+        (1, 2, 1),
+        (2, 3, 2),
+        (3, 4, 3),
+        (4, 5, 4),
+        (5, 6, 5),
+        (6, 7, 6),
+        (7, 8, 7),
+        (8, 9, 8),
+        (9, 10, 9),
+        (10, float("inf"), 10)
+    ],
+    "fat": [(0, 10, 0), (10, 16, 1), (16, 22, 2), (22, 28, 3), (28, 34, 4), 
+           (34, 40, 5), (40, 46, 6), (46, 52, 7), (52, 58, 8), 
+           (58, 64, 9), (64, float("inf"), 10)]
+}
+
+# FIXED: Salt scoring for beverages from the PDF
+SALT_SCORING = {
+    "general": [(0, 0.2, 0), (0.2, 0.4, 1), (0.4, 0.6, 2), (0.6, 0.8, 3), (0.8, 1.0, 4), 
+               (1.0, 1.2, 5), (1.2, 1.4, 6), (1.4, 1.6, 7), (1.6, 1.8, 8), 
+               (1.8, 2.0, 9), (2.0, float("inf"), 10)],
+    "drink": [
+        (float("-inf"), 0.2, 0),
+        (0.2, 0.4, 1),
+        (0.4, 0.6, 2),
+        (0.6, 0.8, 3),
+        (0.8, 1.0, 4),
+        (1.0, 1.2, 5),
+        (1.2, 1.4, 6),
+        (1.4, 1.6, 7),
+        (1.6, 1.8, 8),
+        (1.8, 2.0, 9),
+        (2.0, 2.2, 10),
+        (2.2, 2.4, 11),
+        (2.4, 2.6, 12),
+        (2.6, 2.8, 13),
+        (2.8, 3.0, 14),
+        (3.0, 3.2, 15),
+        (3.2, 3.4, 16),
+        (3.4, 3.6, 17),
+        (3.6, 3.8, 18),
+        (3.8, 4.0, 19),
+        (4.0, float("inf"), 20)
+    ],
+    "fat": [(0, 0.2, 0), (0.2, 0.4, 1), (0.4, 0.6, 2), (0.6, 0.8, 3), (0.8, 1.0, 4), 
+           (1.0, 1.2, 5), (1.2, 1.4, 6), (1.4, 1.6, 7), (1.6, 1.8, 8), 
+           (1.8, 2.0, 9), (2.0, float("inf"), 10)]
+}
+
+# FIXED: Updated fruit scoring for beverages per PDF
+FRUIT_SCORING = {
+    "general": [(0, 40, 0), (40, 60, 1), (60, 80, 2), (80, float("inf"), 5)],
+    "drink": [
+        (float("-inf"), 40, 0),
+        (40, 60, 2),
+        (60, 80, 4),
+        (80, float("inf"), 6)
+    ],
+    "fat": [(0, 40, 0), (40, 60, 1), (60, 80, 2), (80, float("inf"), 5)]
+}
+
+FIBRE_SCORING = {
+    "general": [(0, 3.0, 0), (3.0, 4.1, 1), (4.1, 5.2, 2), (5.2, 6.3, 3), (6.3, 7.4, 4), (7.4, float("inf"), 5)],
+    "drink": [
+        (float("-inf"), 3.0, 0),
+        (3.0, 4.1, 1),
+        (4.1, 5.2, 2),
+        (5.2, 6.3, 3),
+        (6.3, 7.4, 4),
+        (7.4, float("inf"), 5)
+    ],
+    "fat": [(0, 3.0, 0), (3.0, 4.1, 1), (4.1, 5.2, 2), (5.2, 6.3, 3), (6.3, 7.4, 4), (7.4, float("inf"), 5)]
+}
+
+PROTEIN_SCORING = {
+    "general": [(0, 2.4, 0), (2.4, 4.8, 1), (4.8, 7.2, 2), (7.2, 9.6, 3), (9.6, 12.0, 4), (12.0, float("inf"), 5)],
+    "drink": [
+        (float("-inf"), 1.2, 0),
+        (1.2, 1.5, 1),
+        (1.5, 1.8, 2),
+        (1.8, 2.1, 3),
+        (2.1, 2.4, 4),
+        (2.4, 2.7, 5),
+        (2.7, 3.0, 6),
+        (3.0, float("inf"), 7)
+    ],
+    "fat": [(0, 2.4, 0), (2.4, 4.8, 1), (4.8, 7.2, 2), (7.2, 9.6, 3), (9.6, 12.0, 4), (12.0, float("inf"), 5)]
+}
+
+# ----------------------------
+# Compiled scoring tables (built once at import)
+# ----------------------------
+class ScoringTable:
+    """
+    Immutable, sorted form of a scoring table with binary-search lookups.
+
+    Parameters
+    ----------
+    bins : list of tuple
+        (low, high, value) bins as in the `*_SCORING` tables or
+        `CATEGORY_THRESHOLDS`. Bins must not overlap.
+    default : optional
+        Value returned when no bin matches. Defaults to the value of the
+        highest bin, like `score_component`.
+    include_low : bool
+        If True a bin matches `low <= value <= high` (grade thresholds),
+        otherwise `low < value <= high` (component tables).
+    """
+
+    __slots__ = ("lows", "highs", "values", "default", "include_low", "_arrays")
+
+    def __init__(self, bins, default=None, include_low=False):
+        bins = sorted(bins, key=lambda b: b[1])
+        lows = tuple(float(low) for low, _, _ in bins)
+        highs = tuple(float(high) for _, high, _ in bins)
+        values = tuple(value for _, _, value in bins)
+        if any(low > high for low, high in zip(lows, highs)) or any(
+            highs[i] > lows[i + 1] for i in range(len(bins) - 1)
+        ):
+            raise ValueError("Scoring table bins must not overlap")
+
+        setattr_ = object.__setattr__
+        setattr_(self, "lows", lows)
+        setattr_(self, "highs", highs)
+        setattr_(self, "values", values)
+        setattr_(self, "default", values[-1] if default is None else default)
+        setattr_(self, "include_low", include_low)
+        setattr_(self, "_arrays", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ScoringTable is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ScoringTable is immutable")
+
+    def __len__(self):
+        return len(self.highs)
+
+    def __repr__(self):
+        return f"ScoringTable({list(zip(self.lows, self.highs, self.values))!r})"
+
+    def lookup(self, value):
+        """Return the value of the bin containing `value` (scalar)."""
+        i = bisect_left(self.highs, value)
+        if i < len(self.highs):
+            low = self.lows[i]
+            if low <= value if self.include_low else low < value:
+                return self.values[i]
+        return self.default
+
+    def lookup_many(self, values):
+        """Return the bin value for every element of an array of values."""
+        import numpy as np
+
+        lows, highs, table_values = self._as_arrays()
+        values = np.asarray(values, dtype=float)
+        idx = np.searchsorted(highs, values, side="left")
+        clipped = np.minimum(idx, len(highs) - 1)
+        bin_lows = lows[clipped]
+        in_bin = bin_lows <= values if self.include_low else bin_lows < values
+        return np.where((idx < len(highs)) & in_bin, table_values[clipped], self.default)
+
+    def _as_arrays(self):
+        # NumPy is only imported (and the arrays built) on the first batch lookup
+        if self._arrays is None:
+            import numpy as np
+
+            if isinstance(self.values[0], str):
+                dtype = object
+            else:
+                # Points fit in int8, which keeps batch results compact
+                dtype = np.int8 if all(-128 <= value <= 127 for value in self.values + (self.default,)) else np.int64
+            arrays = (np.array(self.lows), np.array(self.highs), np.array(self.values, dtype=dtype))
+            for array in arrays:
+                array.flags.writeable = False
+            object.__setattr__(self, "_arrays", arrays)
+        return self._arrays
+
+def _compile_tables(tables, **kwargs):
+    return {category: ScoringTable(bins, **kwargs) for category, bins in tables.items()}
+
+ENERGY_TABLES = _compile_tables(ENERGY_SCORING)
+SUGAR_TABLES = _compile_tables(SUGAR_SCORING)
+SAT_FAT_TABLES = _compile_tables(SAT_FAT_SCORING)
+SALT_TABLES = _compile_tables(SALT_SCORING)
+FRUIT_TABLES = _compile_tables(FRUIT_SCORING)
+FIBRE_TABLES = _compile_tables(FIBRE_SCORING)
+PROTEIN_TABLES = _compile_tables(PROTEIN_SCORING)
+GRADE_TABLES = _compile_tables(CATEGORY_THRESHOLDS, default="E", include_low=True)
+
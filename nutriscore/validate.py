@@ -0,0 +1,204 @@
+"""
+Validation and coercion of product tables before scoring.
+
+`validate_products` turns the nutrient and flag columns of a product table
+into float and bool columns, column by column, reading text cells the way
+`parse_number` and `parse_flag` read single cells: comma decimals ("1,2"),
+"n/a" and similar as empty, yes/no flags in any case. Cells the scorer
+cannot use (empty, unreadable or out-of-range nutrients, unrecognized flags,
+unknown categories) are listed in a per-row error report, and their rows are
+left out, so the engine only ever sees clean, typed arrays. `coerce_products`
+reads the cells the same way but keeps every row, for callers that score
+whatever they are given.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .columns import (
+    FALSE_FLAG_VALUES,
+    FLAG_COLUMNS,
+    MISSING_VALUES,
+    NUTRIENT_COLUMNS,
+    NUTRIENT_RANGES,
+    TRUE_FLAG_VALUES,
+)
+from .tables import CATEGORY_ALIASES
+
+ERROR_COLUMNS = ["Row", "Column", "Value", "Problem"]
+
+# File row of the first product (row 1 is the header)
+FIRST_ROW = 2
+
+
+def _lower_text(values):
+    return values.astype("string").str.strip().str.lower()
+
+
+def _arrow_floats(values):
+    """Cast a text column to floats with pyarrow, or return None if a cell is not a plain number."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return None  # optional: pandas reads the column instead, more slowly
+    try:
+        return pc.cast(pa.array(values, from_pandas=True), pa.float64()).to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+
+
+def coerce_numbers(values, name):
+    """
+    Read a column of nutrient cells (pandas Series) as floats.
+
+    Returns the float values (NaN where unusable) and a dict of problem
+    description -> bool mask of the cells with that problem.
+    """
+    unreadable = np.zeros(len(values), dtype=bool)
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+    else:
+        numbers = _arrow_floats(values)
+    if numbers is None:
+        # Text rules, for the whole column at once: missing-value text, decimal commas
+        text = _lower_text(values)
+        text = text.where(~text.isin(MISSING_VALUES))
+        comma = (text.str.count(",") == 1) & ~text.str.contains(".", regex=False)
+        text = text.where(~comma.fillna(False), text.str.replace(",", ".", regex=False))
+        numbers = _arrow_floats(text)
+        if numbers is None:
+            numbers = pd.to_numeric(text, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            unreadable = np.isnan(numbers) & text.notna().to_numpy()
+
+    low, high = NUTRIENT_RANGES[name]
+    with np.errstate(invalid="ignore"):
+        out_of_range = (numbers < low) | (numbers > high)
+    return numbers, {
+        "not a number": unreadable,
+        "missing value": np.isnan(numbers) & ~unreadable,
+        f"outside {low:g} to {high:g}": out_of_range,
+    }
+
+
+def coerce_flags(values):
+    """
+    Read a column of flag cells (pandas Series) as bools.
+
+    Returns the bool values (False where unusable) and a dict of problem
+    description -> bool mask of the cells with that problem.
+    """
+    if pd.api.types.is_bool_dtype(values.dtype):
+        flags = values.to_numpy(dtype=bool, na_value=False)
+        invalid = np.zeros(len(values), dtype=bool)
+    elif pd.api.types.is_numeric_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+        flags = numbers == 1
+        invalid = ~np.isnan(numbers) & ~flags & (numbers != 0)
+    else:
+        text = _lower_text(values)
+        flags = text.isin(TRUE_FLAG_VALUES).to_numpy()
+        known = flags | text.isin(FALSE_FLAG_VALUES | MISSING_VALUES).to_numpy() | text.isna().to_numpy()
+        invalid = ~known
+    return flags, {"not a yes/no value": invalid}
+
+
+def _unknown_categories(values):
+    codes, labels = pd.factorize(values)
+    text = _lower_text(pd.Series(labels, dtype=object))
+    unknown = (~text.isin(list(CATEGORY_ALIASES)) & (text != "")).to_numpy()
+    return np.append(unknown, False)[codes]  # code -1 (empty cell) is the fallback category
+
+
+def _row_numbers(index, positions):
+    # File rows for frames with the default integer index (read_csv, the readers here)
+    if pd.api.types.is_integer_dtype(index.dtype):
+        return index[positions].to_numpy() + FIRST_ROW
+    return index[positions].to_numpy(dtype=object)
+
+
+def _coerce_columns(df):
+    """Coerced copy of `df` and the (column, problem, mask) of every problem found."""
+    missing_columns = [col for col in NUTRIENT_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    products = df.copy(deep=False)
+    problems = []
+    for name in NUTRIENT_COLUMNS:
+        products[name], masks = coerce_numbers(df[name], name)
+        problems.extend((name, problem, mask) for problem, mask in masks.items())
+    for name in FLAG_COLUMNS:
+        if name in df.columns:
+            products[name], masks = coerce_flags(df[name])
+            problems.extend((name, problem, mask) for problem, mask in masks.items())
+    return products, problems
+
+
+def coerce_products(df):
+    """
+    Coerce the scoring inputs of a product table without checking them.
+
+    Nutrient and flag cells are read as in `validate_products`, but every
+    row is kept: unreadable and empty nutrients become NaN (scored like the
+    row-wise rules score them, with the most unfavourable points), values
+    outside `NUTRIENT_RANGES` are scored as given and unrecognized flags
+    read as False.
+    """
+    return _coerce_columns(df)[0]
+
+
+def validate_products(df):
+    """
+    Check and coerce the scoring inputs of a product table.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Products with the `NUTRIENT_COLUMNS`, optional flag columns and an
+        optional "Category" column, as read from a file.
+
+    Returns
+    -------
+    products : pandas.DataFrame
+        The rows without problems (original index), with float nutrient
+        columns and bool flag columns; other columns are passed through.
+    errors : pandas.DataFrame
+        One row per unusable cell, in row order: "Row" (file row for frames
+        with the default integer index, header = row 1; otherwise the index
+        label), "Column", "Value" (the cell as read) and "Problem".
+    """
+    products, problems = _coerce_columns(df)
+    if "Category" in df.columns:
+        problems.append(("Category", "unknown category", _unknown_categories(df["Category"])))
+
+    parts = []
+    bad_rows = np.zeros(len(df), dtype=bool)
+    for name, problem, mask in problems:
+        if not mask.any():
+            continue
+        bad_rows |= mask
+        positions = np.flatnonzero(mask)
+        parts.append(pd.DataFrame({
+            "Row": _row_numbers(df.index, positions),
+            "Column": name,
+            "Value": df[name].iloc[positions].to_numpy(dtype=object),
+            "Problem": problem,
+            "_position": positions,
+        }))
+    if not parts:
+        return products, pd.DataFrame(columns=ERROR_COLUMNS)
+
+    errors = pd.concat(parts, ignore_index=True).sort_values("_position", kind="stable")
+    errors = errors.drop(columns="_position").reset_index(drop=True)
+    return products[~bad_rows], errors
+
+
+def describe_errors(errors, limit=3):
+    """One-line summary of an error report, naming its first `limit` cells."""
+    n_rows = errors["Row"].nunique()
+    first = "; ".join(
+        f"row {row}, {column!r}: {value!r} ({problem})"
+        for row, column, value, problem in errors[ERROR_COLUMNS].head(limit).itertuples(index=False)
+    )
+    return f"{len(errors)} invalid cells in {n_rows} rows ({first}{'; ...' if len(errors) > limit else ''})"
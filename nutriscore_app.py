@@ -12,6 +12,8 @@ Main Features
 - Calculates component points for energy, sugar, saturated fat, salt, fibre, fruit/veg, and protein
 - Applies category-specific rules (e.g., sweetener penalty, red meat protein cap)
 - Returns Nutri-Score points and final grade (A–E)
+- Scoring core lives in the `nutriscore` package and can run without Streamlit:
+  `python -m nutriscore score input.csv -o out.parquet --category drink`
 
 References
 ----------
@@ -24,454 +26,587 @@ Last Modified: 11-11-2025
 
 """
 
+import os
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from importlib.util import find_spec
+
 import streamlit as st
 import pandas as pd
 
-# ----------------------------
-# Category-specific scoring thresholds
-# ----------------------------
-CATEGORY_THRESHOLDS = {
-    "general": [(-float("inf"), 0, "A"), (1, 2, "B"), (3, 10, "C"), (11, 18, "D"), (19, float("inf"), "E")],
-    "drink": [(-float("inf"), 2, "B"), (3, 6, "C"), (7, 9, "D"), (10, float("inf"), "E")],
-    "fat": [(-float("inf"), -6, "A"), (-5, 2, "B"), (3, 10, "C"), (11, 18, "D"), (19, float("inf"), "E")]
-}
-
-CATEGORY_MAP = {
-    "General food (incl. red meat and cheese)": "general",
-    "Fats, oils, nuts and seeds": "fat",
-    "Beverages": "drink"
+# The scoring core lives in the `nutriscore` package (no Streamlit needed);
+# its names are re-exported here for code that imports them from this app.
+from nutriscore.columns import COMPONENT_COLUMNS, FLAG_COLUMNS, NUTRIENT_COLUMNS, SOURCE_COLUMNS  # noqa: F401
+from nutriscore.tables import (  # noqa: F401
+    ALGORITHM_VERSION,
+    CATEGORY_ALIASES,
+    CATEGORY_MAP,
+    CATEGORY_THRESHOLDS,
+    ENERGY_SCORING,
+    ENERGY_TABLES,
+    FIBRE_SCORING,
+    FIBRE_TABLES,
+    FRUIT_SCORING,
+    FRUIT_TABLES,
+    GRADE_TABLES,
+    GRADES,
+    PROTEIN_SCORING,
+    PROTEIN_TABLES,
+    SALT_SCORING,
+    SALT_TABLES,
+    SAT_FAT_SCORING,
+    SAT_FAT_TABLES,
+    SUGAR_SCORING,
+    SUGAR_TABLES,
+    ScoringTable,
+)
+from nutriscore.scoring import (  # noqa: F401
+    compute_score,
+    get_energy_from_sat_fat_points,
+    get_energy_points,
+    get_fibre_points,
+    get_fruit_points,
+    get_grade,
+    get_individual_scores,
+    get_protein_points,
+    get_sat_fat_points,
+    get_sodium_points,
+    get_sugar_points,
+    score_component,
+    score_product,
+)
+from nutriscore.engine import get_grade_array, score_columns, score_columns_by_category  # noqa: F401
+from nutriscore.frame import (  # noqa: F401
+    SORT_COLUMNS,
+    build_display_frame,
+    process_dataframe,
+    resolve_categories,
+    score_csv_stream,
+    reformulation_table,
+    migration_matrix,
+    select_rows,
+    sensitivity_table,
+    summarize_results,
+    version_table,
+)
+from nutriscore.reformulate import reformulation_options
+from nutriscore.rules import RULE_PACKS
+from nutriscore.store import ResultStore, default_store_path
+from nutriscore.parallel import process_dataframe_parallel
+from nutriscore.cache import ResultCache, content_hash, scored_key
+from nutriscore.incremental import DEFAULT_ID_COLUMN, FINGERPRINT_COLUMN, rescore_changed, summarize_changes
+from nutriscore.instrument import log_stages_to_stderr, profile_to, record_stages, stage
+from nutriscore.sources import read_sources, with_sources
+from nutriscore.export import parquet_bytes, write_result_frame  # noqa: F401
+
+# Rows per page offered by the result browser
+PAGE_SIZES = [25, 100, 500]
+
+# Download formats: label -> (file suffix, MIME type, optional package it needs)
+DOWNLOAD_FORMATS = {
+    "CSV": (".csv", "text/csv", None),
+    "CSV (gzip)": (".csv.gz", "application/gzip", None),
+    "CSV (zstd)": (".csv.zst", "application/zstd", "zstandard"),
+    "Excel (one sheet per category)": (
+        ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", None
+    ),
+    "Parquet": (".parquet", "application/vnd.apache.parquet", "pyarrow"),
 }
 
 # ----------------------------
-# Component scoring tables (updated for beverages)
+# Upload cache (shared across reruns and sessions)
 # ----------------------------
-# FIXED: Updated tables based on PDF documentation
-ENERGY_SCORING = {
-    "general": [(0, 335, 0), (335, 670, 1), (670, 1005, 2), (1005, 1340, 3), (1340, 1675, 4), 
-               (1675, 2010, 5), (2010, 2345, 6), (2345, 2680, 7), (2680, 3015, 8), 
-               (3015, 3350, 9), (3350, float("inf"), 10)],
-    "drink": [
-        (float("-inf"), 30, 0),
-        (30, 90, 1),
-        (90, 150, 2),
-        (150, 210, 3),
-        (210, 240, 4),
-        (240, 270, 5),
-        (270, 300, 6),
-        (300, 330, 7),
-        (330, 360, 8),
-        (360, 390, 9),
-        (390, float("inf"), 10)
-    ],
-    "fat": [(0, 120, 0), (120, 240, 1), (240, 360, 2), (360, 480, 3), (480, 600, 4), 
-           (600, 720, 5), (720, 840, 6), (840, 960, 7), (960, 1080, 8), 
-           (1080, 1200, 9), (1200, float("inf"), 10)]
-}
-
-SUGAR_SCORING = {
-    "general": [(0, 3.4, 0), (3.4, 6.8, 1), (6.8, 10, 2), (10, 14, 3), (14, 17, 4), 
-               (17, 20, 5), (20, 24, 6), (24, 27, 7), (27, 31, 8), 
-               (31, 34, 9), (34, float("inf"), 10)],
-    "drink": [
-        (float("-inf"), 0.5, 0),
-        (0.5, 2, 1),
-        (2, 3.5, 2),
-        (3.5, 5, 3),
-        (5, 6, 4),
-        (6, 7, 5),
-        (7, 8, 6),
-        (8, 9, 7),
-        (9, 10, 8),
-        (10, 11, 9),
-        (11, float("inf"), 10)
-    ],
-    "fat": [(0, 3.4, 0), (3.4, 6.8, 1), (6.8, 10, 2), (10, 14, 3), (14, 17, 4), 
-           (17, 20, 5), (20, 24, 6), (24, 27, 7), (27, 31, 8), 
-           (31, 34, 9), (34, float("inf"), 10)]
-}
-
-# FIXED: Updated to match PDF documentation exactly for beverages
-SAT_FAT_SCORING = {
-    "general": [(0, 1, 0), (1, 2, 1), (2, 3, 2), (3, 4, 3), (4, 5, 4), 
-               (5, 6, 5), (6, 7, 6), (7, 8, 7), (8, 9, 8), 
-               (9, 10, 9), (10, float("inf"), 10)],
-    "drink": [
-        (float("-inf"), 1, 0),
-        (1, 2, 1),
-        (2, 3, 2),
-        (3, 4, 3),
-        (4, 5, 4),
-        (5, 6, 5),
-        (6, 7, 6),
-        (7, 8, 7),
-        (8, 9, 8),
-        (9, 10, 9),
-        (10, float("inf"), 10)
-    ],
-    "fat": [(0, 10, 0), (10, 16, 1), (16, 22, 2), (22, 28, 3), (28, 34, 4), 
-           (34, 40, 5), (40, 46, 6), (46, 52, 7), (52, 58, 8), 
-           (58, 64, 9), (64, float("inf"), 10)]
-}
+@st.cache_resource
+def get_result_cache():
+    """Return the app-wide cache; set NUTRISCORE_CACHE_DIR to keep entries on disk."""
+    return ResultCache(disk_dir=os.environ.get("NUTRISCORE_CACHE_DIR"))
 
-# FIXED: Salt scoring for beverages from the PDF
-SALT_SCORING = {
-    "general": [(0, 0.2, 0), (0.2, 0.4, 1), (0.4, 0.6, 2), (0.6, 0.8, 3), (0.8, 1.0, 4), 
-               (1.0, 1.2, 5), (1.2, 1.4, 6), (1.4, 1.6, 7), (1.6, 1.8, 8), 
-               (1.8, 2.0, 9), (2.0, float("inf"), 10)],
-    "drink": [
-        (float("-inf"), 0.2, 0),
-        (0.2, 0.4, 1),
-        (0.4, 0.6, 2),
-        (0.6, 0.8, 3),
-        (0.8, 1.0, 4),
-        (1.0, 1.2, 5),
-        (1.2, 1.4, 6),
-        (1.4, 1.6, 7),
-        (1.6, 1.8, 8),
-        (1.8, 2.0, 9),
-        (2.0, 2.2, 10),
-        (2.2, 2.4, 11),
-        (2.4, 2.6, 12),
-        (2.6, 2.8, 13),
-        (2.8, 3.0, 14),
-        (3.0, 3.2, 15),
-        (3.2, 3.4, 16),
-        (3.4, 3.6, 17),
-        (3.6, 3.8, 18),
-        (3.8, 4.0, 19),
-        (4.0, float("inf"), 20)
-    ],
-    "fat": [(0, 0.2, 0), (0.2, 0.4, 1), (0.4, 0.6, 2), (0.6, 0.8, 3), (0.8, 1.0, 4), 
-           (1.0, 1.2, 5), (1.2, 1.4, 6), (1.4, 1.6, 7), (1.6, 1.8, 8), 
-           (1.8, 2.0, 9), (2.0, float("inf"), 10)]
-}
-
-# FIXED: Updated fruit scoring for beverages per PDF
-FRUIT_SCORING = {
-    "general": [(0, 40, 0), (40, 60, 1), (60, 80, 2), (80, float("inf"), 5)],
-    "drink": [
-        (float("-inf"), 40, 0),
-        (40, 60, 2),
-        (60, 80, 4),
-        (80, float("inf"), 6)
-    ],
-    "fat": [(0, 40, 0), (40, 60, 1), (60, 80, 2), (80, float("inf"), 5)]
-}
-
-FIBRE_SCORING = {
-    "general": [(0, 3.0, 0), (3.0, 4.1, 1), (4.1, 5.2, 2), (5.2, 6.3, 3), (6.3, 7.4, 4), (7.4, float("inf"), 5)],
-    "drink": [
-        (float("-inf"), 3.0, 0),
-        (3.0, 4.1, 1),
-        (4.1, 5.2, 2),
-        (5.2, 6.3, 3),
-        (6.3, 7.4, 4),
-        (7.4, float("inf"), 5)
-    ],
-    "fat": [(0, 3.0, 0), (3.0, 4.1, 1), (4.1, 5.2, 2), (5.2, 6.3, 3), (6.3, 7.4, 4), (7.4, float("inf"), 5)]
-}
+@st.cache_resource
+def get_stream_dir():
+    """Return the directory of streamed result files, removed when the app exits."""
+    return tempfile.TemporaryDirectory(prefix="nutriscore-stream-")
 
-PROTEIN_SCORING = {
-    "general": [(0, 2.4, 0), (2.4, 4.8, 1), (4.8, 7.2, 2), (7.2, 9.6, 3), (9.6, 12.0, 4), (12.0, float("inf"), 5)],
-    "drink": [
-        (float("-inf"), 1.2, 0),
-        (1.2, 1.5, 1),
-        (1.5, 1.8, 2),
-        (1.8, 2.1, 3),
-        (2.1, 2.4, 4),
-        (2.4, 2.7, 5),
-        (2.7, 3.0, 6),
-        (3.0, float("inf"), 7)
-    ],
-    "fat": [(0, 2.4, 0), (2.4, 4.8, 1), (4.8, 7.2, 2), (7.2, 9.6, 3), (9.6, 12.0, 4), (12.0, float("inf"), 5)]
-}
+def read_uploaded_files(uploaded_files, cache, upload_hash):
+    """
+    Read and validate every uploaded file, and every sheet of uploaded workbooks.
 
-# ----------------------------
-# Nutrient scoring functions - FIXED: Updated to handle thresholds correctly
-# ----------------------------
-def score_component(value, scoring_table):
-    """Score a component using its scoring table with proper threshold handling.
-    Now uses "less than or equal to" for the upper bound, which matches the PDF tables."""
-    for low, high, point in scoring_table:
-        if low < value <= high:
-            return point
-    # If no match found, return the highest points value (for values exceeding the highest threshold)
-    return scoring_table[-1][2]
+    Sources are parsed concurrently, each with its own progress step and
+    error; parsed frames are reused from identical earlier uploads (with a
+    cache dir, Excel sheets are kept as Parquet sidecars), and the combined
+    tables are kept in the session for reruns of the same upload.
+    """
+    read = st.session_state.get("sources")
+    if read is None or read["key"] != upload_hash:
+        progress_bar = st.progress(0.0, text="Reading uploaded files...")
 
-def get_energy_points(value, category):
-    return score_component(value, ENERGY_SCORING[category])
+        def report_progress(done, total, row):
+            name = f"{row['Source File']} / {row['Sheet']}" if row["Sheet"] else row["Source File"]
+            progress_bar.progress(done / total, text=f"Read {done} of {total}: {name}")
 
-def get_energy_from_sat_fat_points(sat_fat_value, category):
-    energy_from_sfa = sat_fat_value * 37  # kJ/g
-    return score_component(energy_from_sfa, ENERGY_SCORING[category])
+        products, errors, report = read_sources(
+            uploaded_files, progress=report_progress, cache=cache,
+            sidecar_dir=os.environ.get("NUTRISCORE_CACHE_DIR"),
+        )
+        progress_bar.empty()
+        read = {"key": upload_hash, "products": products, "errors": errors, "report": report}
+        st.session_state["sources"] = read
+    return read["products"], read["errors"], read["report"]
 
-def get_sugar_points(value, category):
-    return score_component(value, SUGAR_SCORING[category])
+def last_upload(file_name, category, id_column):
+    """
+    This session's snapshot of its last upload named `file_name`, scored as
+    `category` and matched on `id_column`, or None.
 
-def get_sat_fat_points(value, category):
-    return score_component(value, SAT_FAT_SCORING[category])
+    Snapshots stay in the session rather than in the app-wide cache, so users
+    uploading files of the same name never compare against each other's.
+    """
+    last = st.session_state.get("snapshot")
+    if last is None or last["key"] != (file_name, category, id_column):
+        return None
+    return last["snapshot"]
 
-def get_sodium_points(value, category):
-    return score_component(value, SALT_SCORING[category])
+def remember_upload(file_name, category, id_column, snapshot):
+    """Keep `snapshot` as the one the session's next upload named `file_name` is compared with."""
+    st.session_state["snapshot"] = {"key": (file_name, category, id_column), "snapshot": snapshot}
 
-def get_fruit_points(value, category):
-    return score_component(value, FRUIT_SCORING[category])
+def score_against_last_upload(df, file_name, category, id_column, workers):
+    """
+    Score an upload, rescoring only the products changed since this session's
+    last upload of a file with the same name (products are matched on
+    `id_column`).
 
-def get_fibre_points(value, category):
-    return score_component(value, FIBRE_SCORING[category])
+    Returns the result table and the change report, or None as report for a
+    first upload, no ID column or an ID column with empty or duplicate values.
+    """
+    if id_column is None or id_column not in df.columns:
+        return process_dataframe_parallel(df, category, workers), None
+
+    previous = last_upload(file_name, category, id_column)
+    try:
+        snapshot, changes = rescore_changed(df, category, previous, id_column, workers)
+    except ValueError:
+        # Empty or duplicate IDs: score the whole file
+        return process_dataframe_parallel(df, category, workers), None
+    remember_upload(file_name, category, id_column, snapshot)
+    return snapshot, changes if previous is not None else None
+
+def select_id_column(df):
+    """
+    Let the user pick the column identifying products between uploads
+    (default "Product Name"), like ``--id-column`` of the command line tool.
 
-def get_protein_points(value, category, is_red_meat=False):
-    points = score_component(value, PROTEIN_SCORING[category])
-    if category == "general" and is_red_meat:
-        points = min(points, 2)
-    return points
+    Returns None for "None": every upload is then scored in full.
+    """
+    skipped = set(NUTRIENT_COLUMNS + FLAG_COLUMNS + SOURCE_COLUMNS + ["Category"])
+    options = [None] + [column for column in df.columns if column not in skipped]
+    return st.selectbox(
+        "Product ID column",
+        options,
+        index=options.index(DEFAULT_ID_COLUMN) if DEFAULT_ID_COLUMN in options else 0,
+        format_func=lambda column: "None" if column is None else column,
+        help="Products are matched on this column with your last upload of a file with the same name, "
+        "so only new and changed products are scored and the changes are reported.",
+    )
 
 # ----------------------------
-# Individual scores calculation
+# Streamlit result views
 # ----------------------------
-def get_individual_scores(row, category):
-    scores = {}
-
-    # N-component scores
-    if category == "fat":
-        scores["Energy Score"] = get_energy_from_sat_fat_points(row["Saturates (g/100 g)"], category)
-    else:
-        scores["Energy Score"] = get_energy_points(row["Energy (kJ/100 g)"], category)
-    
-    scores["Sugar Score"] = get_sugar_points(row["Sugar (g/100 g)"], category)
-    scores["Saturates Score"] = get_sat_fat_points(row["Saturates (g/100 g)"], category)
-    scores["Salt Score"] = get_sodium_points(row["Salt (g/100 g)"], category)
-    
-    # Sweetener penalty for beverages
-    if category == "drink" and row.get("Contains sweeteners", False):
-        scores["Sweetener Penalty"] = 4
-    else:
-        scores["Sweetener Penalty"] = 0
-    
-    # P-component scores
-    scores["Fruit Score"] = get_fruit_points(row["Fruits, vegetables, and pulses (%)"], category)
-    scores["Fibre Score"] = get_fibre_points(row["Fibre (g/100 g)"], category)
-    
-    is_red_meat = row.get("Is red meat", False)
-    scores["Protein Score"] = get_protein_points(row["Protein (g/100 g)"], category, is_red_meat)
-    
-    return scores
+def get_result_view(result_df, results_key=None):
+    """
+    Return the display table and summary statistics of a result.
 
-# ----------------------------
-# Main Nutri-Score computation
-# ----------------------------
-def compute_score(row, category):
+    They are kept in the session under `results_key`, so reruns (page flips,
+    filter changes) reuse them instead of rebuilding them from the result.
+    """
+    view = st.session_state.get("result_view")
+    if results_key is None or view is None or view["key"] != results_key:
+        with stage("display frame", len(result_df)):
+            display_df = build_display_frame(result_df)
+        with stage("summary", len(result_df)):
+            distribution, means = summarize_results(result_df)
+        view = {"key": results_key, "display": display_df, "distribution": distribution, "means": means,
+                "query": None, "positions": None}
+        st.session_state["result_view"] = view
+    return view
+
+def display_results(result_df, results_key=None):
     """
-    Calculate the total Nutri-Score points for one product.
+    Display the Nutri-Score results in Streamlit and provide CSV and Parquet downloads.
+
+    The scored table stays on the server: filtering and sorting run there,
+    only the visible page is sent to the browser, and the downloads are
+    generated when their button is clicked.
 
     Parameters
     ----------
-    row : pandas.Series
-        Nutrient composition for one product (per 100 g or mL).
-    category : str
-        Product category ("general", "drink", "fat").
-
-    Returns
-    -------
-    int
-        Total Nutri-Score points (lower = healthier).
-
-    Notes
-    -----
-    - Applies +4 sweetener penalty for beverages.
-    - Caps protein points for red meat.
-    - Automatically assigns 0 (A grade) to water.
-    - Different thresholds apply:
-        * General foods: P-points counted only if N < 11
-        * Fats: P-points counted only if N < 7
+    result_df : pandas.DataFrame
+        DataFrame with computed Nutri-Score results.
+    results_key : str, optional
+        Identifies the result across reruns (e.g. its cache key), so the
+        display table and statistics are built once per result.
     """
-    # Special case for water - should always be A grade
-    if category == "drink" and row.get("is_water", False):
-        return 0
-    
-    # Get unfavorable components (N)
-    if category == "fat":
-        n_energy = get_energy_from_sat_fat_points(row["Saturates (g/100 g)"], category)
-    else:
-        n_energy = get_energy_points(row["Energy (kJ/100 g)"], category)
-    
-    n_sugar = get_sugar_points(row["Sugar (g/100 g)"], category)
-    n_sat_fat = get_sat_fat_points(row["Saturates (g/100 g)"], category)
-    n_sodium = get_sodium_points(row["Salt (g/100 g)"], category)
-    
-    # Sweetener penalty for beverages
-    sweetener_points = 4 if (category == "drink" and row.get("Contains sweeteners", False)) else 0
-    
-    # Get favorable components (P)
-    p_fruit = get_fruit_points(row["Fruits, vegetables, and pulses (%)"], category)
-    p_fibre = get_fibre_points(row["Fibre (g/100 g)"], category)
-    
-    # Apply red meat protein cap if needed
-    is_red_meat = row.get("Is red meat", False)
-    p_protein = get_protein_points(row["Protein (g/100 g)"], category, is_red_meat)
-    
-    # Calculate total points
-    n_total = n_energy + n_sugar + n_sat_fat + n_sodium + sweetener_points
-    p_total = p_fruit + p_fibre + p_protein
-    
-    # Calculate score based on category and algorithm
-    if category == "drink":
-        score = n_total - p_total
-    elif category == "fat":
-        score = n_total - (p_fruit + p_fibre) if n_total >= 7 else n_total - p_total
-    else:  # General foods
-        score = n_total - (p_fruit + p_fibre) if n_total >= 11 else n_total - p_total
-            
-    return score
-
-def get_grade(score, category, row=None):
-    """Determine the Nutri-Score grade (A-E) based on the score and category"""
-    # Special case for water - should always get an A
-    if category == "drink" and row is not None and row.get("is_water", False):
-        return "A"
-    
-    # Regular scoring
-    for low, high, grade in CATEGORY_THRESHOLDS[category]:
-        if low <= score <= high:
-            return grade
-    return "E"  # Default to E if no match found
+    view = get_result_view(result_df, results_key)
+    display_df = view["display"]
 
-# ----------------------------
-# Data processing functions (MOVED UP - this was causing the NameError)
-# ----------------------------
-def process_dataframe(df, category):
-    """Process a dataframe to calculate Nutri-Score values"""
-    # Calculate individual component scores
-    component_scores = df.apply(lambda row: get_individual_scores(row, category), axis=1)
-    component_df = pd.DataFrame(component_scores.tolist())
-    
-    # Include original nutrient values
-    raw_nutrients = df[[
-        "Energy (kJ/100 g)", "Sugar (g/100 g)", "Saturates (g/100 g)",
-        "Salt (g/100 g)", "Fruits, vegetables, and pulses (%)",
-        "Fibre (g/100 g)", "Protein (g/100 g)"
-    ]].copy()
-
-    # Add flags if they exist
-    if "Contains sweeteners" in df.columns:
-        raw_nutrients["Contains sweeteners"] = df["Contains sweeteners"]
-    if "Is red meat" in df.columns:
-        raw_nutrients["Is red meat"] = df["Is red meat"]
-    if "is_water" in df.columns:
-        raw_nutrients["Is Water"] = df["is_water"]
-    
-    # Add product name if it exists
-    if "Product Name" in df.columns:
-        raw_nutrients["Product Name"] = df["Product Name"]
-                
-    # Combine everything
-    result_df = pd.concat([raw_nutrients, component_df], axis=1)
-    
-    # Calculate final score and grade
-    result_df["Nutri-Score Points"] = df.apply(lambda row: compute_score(row, category), axis=1)
-    result_df["Nutri-Score Grade"] = result_df.apply(
-        lambda row: get_grade(row["Nutri-Score Points"], category, row), axis=1
+    st.subheader("Nutri-Score Results")
+    with st.expander("Summary", expanded=True):
+        distribution_column, means_column = st.columns(2)
+        distribution_column.bar_chart(view["distribution"]["Products"])
+        means_column.dataframe(view["means"].rename("Mean points").round(2))
+
+    # Filter and sort on the server
+    grade_column, name_column, sort_column, order_column = st.columns(4)
+    grades = grade_column.multiselect("Grades", GRADES)
+    name_contains = name_column.text_input("Product name contains")
+    sort_by = sort_column.selectbox(
+        "Sort by", [None, *SORT_COLUMNS], format_func=lambda option: option or "File order"
     )
-    
-    # Calculate N and P component totals
-    result_df["N-points Total"] = (
-        result_df["Energy Score"] + 
-        result_df["Sugar Score"] + 
-        result_df["Saturates Score"] + 
-        result_df["Salt Score"] + 
-        result_df.get("Sweetener Penalty", 0)
+    descending = order_column.checkbox("Descending")
+    query = (tuple(grades), name_contains, sort_by, descending)
+    if view["query"] != query:
+        with stage("select rows", len(display_df)):
+            view["positions"] = select_rows(display_df, grades, name_contains, sort_by, descending)
+        view["query"] = query
+    positions = view["positions"]
+
+    # Display the visible page only
+    size_column, page_column = st.columns(2)
+    page_size = size_column.selectbox("Rows per page", PAGE_SIZES)
+    n_pages = max(1, -(-len(positions) // page_size))
+    page = page_column.number_input(
+        f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1,
+        key=f"results_page:{query}:{page_size}",  # back to page 1 when the selection changes
     )
-    
-    result_df["P-points Total"] = (
-        result_df["Fruit Score"] + 
-        result_df["Fibre Score"] + 
-        result_df["Protein Score"]
+    page_positions = positions[(page - 1) * page_size:page * page_size]
+    with stage("render table", len(page_positions)):
+        st.dataframe(display_df.iloc[page_positions])
+    st.caption(f"{len(positions)} of {len(display_df)} products match.")
+
+    # Download of the whole table, written block by block only when requested
+    formats = [label for label, (_, _, package) in DOWNLOAD_FORMATS.items()
+               if package is None or find_spec(package) is not None]
+    format_column, button_column = st.columns(2)
+    export_format = format_column.selectbox("Download format", formats)
+    suffix, mime, _ = DOWNLOAD_FORMATS[export_format]
+    button_column.download_button(
+        label=f"Download results as {export_format}",
+        data=lambda: results_file(result_df, suffix),
+        file_name=f"nutri_score_results{suffix}",
+        mime=mime,
+        on_click="ignore",
+    )
+
+def display_reformulation_options(product, category, target_grade):
+    """Show the Pareto-optimal nutrient changes that bring a manually entered product to `target_grade`."""
+    options = reformulation_options(product, category, target_grade)
+    st.subheader(f"Reaching grade {target_grade}")
+    if not options:
+        st.info(f"No change of one or two nutrients reaches grade {target_grade} in this category.")
+        return
+    if not options[0]["changes"]:
+        st.success(f"The product already reaches grade {target_grade}.")
+        return
+    table = pd.DataFrame([
+        {**option["changes"], "Nutri-Score Points": option["Nutri-Score Points"],
+         "Nutri-Score Grade": option["Nutri-Score Grade"]}
+        for option in options
+    ])
+    st.dataframe(table, hide_index=True)
+    st.caption(
+        "Changes per 100 g or mL (empty: unchanged). Each row reaches the target on its own, "
+        "and no other row needs smaller or equal changes of every nutrient."
     )
-    
-    return result_df
 
-def display_results(result_df):
+def display_reformulation_targets(result_df, results_key):
+    """Per product, the smallest change of each nutrient alone that reaches a chosen grade."""
+    with st.expander("Reformulation targets"):
+        target_grade = st.selectbox("Target grade", GRADES[:-1], index=1, key="reformulation_target")
+        cached = st.session_state.get("reformulation")
+        if cached is None or cached["key"] != (results_key, target_grade):
+            # Scans the whole catalog, so only on request; later target grades
+            # of the same result follow without asking again
+            requested = cached is not None and cached["key"][0] == results_key
+            if not requested and not st.button("Find reformulation targets", key="build_reformulation"):
+                return
+            table = reformulation_table(result_df, target_grade)
+            below = table["Nutri-Score Grade"].cat.codes.to_numpy() > GRADES.index(target_grade)
+            cached = {"key": (results_key, target_grade), "table": table[below]}
+            st.session_state["reformulation"] = cached
+        table = cached["table"]
+        st.caption(
+            f"{len(table)} products are below grade {target_grade}. Changes per 100 g or mL; "
+            "empty where that nutrient alone cannot reach the grade."
+        )
+        st.dataframe(table.head(PAGE_SIZES[-1]), hide_index=True)
+        st.download_button(
+            label="Download reformulation targets as CSV",
+            data=lambda: table.to_csv(index=False),
+            file_name=f"nutri_score_targets_{target_grade}.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+def display_sensitivity(result_df, results_key):
+    """Products within a few points of a worse grade, with every nutrient's margin to its next bin edge."""
+    with st.expander("Grade sensitivity"):
+        within = st.number_input(
+            "Points to a worse grade", min_value=1, max_value=10, value=1, key="sensitivity_points",
+            help="Show products whose final points are at most this far from the next worse grade",
+        )
+        cached = st.session_state.get("sensitivity")
+        if cached is None or cached["key"] != results_key:
+            # Scans every product and nutrient, so only on request
+            if not st.button("Build sensitivity report", key="build_sensitivity"):
+                return
+            cached = {"key": results_key, "table": sensitivity_table(result_df)}
+            st.session_state["sensitivity"] = cached
+        table = cached["table"]
+        at_risk = table[table["Points to worse grade"] <= within]
+        st.caption(
+            f"{len(at_risk)} products are {within} point(s) or less from a worse grade. Margins per "
+            "100 g or mL: how much more or less of a nutrient keeps its points."
+        )
+        st.dataframe(at_risk.head(PAGE_SIZES[-1]), hide_index=True)
+        st.download_button(
+            label="Download sensitivity report as CSV",
+            data=lambda: table.to_csv(index=False),
+            file_name="nutri_score_sensitivity.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+def results_file(result_df, suffix):
+    """Write the results with the streaming writer for `suffix` to a temporary file, rewound for download."""
+    results = tempfile.TemporaryFile()
+    write_result_frame(result_df, results, suffix)
+    results.seek(0)
+    return results
+
+def display_versions(result_df, results_key):
+    """Grades under earlier algorithm versions and how products move between them."""
+    with st.expander("Algorithm versions"):
+        others = [version for version in RULE_PACKS if version != ALGORITHM_VERSION]
+        compared = st.multiselect(
+            f"Compare {RULE_PACKS[ALGORITHM_VERSION]['name']} with", others,
+            format_func=lambda version: RULE_PACKS[version]["name"], key="compared_versions",
+            help="Rescores every product under each chosen version.",
+        )
+        if not compared:
+            return
+        versions = [ALGORITHM_VERSION] + compared
+        cached = st.session_state.get("versions")
+        if cached is None or cached["key"] != (results_key, tuple(versions)):
+            cached = {"key": (results_key, tuple(versions)), "table": version_table(result_df, versions)}
+            st.session_state["versions"] = cached
+        table = cached["table"]
+        for version in compared:
+            matrix = migration_matrix(table, ALGORITHM_VERSION, version)
+            changed = len(table) - int(matrix.to_numpy().trace())
+            st.caption(
+                f"{changed} of {len(table)} products get another grade under the {RULE_PACKS[version]['name']}. "
+                f"Rows: grade under version {ALGORITHM_VERSION}; columns: grade under version {version}."
+            )
+            st.dataframe(matrix)
+        st.download_button(
+            label="Download grades per version as CSV",
+            data=lambda: table.to_csv(index=False),
+            file_name="nutri_score_versions.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+def save_to_store(result_df, df, source, results_key):
+    """Offer to keep the scored upload as a run of the local result store."""
+    saved = st.session_state.get("stored_run")
+    if saved is not None and saved["key"] == results_key:
+        st.caption(f"Saved as run {saved['run_id']} of {default_store_path()}.")
+        return
+    if st.button("Save results to the result store", help=f"Keeps this run in {default_store_path()}"):
+        brands = df["Brand"].reindex(result_df.index) if "Brand" in df.columns else None
+        with stage("store", len(result_df)), ResultStore(default_store_path()) as store:
+            run_id = store.add_run(result_df, source=source, brands=brands)
+        st.session_state["stored_run"] = {"key": results_key, "run_id": run_id}
+        st.success(f"Saved as run {run_id} of {default_store_path()}.")
+
+def display_store_page():
+    """Query the runs kept in the local result store without rescoring."""
+    st.subheader("Stored results")
+    no_runs = f"No runs stored in {default_store_path()} yet. Score a file and save its results first."
+    if not os.path.exists(default_store_path()):
+        # Opening the store would create the file
+        st.info(no_runs)
+        return
+    with ResultStore(default_store_path()) as store:
+        runs = store.runs()
+        if runs.empty:
+            st.info(no_runs)
+            return
+        st.dataframe(runs, hide_index=True)
+
+        run_column, grade_column, category_column = st.columns(3)
+        run_id = run_column.selectbox("Run", runs["run_id"].tolist())
+        grades = grade_column.multiselect("Grades", GRADES)
+        categories = category_column.multiselect(
+            "Categories", list(CATEGORY_THRESHOLDS),
+            format_func={key: label for label, key in CATEGORY_MAP.items()}.get,
+        )
+        sweetener_column, meat_column, product_column = st.columns(3)
+        flag_options = {"Any": None, "Yes": True, "No": False}
+        sweeteners = sweetener_column.selectbox("Contains sweeteners", list(flag_options))
+        red_meat = meat_column.selectbox("Is red meat", list(flag_options))
+        product_id = product_column.text_input("Product name (all runs)").strip() or None
+
+        start = time.perf_counter()
+        matches = store.query(
+            run_id=None if product_id else run_id, grades=grades or None, categories=categories or None,
+            contains_sweeteners=flag_options[sweeteners], is_red_meat=flag_options[red_meat],
+            product_id=product_id,
+        )
+        st.caption(f"{len(matches)} products ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        st.dataframe(build_display_frame(matches).head(PAGE_SIZES[-1]), hide_index=True)
+        st.download_button(
+            label="Download matching products as CSV",
+            data=lambda: build_display_frame(matches).to_csv(index=False),
+            file_name="nutri_score_stored_results.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+        st.subheader("Grade distribution")
+        by_column, runs_column = st.columns(2)
+        by = by_column.selectbox("Group by", ["category", "brand"], format_func=str.title)
+        last_runs = runs_column.number_input("Last runs", min_value=1, value=10)
+        st.dataframe(
+            store.grade_distribution(by=by, last_runs=last_runs, categories=categories or None), hide_index=True
+        )
+
+def display_changes(changes):
+    """Show what changed since the last upload of the same file."""
+    counts = summarize_changes(changes)
+    with st.expander(f"Changes since the last upload ({len(changes)} products)"):
+        added, changed, grade_changed, removed = st.columns(4)
+        added.metric("Added", counts["added"])
+        changed.metric("Changed", counts["changed"])
+        grade_changed.metric("Changed grade", counts["grade changed"])
+        removed.metric("Removed", counts["removed"])
+        st.dataframe(changes, hide_index=True)
+
+def display_source_report(report):
+    """Report the uploaded files and sheets that could not be read; the others are scored."""
+    failed = report[report["Error"].notna()]
+    for file_name, sheet, error in failed[["Source File", "Sheet", "Error"]].itertuples(index=False):
+        st.error(f"Could not read {f'{file_name} / {sheet}' if sheet else file_name}: {error}")
+    if len(report) > 1:
+        with st.expander(f"Sources ({len(report) - len(failed)} of {len(report)} read)"):
+            st.dataframe(report.round({"Seconds": 3}), hide_index=True)
+
+def display_validation_errors(errors):
+    """Report the cells that could not be used; their rows are left out of the results."""
+    n_rows = len(errors.drop_duplicates([name for name in ("Source File", "Sheet", "Row") if name in errors.columns]))
+    st.warning(f"{n_rows} rows left out: {len(errors)} cells could not be used.")
+    with st.expander("Rows with invalid values"):
+        report = errors.astype({"Value": str})
+        st.dataframe(report, hide_index=True)
+        st.download_button(
+            label="Download error report as CSV",
+            data=report.to_csv(index=False),
+            file_name="nutri_score_errors.csv",
+            mime="text/csv",
+        )
+
+def display_stage_timings(stage_log):
+    """Show the recorded stage timings in a collapsible sidebar panel."""
+    timings = pd.DataFrame(stage_log.summary(), columns=["stage", "rows", "seconds", "rows_per_second", "peak_bytes"])
+    timings["peak_bytes"] = timings["peak_bytes"] / 1024 ** 2
+    with st.sidebar.expander("Stage timings", expanded=True):
+        st.dataframe(
+            timings.rename(columns={
+                "stage": "Stage", "rows": "Rows", "seconds": "Seconds",
+                "rows_per_second": "Rows/s", "peak_bytes": "Peak MB",
+            }),
+            hide_index=True,
+        )
+        st.caption(
+            "Stages run by parallel workers (reading several sources, scoring with several processes) "
+            "add up over the workers, so they can exceed the wall time, and have no peak memory."
+        )
+
+@contextmanager
+def captured_profile():
+    """Profile the block and offer the cProfile dump as a sidebar download."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "nutriscore.prof")
+        with profile_to(path):
+            yield
+        with open(path, "rb") as f:
+            st.sidebar.download_button(
+                label="Download cProfile dump",
+                data=f.read(),
+                file_name="nutriscore.prof",
+                help="Inspect with `python -m pstats nutriscore.prof` or snakeviz.",
+            )
+
+def display_streamed_results(uploaded_file, category):
     """
-    Display the Nutri-Score results in Streamlit and provide CSV download.
+    Score an uploaded CSV with `score_csv_stream` and offer the result file.
 
-    Parameters
-    ----------
-    result_df : pandas.DataFrame
-        DataFrame with computed Nutri-Score results.
+    Only the grade distribution is shown; the full table goes straight to a
+    file that backs the download button. The file is kept per upload and
+    category, so reruns reuse it instead of scoring again, and it is only
+    read when the download is clicked.
     """
-    # Create a clean display table
-    display_df = pd.DataFrame()
-    
-    # Product identification
-    if "Product Name" in result_df.columns:
-        display_df["Products"] = result_df["Product Name"]
-    else:
-        display_df["Products"] = [f"Product {i+1}" for i in range(len(result_df))]
-    
-    # Water indicator
-    display_df["Water (without any addition)"] = result_df.get("Is Water", False)
-    
-    # Nutritional values
-    display_df["Energy (kJ/100 mL or 100 g)"] = result_df["Energy (kJ/100 g)"]
-    display_df["Sugar (g/100 mL or 100 g)"] = result_df["Sugar (g/100 g)"]
-    display_df["Saturates (g/100 mL or 100 g)"] = result_df["Saturates (g/100 g)"]
-    display_df["Salt (g/100 mL or 100 g)"] = result_df["Salt (g/100 g)"]
-    display_df["Presence of non-nutritive sweetener (YES/NO)"] = result_df.get("Contains sweeteners", False)
-    display_df["Fruits, vegetables and legumes (%)"] = result_df["Fruits, vegetables, and pulses (%)"]
-    display_df["Fibre (g/100 mL or 100 g)"] = result_df["Fibre (g/100 g)"]
-    display_df["Protein (g/100 mL or 100 g)"] = result_df["Protein (g/100 g)"]
-    
-    # Component scores
-    display_df["Energy points"] = result_df["Energy Score"]
-    display_df["Sugar points"] = result_df["Sugar Score"]
-    display_df["SFA points"] = result_df["Saturates Score"]
-    display_df["Salt points"] = result_df["Salt Score"]
-    display_df["Sweetener Penalty"] = result_df.get("Sweetener Penalty", 0)
-    display_df["FVL points"] = result_df["Fruit Score"]
-    display_df["Fibre points"] = result_df["Fibre Score"]
-    display_df["Protein points"] = result_df["Protein Score"]
-    
-    # Final calculations
-    display_df["Points A"] = result_df["N-points Total"]
-    display_df["Points C"] = result_df["P-points Total"]
-    display_df["Score"] = result_df["Nutri-Score Points"]
-    display_df["Nutri-Score"] = result_df["Nutri-Score Grade"]
-    
-    # Display the table
+    with uploaded_file.getbuffer() as data:
+        file_hash = content_hash(data)
+    key = scored_key(file_hash, category)
+    streamed = st.session_state.get("streamed")
+    if streamed is None or streamed["key"] != key or not os.path.exists(streamed["path"]):
+        path = os.path.join(get_stream_dir().name, f"{file_hash}-{category}-{ALGORITHM_VERSION}.csv")
+        # Written under a temporary name, so other sessions never see a partial file
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=get_stream_dir().name)
+        os.close(fd)
+        try:
+            uploaded_file.seek(0)
+            with st.spinner("Scoring file in chunks..."):
+                grade_counts = score_csv_stream(uploaded_file, tmp_path, category)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        streamed = {"key": key, "path": path, "grade_counts": grade_counts}
+        st.session_state["streamed"] = streamed
+    grade_counts = streamed["grade_counts"]
+
     st.subheader("Nutri-Score Results")
-    st.dataframe(display_df)
-    
-    # Provide CSV download
-    csv = display_df.to_csv(index=False)
+    st.write(f"{sum(grade_counts.values())} products scored.")
+    st.dataframe(
+        pd.DataFrame(sorted(grade_counts.items()), columns=["Nutri-Score", "Products"]),
+        hide_index=True,
+    )
     st.download_button(
         label="Download results as CSV",
-        data=csv,
+        data=lambda: open(streamed["path"], "rb"),
         file_name="nutri_score_results.csv",
         mime="text/csv",
+        on_click="ignore",
     )
 
 # ----------------------------
 # Streamlit App UI
 # ----------------------------
-def main():
-    """
-    Streamlit app entry point for the Nutri-Score Calculator.
-
-    Enables users to:
-    - Upload a CSV or Excel file of product nutrient data.
-    - Enter data manually for single products.
-    - Select food category and compute Nutri-Score interactively.
-    - View and download results.
-
-    Notes
-    -----
-    The app uses the 2023 Nutri-Score algorithm and supports three product
-    categories: general foods, beverages, and fats/oils/nuts.
-    """
-    st.title("Nutri-Score Calculator")
-    
-    uploaded_file = st.file_uploader("Upload your product data (Excel file):", type=["xlsx", "xls", "csv"])
-    category_display = st.selectbox("Select food category:", list(CATEGORY_MAP.keys()))
+def score_products_page():
+    """Score an uploaded file or a manually entered product and show the results."""
+    uploaded_files = st.file_uploader(
+        "Upload your product data (Excel, CSV, Parquet or Feather files):",
+        type=["xlsx", "xls", "csv", "parquet", "feather", "arrow"],
+        accept_multiple_files=True,
+        help="Every sheet of an Excel workbook is read. Results name the file and sheet of each product.",
+    )
+    category_display = st.selectbox(
+        "Select food category:",
+        list(CATEGORY_MAP.keys()),
+        help="Rows with a value in an optional 'Category' column use that category instead.",
+    )
     category = CATEGORY_MAP[category_display]
     
     # Add options for manual entry
@@ -519,6 +654,10 @@ def main():
         )
         contains_sweeteners = st.checkbox("Contains sweeteners")
         is_water = st.checkbox("Is water (without any addition)")
+        target_grade = st.selectbox(
+            "Target grade", GRADES, index=1,
+            help="Also lists the smallest nutrient changes that bring the product to this grade.",
+        )
         
         if st.button("Calculate Nutri-Score"):
             # Create a single-row DataFrame from manual inputs
@@ -539,31 +678,112 @@ def main():
             # Calculate and display results just like with uploaded files
             result_df = process_dataframe(df, category)
             display_results(result_df)
+            display_reformulation_options(
+                {name: values[0] for name, values in manual_data.items()}, category, target_grade
+            )
     
-    elif uploaded_file:
+    elif uploaded_files:
+        stream_csv = len(uploaded_files) == 1 and uploaded_files[0].name.endswith('.csv') and st.checkbox(
+            "Stream large CSV file (bounded memory, download only)"
+        )
+        workers = st.sidebar.number_input(
+            "Scoring worker processes",
+            min_value=1,
+            max_value=os.cpu_count() or 1,
+            value=1,
+            help="Large uploads are split across this many processes.",
+        )
+        record_timings = st.sidebar.checkbox(
+            "Record stage timings",
+            help="Wall time, rows/s and peak memory of parsing, scoring and display, also logged as JSON lines.",
+        )
+        capture_profile = st.sidebar.checkbox("Capture cProfile dump of this run")
+
+        instrumentation = ExitStack()
+        stage_log = instrumentation.enter_context(record_stages()) if record_timings else None
+        if capture_profile:
+            instrumentation.enter_context(captured_profile())
         try:
-            # Detect file type and read accordingly
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
+            if stream_csv:
+                display_streamed_results(uploaded_files[0], category)
             else:
-                df = pd.read_excel(uploaded_file)
-            
-            # Check required columns
-            required_columns = ["Energy (kJ/100 g)", "Sugar (g/100 g)", "Saturates (g/100 g)", 
-                             "Salt (g/100 g)", "Fruits, vegetables, and pulses (%)", 
-                             "Fibre (g/100 g)", "Protein (g/100 g)"]
-            
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                st.error(f"Missing required columns: {', '.join(missing_columns)}")
-            else:
-                result_df = process_dataframe(df, category)
-                display_results(result_df)
+                cache = get_result_cache()
+                source_name = ", ".join(uploaded_file.name for uploaded_file in uploaded_files)
+                upload_hash = content_hash("\n".join(
+                    f"{uploaded_file.name}:{content_hash(uploaded_file.getvalue())}" for uploaded_file in uploaded_files
+                ).encode())
+                # Parse and validate every file and sheet on its own: a source that
+                # cannot be read is reported and left out, the others are scored
+                with stage("parse") as parsed:
+                    df, errors, report = read_uploaded_files(uploaded_files, cache, upload_hash)
+                    parsed["rows"] = len(df)
+                display_source_report(report)
+                if len(errors):
+                    display_validation_errors(errors)
+                if not df.empty:
+                    id_column = select_id_column(df)
+                    results_key = scored_key(upload_hash, category, id_column)
+                    changed = st.session_state.get("changes", {})
+                    result_df = cache.get(results_key)
+                    if result_df is not None and changed.get("key") != results_key:
+                        if last_upload(source_name, category, id_column) is not None:
+                            result_df = None  # rescore against this session's last upload for its report
+                        else:
+                            # Scored before, maybe in another session: the next upload compares with it
+                            if FINGERPRINT_COLUMN in result_df.columns:
+                                snapshot = result_df.drop(columns=SOURCE_COLUMNS)
+                                remember_upload(source_name, category, id_column, snapshot)
+                            st.session_state["changes"] = changed = {"key": results_key, "changes": None}
+                    if result_df is None:
+                        with stage("score total", len(df)):
+                            result_df, changes = score_against_last_upload(
+                                df, source_name, category, id_column, workers
+                            )
+                            result_df = with_sources(result_df, df)
+                        cache.put(results_key, result_df)
+                        # Kept in the session so reruns of this result still show the report
+                        st.session_state["changes"] = {"key": results_key, "changes": changes}
+                        changed = st.session_state["changes"]
+                    if changed.get("key") == results_key and changed["changes"] is not None:
+                        display_changes(changed["changes"])
+                    display_results(result_df, results_key)
+                    display_reformulation_targets(result_df, results_key)
+                    display_sensitivity(result_df, results_key)
+                    display_versions(result_df, results_key)
+                    save_to_store(result_df, df, source_name, results_key)
                 
         except Exception as e:
             st.error(f"Error processing file: {str(e)}")
             st.exception(e)  # Show detailed error for debugging
-    
+        finally:
+            instrumentation.close()
+        if stage_log is not None:
+            display_stage_timings(stage_log)
+
+def main():
+    """
+    Streamlit app entry point for the Nutri-Score Calculator.
+
+    Enables users to:
+    - Upload CSV, Excel, Parquet or Feather files of product nutrient data;
+      every sheet of a workbook is read, and files that fail are reported
+      without stopping the others.
+    - Enter data manually for single products.
+    - Select food category and compute Nutri-Score interactively.
+    - View and download results.
+    - Save scored runs to a local result store and query them later.
+
+    Notes
+    -----
+    The app uses the 2023 Nutri-Score algorithm and supports three product
+    categories: general foods, beverages, and fats/oils/nuts.
+    """
+    st.title("Nutri-Score Calculator")
+    if st.sidebar.radio("Page", ["Score products", "Stored results"]) == "Stored results":
+        display_store_page()
+    else:
+        score_products_page()
+
     st.sidebar.header("About")
     st.sidebar.info(
         """
@@ -574,10 +794,5 @@ def main():
     )
 
 if __name__ == "__main__":
+    log_stages_to_stderr()
     main()
-
-
-
-
-
-
@@ -4,9 +4,10 @@ Nutri-Score Calculator – Beverages Demo (2023 Updated Algorithm)
 
 This Streamlit app is a demo version of the Nutri-Score calculator.
 
-It reuses the SAME Nutri-Score algorithm implementation from
-`nutriscore_app.py` (energy, sugar, saturated fat, salt, fibre, fruit/veg,
-protein, sweetener penalty, water rule, category thresholds).
+It reuses the SAME Nutri-Score algorithm implementation as
+`nutriscore_app.py`, from the `nutriscore` package (energy, sugar,
+saturated fat, salt, fibre, fruit/veg, protein, sweetener penalty,
+water rule, category thresholds).
 
 Limitations of this demo:
 - Category fixed to **beverages (drink)**.
@@ -17,10 +18,11 @@ import streamlit as st
 import pandas as pd
 
 # IMPORTANT:
-# We import the processing + display functions from your existing file.
-# That means ANY change you make to the algorithm in nutriscore_app.py
-# is automatically reflected in this demo.
-from nutriscore_app import process_dataframe, display_results
+# We import the processing function from the shared `nutriscore` package and
+# the display function from the full app. That means ANY change you make to
+# the algorithm is automatically reflected in this demo.
+from nutriscore import process_dataframe
+from nutriscore_app import display_results
 
 
 def main():
@@ -0,0 +1,64 @@
+"""`process_dataframe` returns the compact column layout its docstring promises."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutriscore.columns import COMPONENT_COLUMNS, NUTRIENT_COLUMNS, TOTAL_COLUMNS
+from nutriscore.frame import process_dataframe
+from nutriscore.tables import GRADES
+
+N_ROWS = 5000
+
+
+def make_products(n_rows=N_ROWS, seed=0):
+    """Seeded products with nutrients to one decimal, as on a label."""
+    rng = np.random.default_rng(seed)
+    highs = {name: 4000.0 if name == "Energy (kJ/100 g)" else 60.0 for name in NUTRIENT_COLUMNS}
+    df = pd.DataFrame({name: rng.uniform(0, high, n_rows).round(1) for name, high in highs.items()})
+    df["Contains sweeteners"] = rng.random(n_rows) < 0.1
+    df["Is red meat"] = rng.random(n_rows) < 0.1
+    df["is_water"] = False
+    df["Category"] = np.array(["general", "drink", "fat"], dtype=object)[rng.integers(3, size=n_rows)]
+    df["Product Name"] = [f"Product {i}" for i in range(n_rows)]
+    return df
+
+
+def bytes_per_row(result_df):
+    """Deep memory per row, leaving out the product names (their size is the caller's)."""
+    return result_df.drop(columns="Product Name").memory_usage(deep=True).sum() / len(result_df)
+
+
+@pytest.fixture(scope="module")
+def products():
+    return make_products()
+
+
+def test_result_dtypes(products):
+    result_df = process_dataframe(products, "general")
+    for name in COMPONENT_COLUMNS:
+        assert result_df[name].dtype == np.int8, name
+    for name in TOTAL_COLUMNS:
+        assert result_df[name].dtype == np.int16, name
+    for name in ("Contains sweeteners", "Is red meat", "Is Water"):
+        assert result_df[name].dtype == bool, name
+    assert isinstance(result_df["Category"].dtype, pd.CategoricalDtype)
+    grades = result_df["Nutri-Score Grade"].dtype
+    assert isinstance(grades, pd.CategoricalDtype)
+    assert grades.ordered and list(grades.categories) == GRADES
+
+
+def test_memory_per_row(products):
+    assert bytes_per_row(process_dataframe(products, "general")) <= 80
+
+
+def test_float32_nutrients_memory_per_row(products):
+    # Quarter grams are exact in float32, so every nutrient column narrows
+    quarters = products.assign(**{name: (products[name] * 4).round() / 4 for name in NUTRIENT_COLUMNS})
+    result_df = process_dataframe(quarters, "general", float32_nutrients=True)
+    assert all(result_df[name].dtype == np.float32 for name in NUTRIENT_COLUMNS)
+    assert bytes_per_row(result_df) <= 50
+
+    # Label decimals such as 3.4 g would move across a bin edge: only the other columns narrow
+    narrowed = process_dataframe(products, "general", float32_nutrients=True)
+    assert bytes_per_row(narrowed) < bytes_per_row(process_dataframe(products, "general"))
@@ -0,0 +1,48 @@
+"""The product readers keep the scoring inputs and the passthrough columns, and nothing else."""
+
+import pandas as pd
+import pytest
+
+from nutriscore.columns import NUTRIENT_COLUMNS, PASSTHROUGH_COLUMNS
+from nutriscore.ingest import read_columnar_products, read_excel_products
+from nutriscore.sources import read_sources
+
+
+@pytest.fixture
+def catalog():
+    df = pd.DataFrame({name: [1.0, 2.5] for name in NUTRIENT_COLUMNS})
+    df["Product Name"] = ["Cola", "Crisps"]
+    df["Brand"] = ["Fizz", "Crunch"]
+    df["Supplier Notes"] = ["not", "read"]
+    return df
+
+
+def test_columnar_reader_keeps_brand(tmp_path, catalog):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "catalog.parquet"
+    catalog.to_parquet(path)
+    products = read_columnar_products(path)
+    assert "Supplier Notes" not in products.columns
+    assert products["Brand"].tolist() == ["Fizz", "Crunch"]
+
+
+def test_excel_reader_keeps_brand(tmp_path, catalog):
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "catalog.xlsx"
+    catalog.to_excel(path, index=False)
+    sidecar = str(tmp_path / "catalog.parquet")
+    products = read_excel_products(path, sidecar=sidecar)
+    assert "Supplier Notes" not in products.columns
+    assert products["Brand"].tolist() == ["Fizz", "Crunch"]
+    # Also when loaded back from the sidecar
+    assert read_excel_products(path, sidecar=sidecar)["Brand"].tolist() == ["Fizz", "Crunch"]
+
+
+def test_sources_keep_brand(tmp_path, catalog):
+    pytest.importorskip("openpyxl")
+    catalog.to_excel(tmp_path / "catalog.xlsx", index=False)
+    catalog.to_csv(tmp_path / "catalog.csv", index=False)
+    products, errors, _ = read_sources([tmp_path / "catalog.xlsx", tmp_path / "catalog.csv"])
+    assert errors.empty
+    assert set(PASSTHROUGH_COLUMNS) <= set(products.columns)
+    assert products["Brand"].tolist() == ["Fizz", "Crunch"] * 2
@@ -0,0 +1,209 @@
+"""
+The compiled tables, the columnar engine and the deduplicated path give the
+same scores as the row-wise rules.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from nutriscore import engine
+from nutriscore.columns import FLAG_COLUMNS, NUTRIENT_COLUMNS, SCORE_COLUMNS
+from nutriscore.engine import get_grade_array, score_columns, score_columns_by_category, score_unique_profiles
+from nutriscore.scoring import get_grade, score_component, score_product
+from nutriscore.tables import (
+    CATEGORY_THRESHOLDS,
+    ENERGY_SCORING,
+    FIBRE_SCORING,
+    FRUIT_SCORING,
+    GRADE_TABLES,
+    PROTEIN_SCORING,
+    SALT_SCORING,
+    SAT_FAT_SCORING,
+    SUGAR_SCORING,
+    ScoringTable,
+)
+
+CATEGORIES = list(CATEGORY_THRESHOLDS)
+COMPONENT_SCORING = {
+    "Energy (kJ/100 g)": ENERGY_SCORING,
+    "Sugar (g/100 g)": SUGAR_SCORING,
+    "Saturates (g/100 g)": SAT_FAT_SCORING,
+    "Salt (g/100 g)": SALT_SCORING,
+    "Fruits, vegetables, and pulses (%)": FRUIT_SCORING,
+    "Fibre (g/100 g)": FIBRE_SCORING,
+    "Protein (g/100 g)": PROTEIN_SCORING,
+}
+
+
+def product(**values):
+    """A product with every nutrient at 0 except `values` (short names as in `nutriscore.batch`)."""
+    names = {
+        "energy": "Energy (kJ/100 g)", "sugar": "Sugar (g/100 g)", "saturates": "Saturates (g/100 g)",
+        "salt": "Salt (g/100 g)", "fruit": "Fruits, vegetables, and pulses (%)", "fibre": "Fibre (g/100 g)",
+        "protein": "Protein (g/100 g)", "sweeteners": "Contains sweeteners", "red_meat": "Is red meat",
+        "water": "is_water",
+    }
+    row = {name: 0.0 for name in NUTRIENT_COLUMNS}
+    row.update({names[key]: value for key, value in values.items()})
+    return row
+
+
+def engine_scores(row, category):
+    """`score_columns` on a one-row table, as plain Python values."""
+    result = score_columns({name: [value] for name, value in row.items()}, category)
+    return {name: values[0].item() if hasattr(values[0], "item") else values[0] for name, values in result.items()}
+
+
+def make_catalog(n_profiles=1500, repeats=4, seed=0):
+    """Seeded products with many values exactly on bin edges, each profile repeated `repeats` times."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, scoring in COMPONENT_SCORING.items():
+        edges = sorted({edge for bins in scoring.values() for low, high, _ in bins
+                        for edge in (low, high) if math.isfinite(edge) and edge >= 0})
+        edges = np.array(edges + [0.0])
+        on_edge = edges[rng.integers(len(edges), size=n_profiles)]
+        high = 4000.0 if name == "Energy (kJ/100 g)" else 100.0
+        anywhere = rng.uniform(0, min(high, edges.max() * 1.2), n_profiles).round(2)
+        columns[name] = np.where(rng.random(n_profiles) < 0.5, on_edge, anywhere)
+    for name in FLAG_COLUMNS:
+        columns[name] = rng.random(n_profiles) < 0.2
+    order = rng.permutation(n_profiles * repeats) % n_profiles
+    return {name: values[order] for name, values in columns.items()}
+
+
+def row_wise(columns, categories):
+    rows = [{name: values[i] for name, values in columns.items()} for i in range(len(categories))]
+    return [score_product(row, category) for row, category in zip(rows, categories)]
+
+
+def assert_same_scores(result, expected):
+    for name in SCORE_COLUMNS:
+        assert result[name].tolist() == [scores[name] for scores in expected], name
+
+
+# ----------------------------
+# Compiled tables
+# ----------------------------
+@pytest.mark.parametrize("name", list(COMPONENT_SCORING))
+@pytest.mark.parametrize("category", CATEGORIES)
+def test_component_bins_exclude_low_and_include_high(name, category):
+    bins = COMPONENT_SCORING[name][category]
+    table = ScoringTable(bins)
+    for i, (low, high, points) in enumerate(bins):
+        if math.isfinite(high):
+            assert table.lookup(high) == points
+            assert score_component(high, bins) == points
+            above = math.nextafter(high, math.inf)
+            assert table.lookup(above) == score_component(above, bins) == bins[i + 1][2]
+        if math.isfinite(low) and i > 0:
+            assert table.lookup(low) == bins[i - 1][2]
+        middle = (max(low, -1e6) + min(high, 1e6)) / 2
+        assert table.lookup(middle) == score_component(middle, bins) == points
+        values = np.array([high, math.nextafter(high, math.inf), middle]) if math.isfinite(high) else np.array([middle])
+        assert table.lookup_many(values).tolist() == [score_component(v, bins) for v in values]
+
+
+@pytest.mark.parametrize("category", CATEGORIES)
+def test_grade_band_edges(category):
+    for low, high, grade in CATEGORY_THRESHOLDS[category]:
+        for points in (low, high):
+            if math.isfinite(points):
+                assert GRADE_TABLES[category].lookup(points) == grade
+                assert get_grade(points, category) == grade
+                assert get_grade_array(np.array([points]), category).tolist() == [grade]
+    # Bands are contiguous over whole points
+    bands = CATEGORY_THRESHOLDS[category]
+    assert all(high + 1 == next_low for (_, high, _), (next_low, _, _) in zip(bands, bands[1:]))
+
+
+# ----------------------------
+# Category rules
+# ----------------------------
+def test_red_meat_protein_cap_applies_to_general_foods_only():
+    assert score_product(product(protein=20.0), "general")["Protein Score"] == 5
+    assert score_product(product(protein=20.0, red_meat=True), "general")["Protein Score"] == 2
+    assert score_product(product(protein=3.0, red_meat=True), "general")["Protein Score"] == 1
+    assert score_product(product(protein=20.0, red_meat=True), "fat")["Protein Score"] == 5
+    assert engine_scores(product(protein=20.0, red_meat=True), "general")["Protein Score"] == 2
+
+
+def test_sweetener_penalty_applies_to_drinks_only():
+    drink = score_product(product(sweeteners=True), "drink")
+    assert drink["Sweetener Penalty"] == 4
+    assert drink["N-points Total"] == 4
+    assert score_product(product(sweeteners=True), "general")["Sweetener Penalty"] == 0
+    assert engine_scores(product(sweeteners=True), "drink")["Sweetener Penalty"] == 4
+
+
+def test_water_is_grade_a_whatever_its_points():
+    row = product(energy=400.0, sugar=20.0, water=True)
+    for scores in (score_product(row, "drink"), engine_scores(row, "drink")):
+        assert scores["Nutri-Score Points"] == 0
+        assert scores["Nutri-Score Grade"] == "A"
+    assert score_product(row, "general")["Nutri-Score Grade"] != "A"
+
+
+@pytest.mark.parametrize("category, threshold", [("general", 11), ("fat", 7)])
+def test_protein_counts_only_below_the_n_threshold(category, threshold):
+    catalog = make_catalog(n_profiles=3000, repeats=1, seed=1)
+    scores = row_wise(catalog, [category] * 3000)
+    n_totals = {scores_["N-points Total"] for scores_ in scores}
+    assert threshold - 1 in n_totals and threshold in n_totals
+    for scores_ in scores:
+        fruit_fibre = scores_["Fruit Score"] + scores_["Fibre Score"]
+        p_counted = fruit_fibre if scores_["N-points Total"] >= threshold else scores_["P-points Total"]
+        assert scores_["Nutri-Score Points"] == scores_["N-points Total"] - p_counted
+
+
+# ----------------------------
+# Engine, row-wise and deduplicated paths
+# ----------------------------
+@pytest.mark.parametrize("category", CATEGORIES)
+def test_engine_matches_row_wise(category):
+    catalog = make_catalog()
+    categories = [category] * len(catalog[NUTRIENT_COLUMNS[0]])
+    assert_same_scores(score_columns(catalog, category), row_wise(catalog, categories))
+
+
+def test_dedupe_matches_row_wise_for_mixed_categories(monkeypatch):
+    catalog = make_catalog(repeats=8)
+    n_rows = len(catalog[NUTRIENT_COLUMNS[0]])
+    categories = np.array(CATEGORIES, dtype=object)[np.random.default_rng(2).integers(3, size=n_rows)]
+
+    scored_rows = []
+    original = engine.score_columns_by_category
+
+    def spy(columns, categories_):
+        scored_rows.append(len(categories_))
+        return original(columns, categories_)
+
+    monkeypatch.setattr(engine, "score_columns_by_category", spy)
+    result = score_unique_profiles(catalog, categories)
+    assert scored_rows and max(scored_rows) < n_rows  # repeated profiles were scored once
+
+    expected = row_wise(catalog, categories)
+    assert_same_scores(result, expected)
+    assert_same_scores(original(catalog, categories), expected)
+
+
+def test_dedupe_falls_back_to_full_scoring_on_hash_collision(monkeypatch):
+    catalog = make_catalog(repeats=8)
+    n_rows = len(catalog[NUTRIENT_COLUMNS[0]])
+    categories = np.full(n_rows, "general", dtype=object)
+
+    # Every row gets the same key: the representative check must catch the collision
+    monkeypatch.setattr(engine, "profile_keys", lambda arrays: np.zeros(n_rows, dtype=np.uint64))
+    scored_rows = []
+    original = engine.score_columns_by_category
+
+    def spy(columns, categories_):
+        scored_rows.append(len(categories_))
+        return original(columns, categories_)
+
+    monkeypatch.setattr(engine, "score_columns_by_category", spy)
+    result = score_unique_profiles(catalog, categories)
+    assert scored_rows == [n_rows]
+    assert_same_scores(result, row_wise(catalog, categories))
@@ -0,0 +1,37 @@
+"""Malformed requests to the HTTP scoring service get an HTTP error, not a dropped connection."""
+
+import asyncio
+import json
+
+import pytest
+
+from nutriscore.service import ScoringService
+
+
+async def _exchange(request):
+    service = ScoringService()
+    server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+    try:
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        return response
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_gets_400(length):
+    request = (
+        f"POST /score HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {length}\r\n\r\n{{}}"
+    ).encode()
+    response = asyncio.run(_exchange(request))
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400")
+    assert b"connection: close" in head.lower()
+    assert "Content-Length" in json.loads(body)["error"]
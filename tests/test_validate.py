@@ -0,0 +1,41 @@
+"""Unusable cells are rejected at the input boundaries, not by `process_dataframe` itself."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutriscore.columns import NUTRIENT_COLUMNS
+from nutriscore.frame import process_dataframe
+from nutriscore.validate import validate_products
+
+
+def products(**cells):
+    """Two products with every nutrient at 1; `cells` overrides the first one's cells."""
+    df = pd.DataFrame({name: [1.0, 1.0] for name in NUTRIENT_COLUMNS}, dtype=object)
+    for name, value in cells.items():
+        df.loc[0, name] = value
+    return df
+
+
+def test_process_dataframe_scores_every_row():
+    df = products(**{"Sugar (g/100 g)": "lots", "Salt (g/100 g)": "1,5", "Energy (kJ/100 g)": 5000})
+    result_df = process_dataframe(df, "general")
+    assert len(result_df) == 2
+    assert np.isnan(result_df["Sugar (g/100 g)"].iloc[0])
+    assert result_df["Sugar Score"].iloc[0] == 10  # most unfavourable points
+    assert result_df["Salt (g/100 g)"].iloc[0] == 1.5
+    assert result_df["Energy Score"].iloc[0] == 10
+
+
+def test_process_dataframe_validate_raises():
+    with pytest.raises(ValueError, match="'lots'"):
+        process_dataframe(products(**{"Sugar (g/100 g)": "lots"}), "general", validate=True)
+
+
+def test_limits_are_physical():
+    # A syrup labelled per 100 mL holds more than 100 g of sugar
+    _, errors = validate_products(products(**{"Sugar (g/100 g)": 120.0, "Energy (kJ/100 g)": 3766.0}))
+    assert errors.empty
+    # More energy than pure fat, or more than all of the product as fruit
+    _, errors = validate_products(products(**{"Energy (kJ/100 g)": 4100.0, "Fruits, vegetables, and pulses (%)": 101}))
+    assert errors["Column"].tolist() == ["Energy (kJ/100 g)", "Fruits, vegetables, and pulses (%)"]